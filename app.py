@@ -3,13 +3,28 @@ Flask Web Application for AI Slide Generator
 Provides a simple web interface for generating presentations
 """
 
-from flask import Flask, render_template, request, send_file, jsonify, send_from_directory
+from flask import Flask, render_template, request, send_file, jsonify, send_from_directory, redirect
 from flask_cors import CORS
 import os
+import io
 import json
+import shutil
+import tempfile
 from free_slide_generator import FreeSlideGenerator
+from thumbnail_renderer import FORMATS as THUMBNAIL_FORMATS
+from image_variants import VARIANT_FORMATS, snap_width
+from render_pool import RenderPool
+from request_coalescing import SingleFlight, IdempotencyStore, IdempotencyConflict, normalize_text, params_key
+from deadline import DEFAULT_TIME_BUDGET, DeadlineExceeded
+from llm_scheduler import LANES, QueueFull
+from outline_index import REUSE_MODES
+import math
 from datetime import datetime
 import traceback
+import atexit
+import threading
+import time
+from contextlib import contextmanager
 
 app = Flask(__name__, static_folder='static/frontend', static_url_path='')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
@@ -23,13 +38,87 @@ CACHE_DIR = 'cache'
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(CACHE_DIR, exist_ok=True)
 
-# Initialize FREE generator (only needs Gemini API key)
-try:
-    generator = FreeSlideGenerator()
-    print("✅ Free Slide Generator initialized successfully")
-except Exception as e:
-    print(f"⚠️  Error initializing generator: {e}")
-    generator = None
+# The generator and render pool are created per process on first use (or by
+# serve.py right after fork), never at import time, so pre-forked workers and
+# render pool children do not inherit half-initialized client state
+_state_lock = threading.Lock()
+generator = None
+generator_error = None
+render_pool = None
+
+# Concurrent identical /generate requests share one generation; responses for
+# requests carrying an Idempotency-Key header are kept for replay on retries
+generation_flight = SingleFlight()
+idempotency_store = IdempotencyStore(cache_dir=os.path.join(CACHE_DIR, 'idempotency'))
+
+# Graceful shutdown: stop taking generation jobs, let in-flight ones finish
+draining = False
+in_flight = 0
+
+
+def init_generator():
+    """Create this process's FREE generator (only needs Gemini API key) and render pool"""
+    global generator, generator_error, render_pool
+    with _state_lock:
+        if generator is not None:
+            return generator
+        
+        try:
+            # Render decks in worker processes when RENDER_POOL_SIZE is set (serve.py
+            # sets it per worker); the development server renders in-process
+            if render_pool is None and int(os.getenv('RENDER_POOL_SIZE') or 0) > 0:
+                render_pool = RenderPool()
+                atexit.register(render_pool.shutdown)
+            
+            generator = FreeSlideGenerator(render_pool=render_pool)
+            # Upgrade placeholders of failed images in the background
+            generator.start_image_refresher()
+            generator_error = None
+            print("✅ Free Slide Generator initialized successfully")
+        except Exception as e:
+            print(f"⚠️  Error initializing generator: {e}")
+            generator_error = str(e)
+    return generator
+
+
+def get_generator():
+    """The initialized generator, or None if initialization failed"""
+    return generator or init_generator()
+
+
+def start_draining():
+    """Refuse new generation jobs (503) while in-flight ones finish"""
+    global draining
+    draining = True
+
+
+def shutdown(drain_timeout=None):
+    """Stop accepting generation jobs, wait for in-flight ones, then stop the render pool"""
+    start_draining()
+    if drain_timeout is None:
+        drain_timeout = float(os.getenv('SHUTDOWN_DRAIN_TIMEOUT', 60))
+    deadline = time.monotonic() + drain_timeout
+    while in_flight and time.monotonic() < deadline:
+        time.sleep(0.1)
+    if in_flight:
+        print(f"⚠️  Shutting down with {in_flight} generation(s) still running")
+    if generator and generator.image_refresher:
+        generator.image_refresher.stop()
+    if render_pool:
+        render_pool.shutdown(wait=True)
+
+
+@contextmanager
+def track_job():
+    """Count a generation job as in flight for draining and readiness"""
+    global in_flight
+    with _state_lock:
+        in_flight += 1
+    try:
+        yield
+    finally:
+        with _state_lock:
+            in_flight -= 1
 
 
 @app.route('/')
@@ -47,7 +136,7 @@ def index():
 @app.route('/api/themes', methods=['GET'])
 def get_themes():
     """Get available themes"""
-    if not generator:
+    if not get_generator():
         return jsonify({'error': 'Generator not initialized'}), 500
     
     themes = []
@@ -62,12 +151,47 @@ def get_themes():
     return jsonify({'themes': themes})
 
 
+# Range a time_budget is clamped to, in seconds
+MIN_TIME_BUDGET = 5
+MAX_TIME_BUDGET = 600
+
+
+def parse_time_budget(value):
+    """Seconds of a time_budget field clamped to the allowed range, or None for no limit"""
+    if isinstance(value, bool):
+        raise ValueError('time_budget must be a number of seconds')
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('time_budget must be a number of seconds')
+    if not math.isfinite(seconds) or seconds < 0:
+        raise ValueError('time_budget must be a finite, non-negative number of seconds')
+    if not seconds:
+        return None
+    return min(max(seconds, MIN_TIME_BUDGET), MAX_TIME_BUDGET)
+
+
+# Header naming the user or tenant of a request, set by an authenticating proxy;
+# earlier decks are only matched within one owner. Unset: a single shared pool.
+OWNER_HEADER = os.getenv('DECK_OWNER_HEADER')
+
+
+def request_owner():
+    """User or tenant the current request comes from, or None"""
+    if not OWNER_HEADER:
+        return None
+    return request.headers.get(OWNER_HEADER, '').strip() or None
+
+
 @app.route('/generate', methods=['POST'])
 def generate_presentation():
     """Generate presentation with FREE tools only"""
     try:
+        generator = get_generator()
         if not generator:
             return jsonify({'error': 'Generator not initialized. Check GEMINI_API_KEY in .env'}), 500
+        if draining:
+            return jsonify({'error': 'Server is shutting down, please retry'}), 503
         
         # Get form data
         data = request.get_json()
@@ -79,6 +203,14 @@ def generate_presentation():
         use_ai_images = data.get('use_ai_images', False)  # NEW: AI image generation
         include_code = data.get('include_code', False)
         theme = data.get('theme', 'modern_blue')
+        time_budget = data.get('time_budget') or DEFAULT_TIME_BUDGET
+        # Web requests are interactive unless the client marks them as batch work
+        priority = data.get('priority', 'interactive')
+        # 'seed' (default) seeds from similar earlier decks, 'auto' also reuses near-identical ones as is, 'off' always generates
+        outline_reuse = data.get('outline_reuse') or generator.outline_index.mode
+        # Id of an earlier deck offered as reusable (response 'outline'), to return as is
+        reuse_outline = data.get('reuse_outline') or None
+        owner = request_owner()
         
         # Validate input
         if not topic:
@@ -87,77 +219,362 @@ def generate_presentation():
         if num_slides < 3 or num_slides > 30:
             return jsonify({'error': 'Number of slides must be between 3 and 30'}), 400
         
-        # Generate unique filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        safe_topic = "".join(c for c in topic if c.isalnum() or c in (' ', '-', '_')).strip()
-        safe_topic = safe_topic.replace(' ', '_')[:50]
-        output_filename = f"{safe_topic}_{timestamp}.pptx"
-        output_path = os.path.join(OUTPUT_DIR, output_filename)
-        
-        print(f"\n{'='*60}")
-        print(f"🎯 Generating FREE presentation:")
-        print(f"   Prompt: {topic}")
-        print(f"   Slides: {num_slides}")
-        print(f"   Theme: {theme}")
-        print(f"   Style: {style}")
-        print(f"   Images: {'AI Generated' if use_ai_images else 'Stock Photos' if include_images else 'None'}")
-        print(f"   Diagrams: Enabled (auto-generated)")
-        print(f"{'='*60}\n")
-        
-        # Generate presentation (100% FREE with diagrams & AI images)
+        if priority not in LANES:
+            return jsonify({'error': f"priority must be one of: {', '.join(LANES)}"}), 400
+        
+        if outline_reuse not in REUSE_MODES:
+            return jsonify({'error': f"outline_reuse must be one of: {', '.join(REUSE_MODES)}"}), 400
+        
+        if reuse_outline is not None and not (isinstance(reuse_outline, str) and reuse_outline.isalnum() and len(reuse_outline) <= 64):
+            return jsonify({'error': 'reuse_outline must be an outline_id from an earlier response'}), 400
+        
+        try:
+            time_budget = parse_time_budget(time_budget)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if OWNER_HEADER and owner is None:
+            # Anonymous requests in a multi-user deployment never see other decks
+            outline_reuse, reuse_outline = 'off', None
+        
+        params = {
+            'topic': topic,
+            'num_slides': num_slides,
+            'style': style,
+            'audience': audience,
+            'include_code': bool(include_code),
+            'include_images': bool(include_images or use_ai_images),
+            'use_ai_images': bool(use_ai_images),
+            'theme': theme,
+            'outline_reuse': outline_reuse,
+            'reuse_outline': reuse_outline,
+            'owner': owner
+        }
+        # Duplicates differ at most in case and whitespace of the free-text fields
+        fingerprint = params_key(dict(
+            params,
+            topic=normalize_text(topic),
+            audience=normalize_text(audience),
+            style=normalize_text(style)
+        ))
+        
+        idempotency_key = request.headers.get('Idempotency-Key', '').strip()
+        if idempotency_key:
+            try:
+                stored = idempotency_store.get(idempotency_key, fingerprint)
+            except IdempotencyConflict as e:
+                return jsonify({'error': str(e)}), 422
+            if stored is not None:
+                print(f"♻️  Replaying stored response for Idempotency-Key {idempotency_key[:16]}")
+                response = jsonify(stored)
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+        
+        body, shared = generation_flight.do(fingerprint, lambda: run_generation(generator, params, time_budget, priority))
+        if shared:
+            print(f"🔗 Joined an identical in-flight generation ({body['filename']})")
+        if idempotency_key:
+            idempotency_store.put(idempotency_key, fingerprint, body)
+        
+        return jsonify(body)
+        
+    except QueueFull as e:
+        # Fast rejection instead of queueing behind the Gemini quota
+        print(f"🚦 {e}")
+        retry_after = math.ceil(e.retry_after) or 1
+        response = jsonify({'error': str(e), 'retry_after': retry_after})
+        response.headers['Retry-After'] = str(retry_after)
+        return response, 503
+    except DeadlineExceeded as e:
+        print(f"⏱️  {e}")
+        return jsonify({'error': str(e)}), 504
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+def run_generation(generator, params, time_budget=None, priority='interactive'):
+    """Generate one deck and build the /generate response body"""
+    topic = params['topic']
+    theme = params['theme']
+    include_images = params['include_images']
+    use_ai_images = params['use_ai_images']
+    
+    # Generate unique filename
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    safe_topic = "".join(c for c in topic if c.isalnum() or c in (' ', '-', '_')).strip()
+    safe_topic = safe_topic.replace(' ', '_')[:50]
+    output_filename = f"{safe_topic}_{timestamp}.pptx"
+    output_path = os.path.join(OUTPUT_DIR, output_filename)
+    
+    print(f"\n{'='*60}")
+    print(f"🎯 Generating FREE presentation:")
+    print(f"   Prompt: {topic}")
+    print(f"   Slides: {params['num_slides']}")
+    print(f"   Theme: {theme}")
+    print(f"   Style: {params['style']}")
+    print(f"   Images: {'AI Generated' if use_ai_images else 'Stock Photos' if include_images else 'None'}")
+    print(f"   Diagrams: Enabled (auto-generated)")
+    print(f"{'='*60}\n")
+    
+    # Generate presentation (100% FREE with diagrams & AI images)
+    with track_job():
         result = generator.generate_presentation(
             prompt=topic,
-            num_slides=num_slides,
+            num_slides=params['num_slides'],
             output_path=output_path,
-            style=style,
-            audience=audience,
-            include_code=include_code,
-            include_images=include_images or use_ai_images,
+            style=params['style'],
+            audience=params['audience'],
+            include_code=params['include_code'],
+            include_images=include_images,
             use_ai_images=use_ai_images,
-            theme=theme
+            theme=theme,
+            time_budget=time_budget,
+            priority=priority,
+            outline_reuse=params['outline_reuse'],
+            reuse_outline=params['reuse_outline'],
+            owner=params['owner']
         )
+    
+    return {
+        'success': True,
+        'deck_id': result.get('deck_id'),
+        'filename': output_filename,
+        'num_slides': result['num_slides'],
+        'slides_data': result['slides_data'],
+        'theme': result['theme'],
+        'salvage': result.get('salvage'),
+        'image_cache': result.get('image_cache'),
+        'degraded_slides': result.get('degraded_slides'),
+        'outline': result.get('outline'),
+        'message': f'Presentation generated successfully with diagrams and {"AI images" if use_ai_images else "stock images" if include_images else "no images"}!'
+    }
+
+
+# Largest page of slides returned by one /api/slides range request
+MAX_SLIDE_PAGE = 30
+
+
+def find_deck(ref):
+    """Repository metadata of a deck by id or .pptx filename, or None"""
+    generator = get_generator()
+    return generator.decks.find(ref) if generator else None
+
+
+def load_slides_data(ref):
+    """
+    Slide data of a deck by id or .pptx filename, or None if it is not available.
+    
+    Decoded decks are cached and shared between requests, so callers must not
+    modify the list.
+    """
+    generator = get_generator()
+    return generator.decks.load(ref) if generator else None
+
+
+def slides_not_found(ref):
+    return jsonify({
+        'error': 'Slide data not found. This presentation may have been generated in an older session.',
+        'filename': ref
+    }), 404
+
+
+@app.route('/api/slides/<filename>')
+def get_slides_data(filename):
+    """Get slide data for a presentation (for viewer); ?offset=&limit= returns one page"""
+    try:
+        deck = find_deck(filename)
+        slides_data = load_slides_data(filename) if deck else None
+        
+        if slides_data is None:
+            return slides_not_found(filename)
+        
+        if 'offset' not in request.args and 'limit' not in request.args:
+            return jsonify({
+                'success': True,
+                'deck_id': deck['id'],
+                'filename': deck['filename'],
+                'slides': slides_data
+            })
         
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = min(max(request.args.get('limit', MAX_SLIDE_PAGE, type=int), 1), MAX_SLIDE_PAGE)
         return jsonify({
             'success': True,
-            'filename': output_filename,
-            'num_slides': result['num_slides'],
-            'slides_data': result['slides_data'],
-            'theme': result['theme'],
-            'message': f'Presentation generated successfully with diagrams and {"AI images" if use_ai_images else "stock images" if include_images else "no images"}!'
+            'deck_id': deck['id'],
+            'filename': deck['filename'],
+            'offset': offset,
+            'total': len(slides_data),
+            'slides': slides_data[offset:offset + limit]
         })
-        
     except Exception as e:
-        print(f"❌ Error: {str(e)}")
-        traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/slides/<filename>')
-def get_slides_data(filename):
-    """Get slide data for a presentation (for viewer)"""
+@app.route('/api/slides/<filename>/manifest')
+def get_slides_manifest(filename):
+    """Slide count, titles and theme of a presentation, without bullets, notes or code"""
     try:
-        # Convert .pptx filename to .json cache filename
-        cache_filename = filename.replace('.pptx', '.json')
-        cache_path = os.path.join(CACHE_DIR, cache_filename)
-        
-        if not os.path.exists(cache_path):
-            return jsonify({
-                'error': 'Slide data not found. This presentation may have been generated in an older session.',
-                'filename': filename
-            }), 404
+        deck = find_deck(filename)
+        slides_data = load_slides_data(filename) if deck else None
+        if slides_data is None:
+            return slides_not_found(filename)
         
-        with open(cache_path, 'r', encoding='utf-8') as f:
-            slides_data = json.load(f)
+        return jsonify({
+            'success': True,
+            'deck_id': deck['id'],
+            'filename': deck['filename'],
+            'count': len(slides_data),
+            'theme': deck['theme'],
+            'titles': [slide.get('title', '') for slide in slides_data]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/slides/<filename>/<int:index>')
+def get_slide(filename, index):
+    """One slide of a presentation (for viewer)"""
+    try:
+        slides_data = load_slides_data(filename)
+        if slides_data is None:
+            return slides_not_found(filename)
+        if index < 0 or index >= len(slides_data):
+            return jsonify({'error': 'Slide index out of range'}), 404
         
         return jsonify({
             'success': True,
-            'filename': filename,
-            'slides': slides_data
+            'index': index,
+            'total': len(slides_data),
+            'slide': slides_data[index]
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/decks')
+def list_decks():
+    """Generated decks, newest first (?limit=, ?cursor= from the previous page's next_cursor)"""
+    generator = get_generator()
+    if not generator:
+        return jsonify({'error': 'Generator not initialized'}), 500
+    try:
+        decks, next_cursor = generator.decks.history(
+            request.args.get('limit', 20, type=int), request.args.get('cursor')
+        )
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    return jsonify({'success': True, 'decks': decks, 'next_cursor': next_cursor})
+
+
+@app.route('/api/decks/<deck_id>')
+def get_deck(deck_id):
+    """Metadata of one deck"""
+    deck = find_deck(deck_id)
+    if deck is None:
+        return jsonify({'error': 'Deck not found', 'deck_id': deck_id}), 404
+    return jsonify(dict(deck, success=True))
+
+
+@app.route('/api/thumbnail/<filename>/<int:index>')
+def get_thumbnail(filename, index):
+    """Server-rendered preview of one slide (?theme=, ?width=, ?format=png|webp)"""
+    try:
+        generator = get_generator()
+        if not generator:
+            return jsonify({'error': 'Generator not initialized'}), 500
+        
+        theme = request.args.get('theme', 'modern_blue')
+        fmt = request.args.get('format', 'png').lower()
+        width = min(max(request.args.get('width', 480, type=int), 64), 1600)
+        
+        if theme not in FreeSlideGenerator.THEMES:
+            return jsonify({'error': f'Unknown theme: {theme}'}), 400
+        if fmt not in THUMBNAIL_FORMATS:
+            return jsonify({'error': 'Format must be png or webp'}), 400
+        
+        slides_data = load_slides_data(filename)
+        if slides_data is None:
+            return jsonify({'error': 'Slide data not found', 'filename': filename}), 404
+        if index < 0 or index >= len(slides_data):
+            return jsonify({'error': 'Slide index out of range'}), 404
+        
+        thumbnail = generator.open_thumbnail(slides_data[index], theme, width, fmt)
+        return send_file(
+            thumbnail, mimetype=THUMBNAIL_FORMATS[fmt][1], max_age=86400,
+            etag=os.path.splitext(os.path.basename(thumbnail.name))[0]
+        )
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+def preferred_image_format():
+    """?format= if given, else WebP for clients that accept it"""
+    fmt = request.args.get('format')
+    if fmt:
+        return fmt.lower()
+    return 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+
+
+@app.route('/api/images/<name>/<digest>/<int:width>.<fmt>')
+def get_image_variant(name, digest, width, fmt):
+    """Width-constrained WebP/JPEG variant of a cached image at a content-hash URL"""
+    try:
+        generator = get_generator()
+        if not generator:
+            return jsonify({'error': 'Generator not initialized'}), 500
+        if fmt not in VARIANT_FORMATS:
+            return jsonify({'error': 'Format must be webp or jpeg'}), 400
+        
+        variants = generator.image_variants
+        source = variants.source_path(name)
+        if source is None:
+            return jsonify({'error': 'Image not found'}), 404
+        if digest != variants.digest(source):
+            # The image was replaced; point at the URL of the current content
+            # (temporary: the content may change again, so browsers must not cache it)
+            return redirect(variants.url(source, width, fmt), code=302)
+        
+        variant = variants.open(source, width, fmt)
+        response = send_file(
+            variant, mimetype=VARIANT_FORMATS[fmt][1], max_age=31536000,
+            etag=f"{digest}-{snap_width(width)}.{fmt}"
+        )
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/slides/<filename>/<int:index>/image')
+def get_slide_image(filename, index):
+    """Redirect to the content-hash URL of a slide's image (?width=, ?format=webp|jpeg)"""
+    generator = get_generator()
+    if not generator:
+        return jsonify({'error': 'Generator not initialized'}), 500
+    
+    fmt = preferred_image_format()
+    if fmt not in VARIANT_FORMATS:
+        return jsonify({'error': 'Format must be webp or jpeg'}), 400
+    deck = find_deck(filename)
+    slides_data = load_slides_data(filename) if deck else None
+    if slides_data is None or index < 0 or index >= len(slides_data):
+        return jsonify({'error': 'Slide not found'}), 404
+    
+    path = generator.slide_image_path(deck['id'], index, slides_data)
+    if path is None:
+        return jsonify({'error': 'Slide has no image'}), 404
+    width = min(max(request.args.get('width', 480, type=int), 1), 1024)
+    response = redirect(generator.image_variants.url(path, width, fmt))
+    response.headers['Vary'] = 'Accept'
+    response.cache_control.max_age = 60
+    return response
+
+
 @app.route('/viewer/<filename>')
 def viewer(filename):
     """Render the presentation viewer"""
@@ -166,14 +583,37 @@ def viewer(filename):
 
 @app.route('/download/<filename>')
 def download_file(filename):
-    """Download generated presentation"""
+    """Download generated presentation (?theme= re-renders it in another theme)"""
     try:
-        file_path = os.path.join(OUTPUT_DIR, filename)
-        if not os.path.exists(file_path):
-            return jsonify({'error': 'File not found'}), 404
+        deck = find_deck(filename)
+        if deck:
+            filename = deck['filename']
+        file_path = os.path.join(OUTPUT_DIR, os.path.basename(filename))
+        theme = request.args.get('theme')
+        
+        if theme or not os.path.exists(file_path):
+            # Re-theme, or rebuild a deck whose package was removed; identical
+            # renders are served from the rendered-deck cache
+            generator = get_generator()
+            slides_data = load_slides_data(deck['id']) if deck else None
+            if not generator or slides_data is None:
+                return jsonify({'error': 'File not found'}), 404
+            
+            options = generator.load_render_options(deck['id']) or {}
+            image_paths = options.get('image_paths') or [None] * len(slides_data)
+            original_theme = options.get('theme', 'modern_blue')
+            theme = theme or original_theme
+            if theme not in FreeSlideGenerator.THEMES:
+                return jsonify({'error': f'Unknown theme: {theme}'}), 400
+            
+            if theme != original_theme:
+                filename = filename.replace('.pptx', f'_{theme}.pptx')
+                file_path = os.path.join(OUTPUT_DIR, filename)
+            with track_job():
+                generator.render_deck(slides_data, file_path, theme, image_paths)
         
         return send_file(
-            file_path,
+            os.path.abspath(file_path),
             as_attachment=True,
             download_name=filename,
             mimetype='application/vnd.openxmlformats-officedocument.presentationml.presentation'
@@ -182,13 +622,93 @@ def download_file(filename):
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/export/<filename>/html')
+def export_html(filename):
+    """Download a static HTML bundle of a presentation as a zip (?theme= overrides the theme)"""
+    try:
+        generator = get_generator()
+        deck = find_deck(filename)
+        slides_data = load_slides_data(filename) if deck else None
+        if not generator or slides_data is None:
+            return jsonify({'error': 'Slide data not found', 'filename': filename}), 404
+        
+        filename = deck['filename']
+        options = generator.load_render_options(deck['id']) or {}
+        theme = request.args.get('theme', options.get('theme', 'modern_blue'))
+        if theme not in FreeSlideGenerator.THEMES:
+            return jsonify({'error': f'Unknown theme: {theme}'}), 400
+        
+        stem = filename.replace('.pptx', '')
+        # Each request builds its bundle privately, so concurrent exports of one
+        # deck cannot overwrite each other and nothing is left in the output dir
+        with tempfile.TemporaryDirectory(prefix='html_export_') as work_dir:
+            bundle_dir = os.path.join(work_dir, 'bundle')
+            generator.export_html(slides_data, bundle_dir, theme, options.get('image_paths'))
+            archive = shutil.make_archive(os.path.join(work_dir, stem), 'zip', bundle_dir)
+            with open(archive, 'rb') as f:
+                data = io.BytesIO(f.read())
+        return send_file(data, as_attachment=True,
+                         download_name=f"{stem}_html.zip", mimetype='application/zip')
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    """Image and rendered-deck cache statistics for this worker process"""
+    generator = get_generator()
+    if not generator:
+        return jsonify({'error': 'Generator not initialized'}), 500
+    return jsonify({
+        'images': generator.image_cache_stats(),
+        'failed_images': dict(
+            generator.failed_images.usage(),
+            refresher=generator.image_refresher.stats if generator.image_refresher else None
+        ),
+        'decks': generator.deck_cache.usage(),
+        'image_variants': generator.image_variants.usage(),
+        'thumbnails': generator.thumbnails.usage(),
+        'outlines': generator.outline_index.hit_rate(),
+        'deck_store': generator.decks.usage()
+    })
+
+
+@app.route('/api/providers')
+def provider_stats():
+    """Gemini quota scheduler and image provider circuit breakers in this worker process"""
+    generator = get_generator()
+    if not generator:
+        return jsonify({'error': 'Generator not initialized'}), 500
+    return jsonify(dict(generator.provider_stats(), gemini=generator.llm_scheduler.snapshot()))
+
+
 @app.route('/health')
 def health_check():
     """Health check endpoint"""
     return jsonify({'status': 'healthy'})
 
 
+@app.route('/ready')
+def readiness_check():
+    """Readiness check against the actual generator and render pool state"""
+    checks = {
+        'generator': generator is not None,
+        'render_pool': render_pool is None or render_pool.is_alive(),
+        'accepting_jobs': not draining,
+    }
+    ready = all(checks.values())
+    return jsonify({
+        'status': 'ready' if ready else 'not ready',
+        'checks': checks,
+        'in_flight': in_flight,
+        'error': generator_error
+    }), 200 if ready else 503
+
+
 if __name__ == '__main__':
+    # Development server; use serve.py in production
+    init_generator()
     print("\n" + "=" * 60)
     print("🚀 SlidesGPT FREE Edition - AI Slide Generator")
     print("=" * 60)
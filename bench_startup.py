@@ -0,0 +1,91 @@
+"""
+Cold-start benchmark for the SlidesGPT command line tools
+Runs each CLI's `--help` in fresh interpreters and fails when the median wall
+time exceeds the budget, or when importing a module already loads one of the
+heavy dependencies that should only be imported on first use.
+
+    python bench_startup.py                # default budget
+    python bench_startup.py --max-ms 300 --runs 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Scripts whose `--help` must stay fast
+COMMANDS = ['free_slide_generator.py', 'slide_generator.py']
+
+# Modules that must import without pulling in these packages
+LAZY_MODULES = ['free_slide_generator', 'slide_generator', 'diagram_engine', 'text_fit']
+HEAVY_DEPENDENCIES = ['google.generativeai', 'pptx', 'PIL', 'requests', 'lxml']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{'ms': elapsed, 'heavy': heavy}}))
+"""
+
+
+def time_command(script, runs):
+    """Wall times in milliseconds of `python <script> --help` in fresh processes"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(ROOT, script), '--help'],
+                       cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def probe_import(module):
+    """Import time and heavy dependencies loaded by importing one module"""
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_DEPENDENCIES)],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CLI cold-start benchmark')
+    parser.add_argument('--runs', type=int, default=7, help='Fresh interpreters per command')
+    parser.add_argument('--max-ms', type=float, default=float(os.getenv('STARTUP_BUDGET_MS', 250)),
+                        help='Median wall-time budget per command in milliseconds')
+    args = parser.parse_args()
+
+    failures = []
+
+    print("📦 Module imports")
+    for module in LAZY_MODULES:
+        result = probe_import(module)
+        print(f"   {module:<22} {result['ms']:7.1f} ms")
+        if result['heavy']:
+            failures.append(f"importing {module} loads {', '.join(result['heavy'])}")
+
+    print(f"⏱️  CLI --help ({args.runs} runs, budget {args.max_ms:.0f} ms)")
+    for script in COMMANDS:
+        times = time_command(script, args.runs)
+        median = statistics.median(times)
+        print(f"   {script:<22} median {median:7.1f} ms   min {min(times):7.1f} ms   max {max(times):7.1f} ms")
+        if median > args.max_ms:
+            failures.append(f"{script} --help median {median:.0f} ms exceeds {args.max_ms:.0f} ms")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+    print("✅ Startup within budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Circuit breakers for the external image providers
+Each provider (Unsplash, Pollinations) gets one breaker shared by all threads of
+the worker. When too many recent calls fail the breaker opens and callers go
+straight to their fallback instead of waiting out a timeout per slide; after a
+cool-down a single probe request is let through (half-open) and its outcome
+closes or re-opens the circuit.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker.
+
+    failure_rate: fraction of failed calls in the window that opens the circuit
+        (BREAKER_FAILURE_RATE, default 0.5)
+    min_calls: calls needed in the window before the rate is trusted
+        (BREAKER_MIN_CALLS, default 4)
+    window: number of recent calls considered (default 20)
+    reset_timeout: seconds the circuit stays open before a probe
+        (BREAKER_RESET_TIMEOUT, default 30)
+    """
+
+    def __init__(self, name, failure_rate=None, min_calls=None, window=20, reset_timeout=None):
+        self.name = name
+        self.failure_rate = failure_rate if failure_rate is not None else float(os.getenv('BREAKER_FAILURE_RATE', 0.5))
+        self.min_calls = min_calls or int(os.getenv('BREAKER_MIN_CALLS', 4))
+        self.reset_timeout = reset_timeout if reset_timeout is not None else float(os.getenv('BREAKER_RESET_TIMEOUT', 30))
+        self.state = CLOSED
+        self._results = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_started = None
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def allow(self):
+        """True if a call may go to the provider; False means use the fallback now"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probe_started = None
+            if self.state == HALF_OPEN:
+                # One probe at a time; a probe that never reported back is replaced
+                if self._probe_started is None or now - self._probe_started >= self.reset_timeout:
+                    self._probe_started = now
+                    return True
+            elif self.state == CLOSED:
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def record(self, ok):
+        """Report the outcome of an allowed call"""
+        with self._lock:
+            self.stats['calls'] += 1
+            if not ok:
+                self.stats['failures'] += 1
+
+            if self.state == HALF_OPEN:
+                if ok:
+                    print(f"🟢 {self.name} recovered, closing circuit")
+                    self.state = CLOSED
+                    self._results.clear()
+                else:
+                    self._open()
+                return
+
+            self._results.append(ok)
+            failures = self._results.count(False)
+            if (not ok and self.state == CLOSED and len(self._results) >= self.min_calls
+                    and failures / len(self._results) >= self.failure_rate):
+                self._open()
+
+    def record_success(self):
+        self.record(True)
+
+    def record_failure(self):
+        self.record(False)
+
+    def _open(self):
+        print(f"🔴 {self.name} is failing, opening circuit for {self.reset_timeout:g}s")
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_started = None
+        self._results.clear()
+        self.stats['opened'] += 1
+
+    def snapshot(self):
+        """State and counters, for metrics"""
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 1)
+            return dict(
+                self.stats,
+                state=self.state,
+                recent_failures=self._results.count(False),
+                recent_calls=len(self._results),
+                retry_in=retry_in
+            )
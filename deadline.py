@@ -0,0 +1,70 @@
+"""
+Per-request time budgets
+A Deadline is created when a generation starts and passed through each stage.
+Stages clip their network timeouts to the time that is left and skip optional
+work (image fetches, repair requests) once it is spent, so a deck degrades to
+placeholders instead of running for minutes.
+"""
+
+import os
+import time
+
+# Seconds a web request may spend generating a deck (0 or unset = no limit)
+DEFAULT_TIME_BUDGET = float(os.getenv('GENERATION_TIME_BUDGET', 0) or 0)
+
+# Never hand a network call less than this, so a nearly spent budget fails fast
+# instead of issuing requests that cannot possibly complete
+MIN_TIMEOUT = 0.5
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before a stage could run"""
+
+
+class Deadline:
+    """
+    Wall-clock budget for one request.
+
+    budget: seconds from now, or None/0 for no limit
+    """
+
+    def __init__(self, budget=None):
+        self.budget = float(budget) if budget else None
+        self.started = time.monotonic()
+        self.expires = self.started + self.budget if self.budget else None
+
+    @classmethod
+    def coerce(cls, value):
+        """Deadline from a Deadline, a number of seconds or None"""
+        if isinstance(value, Deadline):
+            return value
+        return cls(value)
+
+    @property
+    def bounded(self):
+        return self.expires is not None
+
+    def remaining(self):
+        """Seconds left (None when unbounded, never negative)"""
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def expired(self):
+        return self.expires is not None and time.monotonic() >= self.expires
+
+    def timeout(self, default):
+        """A stage's usual timeout, clipped to the time that is left"""
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return max(MIN_TIMEOUT, min(default, remaining))
+
+    def check(self, stage):
+        """Raise DeadlineExceeded if no time is left for `stage`"""
+        if self.expired:
+            raise DeadlineExceeded(f"Time budget of {self.budget:g}s spent before {stage}")
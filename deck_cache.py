@@ -0,0 +1,126 @@
+"""
+Content-addressed cache of rendered PPTX packages
+A finished deck is stored under a hash of everything that determines its
+bytes (slide data, theme, the images placed on each slide and the renderer
+version), so re-downloads, re-theming and exports of an already-rendered deck
+are a file copy instead of a full render. Least recently used packages are
+evicted once the cache exceeds its disk budget.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+
+def deck_key(slides_data, theme, image_ids, renderer_version):
+    """Hash identifying a rendered deck"""
+    payload = json.dumps(
+        [renderer_version, theme, slides_data, image_ids],
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def copy_atomic(src, dst):
+    """Copy through a temp file so readers never see a partial package"""
+    directory = os.path.dirname(os.path.abspath(dst))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class DeckCache:
+    """
+    Rendered decks on disk, evicted least-recently-used within a byte budget.
+
+    cache_dir: where packages are stored (default cache/decks)
+    max_bytes: disk budget (DECK_CACHE_MAX_MB, default 500; 0 disables the cache)
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or os.path.join('cache', 'decks')
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv('DECK_CACHE_MAX_MB', 500)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pptx")
+
+    def get(self, key, output_path):
+        """Copy a cached deck to output_path; returns False on a miss"""
+        if not self.enabled:
+            return False
+        path = self.path(key)
+        try:
+            # The mtime doubles as the last-use time for eviction
+            os.utime(path)
+            copy_atomic(path, output_path)
+        except FileNotFoundError:
+            self._count('misses')
+            return False
+        self._count('hits')
+        return True
+
+    def put(self, key, rendered_path):
+        """Store a freshly rendered deck and enforce the disk budget"""
+        if not self.enabled:
+            return
+        copy_atomic(rendered_path, self.path(key))
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used decks until the cache fits its budget"""
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith('.pptx'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+                total += stat.st_size
+
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.stats['evictions'] += 1
+
+    def usage(self):
+        """Cache counters and current size on disk"""
+        size = count = 0
+        if os.path.isdir(self.cache_dir):
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith('.pptx'):
+                    size += entry.stat().st_size
+                    count += 1
+        return dict(self.stats, decks=count, bytes=size, max_bytes=self.max_bytes)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
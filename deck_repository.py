@@ -0,0 +1,224 @@
+"""
+Repository of generated decks
+Slide data, its metadata (prompt, theme, creation time, slide count, raw and
+stored size) and the options it was rendered with live in one SQLite database
+instead of JSON files named after each deck. Each deck gets a stable id at
+creation; lookups accept the id or the original .pptx filename, and decks
+saved by older versions as cache/<name>.json (plus <name>.render.json) are
+imported the first time they are asked for.
+
+Slide data is stored as compact JSON compressed with zlib (usage() reports
+the raw and stored bytes), and the history index on creation time serves
+paginated listings without touching the slide data.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+from functools import lru_cache
+
+ENCODING = 'json+zlib'
+
+# Largest page of decks one history request returns
+MAX_HISTORY_PAGE = 100
+
+_COLUMNS = 'id, filename, prompt, theme, created, num_slides, raw_size, stored_size'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS decks (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL UNIQUE,
+    prompt TEXT,
+    theme TEXT,
+    created REAL NOT NULL,
+    num_slides INTEGER NOT NULL,
+    raw_size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    encoding TEXT NOT NULL,
+    data BLOB NOT NULL,
+    image_paths TEXT
+);
+CREATE INDEX IF NOT EXISTS decks_history ON decks (created DESC, id DESC);
+"""
+
+
+def encode_slides(slides_data):
+    """(stored bytes, raw JSON size) of slide data"""
+    raw = json.dumps(slides_data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return zlib.compress(raw, 6), len(raw)
+
+
+def decode_slides(data, encoding=ENCODING):
+    if encoding != ENCODING:
+        raise ValueError(f"Unknown deck encoding: {encoding}")
+    return json.loads(zlib.decompress(data).decode('utf-8'))
+
+
+class DeckRepository:
+    """
+    SQLite store of generated decks with a paginated history index.
+
+    path: database file (DECK_DB_PATH, default cache/decks.sqlite3)
+    legacy_dir: where older versions saved <name>.json slide files (default: the database's directory)
+    """
+
+    def __init__(self, path=None, legacy_dir=None):
+        self.path = path or os.getenv('DECK_DB_PATH', os.path.join('cache', 'decks.sqlite3'))
+        self.legacy_dir = legacy_dir or os.path.dirname(self.path) or '.'
+        self._local = threading.local()
+        self._legacy_imported = False
+        # Decoded slide data by (id, created): decks are read slide by slide by the viewer
+        self._decoded = lru_cache(maxsize=64)(self._read_slides)
+
+    def _db(self):
+        """This thread's connection (reopened after a fork)"""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            import sqlite3
+
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            # WAL lets readers in every worker proceed while one process writes
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(_SCHEMA)
+            columns = {row['name'] for row in connection.execute('PRAGMA table_info(decks)')}
+            if 'image_paths' not in columns:
+                # Databases created before render options moved into the repository
+                connection.execute('ALTER TABLE decks ADD COLUMN image_paths TEXT')
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def save(self, filename, slides_data, prompt=None, theme=None, created=None):
+        """Store a deck under its .pptx filename; returns its id (kept if the filename is re-saved)"""
+        filename = os.path.basename(filename)
+        data, raw_size = encode_slides(slides_data)
+        db = self._db()
+        db.execute(
+            f"INSERT INTO decks ({_COLUMNS}, encoding, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(filename) DO UPDATE SET prompt = coalesce(excluded.prompt, prompt), "
+            "theme = coalesce(excluded.theme, theme), created = excluded.created, "
+            "num_slides = excluded.num_slides, raw_size = excluded.raw_size, "
+            "stored_size = excluded.stored_size, encoding = excluded.encoding, data = excluded.data",
+            (uuid.uuid4().hex[:16], filename, prompt, theme, created or time.time(),
+             len(slides_data), raw_size, len(data), ENCODING, data)
+        )
+        return db.execute('SELECT id FROM decks WHERE filename = ?', (filename,)).fetchone()['id']
+
+    def find(self, ref):
+        """Metadata of a deck by id or .pptx filename, or None"""
+        ref = os.path.basename(str(ref))
+        row = self._db().execute(
+            f"SELECT {_COLUMNS} FROM decks WHERE id = ? OR filename = ?", (ref, ref)
+        ).fetchone()
+        if row is None and ref.endswith('.pptx'):
+            return self._import_legacy(ref)
+        return dict(row) if row is not None else None
+
+    def save_render_options(self, ref, theme, image_paths):
+        """Record the theme and image paths a deck was rendered with"""
+        deck = self.find(ref)
+        if deck is None:
+            return
+        self._db().execute(
+            'UPDATE decks SET theme = ?, image_paths = ? WHERE id = ?',
+            (theme, json.dumps(image_paths) if image_paths is not None else None, deck['id'])
+        )
+
+    def render_options(self, ref):
+        """{'theme', 'image_paths'} of a deck's last render, or None for an unknown deck"""
+        deck = self.find(ref)
+        if deck is None:
+            return None
+        row = self._db().execute('SELECT image_paths FROM decks WHERE id = ?', (deck['id'],)).fetchone()
+        image_paths = json.loads(row['image_paths']) if row['image_paths'] else None
+        return {'theme': deck['theme'], 'image_paths': image_paths}
+
+    def load(self, ref):
+        """Slide data of a deck by id or .pptx filename, or None (shared; do not modify)"""
+        deck = self.find(ref)
+        if deck is None:
+            return None
+        return self._decoded(deck['id'], deck['created'])
+
+    def _read_slides(self, deck_id, created):
+        row = self._db().execute('SELECT encoding, data FROM decks WHERE id = ?', (deck_id,)).fetchone()
+        return decode_slides(row['data'], row['encoding']) if row is not None else None
+
+    def _import_legacy(self, filename):
+        """Import a deck saved as cache/<name>.json by an older version (the file is left in place)"""
+        legacy_path = os.path.join(self.legacy_dir, filename[:-len('.pptx')] + '.json')
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                slides_data = json.load(f)
+            created = os.path.getmtime(legacy_path)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(slides_data, list):
+            return None
+        options = {}
+        try:
+            with open(legacy_path[:-len('.json')] + '.render.json', 'r', encoding='utf-8') as f:
+                options = json.load(f)
+        except (OSError, ValueError):
+            pass
+        self.save(filename, slides_data, theme=options.get('theme'), created=created)
+        if options.get('image_paths') is not None:
+            self.save_render_options(filename, options.get('theme'), options['image_paths'])
+        row = self._db().execute(f"SELECT {_COLUMNS} FROM decks WHERE filename = ?", (filename,)).fetchone()
+        return dict(row)
+
+    def import_legacy(self):
+        """Import every legacy deck file not in the repository yet; returns how many were added"""
+        try:
+            names = os.listdir(self.legacy_dir)
+        except OSError:
+            return 0
+        known = {row['filename'] for row in self._db().execute('SELECT filename FROM decks')}
+        added = 0
+        for name in sorted(names):
+            if not name.endswith('.json') or name.endswith('.render.json'):
+                continue
+            filename = name[:-len('.json')] + '.pptx'
+            if filename not in known and self._import_legacy(filename):
+                added += 1
+        return added
+
+    def history(self, limit=20, cursor=None):
+        """
+        One page of decks, newest first, as (decks, next_cursor).
+
+        `cursor` is the next_cursor of the previous page; paging is keyset
+        based, so it stays cheap and stable while new decks are added.
+        """
+        if not self._legacy_imported:
+            self._legacy_imported = True
+            self.import_legacy()
+
+        limit = min(max(int(limit), 1), MAX_HISTORY_PAGE)
+        query = f"SELECT {_COLUMNS} FROM decks"
+        params = []
+        if cursor:
+            created, _, deck_id = cursor.partition(':')
+            query += " WHERE (created, id) < (?, ?)"
+            params += [float(created), deck_id]
+        query += " ORDER BY created DESC, id DESC LIMIT ?"
+        rows = [dict(row) for row in self._db().execute(query, params + [limit + 1])]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1]['created']!r}:{rows[-1]['id']}"
+        return rows, next_cursor
+
+    def usage(self):
+        """Deck count and raw vs stored bytes"""
+        row = self._db().execute(
+            'SELECT count(*) AS decks, coalesce(sum(raw_size), 0) AS raw_bytes, '
+            'coalesce(sum(stored_size), 0) AS stored_bytes FROM decks'
+        ).fetchone()
+        return dict(row)
@@ -0,0 +1,301 @@
+"""
+Diagram layout engine
+Each diagram type is a registered layout function that computes the geometry of
+every shape for (item count, box) once; the result is memoized and emitting a
+diagram only resolves theme colours, text and fitted font sizes. Shapes are not
+built through python-pptx one setter at a time: each element style is built
+once per theme as an XML template, then copied, patched and appended in bulk.
+"""
+
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+from slide_layout import label_size
+
+# kind: 'shape', 'textbox' or 'connector'
+# shape: MSO_SHAPE member name for shapes, connector type for connectors
+# box: (left, top, width, height) in inches, or (x1, y1, x2, y2) for connectors
+# fill / line / color: theme colour keys ('primary', 'secondary', 'accent', 'text', 'white')
+# slot: index of the diagram item shown in the shape; label formats it ("{n}" is slot + 1)
+Element = namedtuple('Element', [
+    'kind', 'shape', 'box', 'fill', 'line', 'line_width',
+    'slot', 'label', 'font_pt', 'bold', 'color', 'centered', 'margin'
+], defaults=(None, None, None, None, None, None, False, 'white', False, None))
+
+Layout = namedtuple('Layout', ['func', 'box', 'min_items', 'max_items'])
+
+LAYOUTS = {}
+
+WHITE = (255, 255, 255)
+CYCLE_COLORS = ('primary', 'secondary', 'accent')
+
+
+def register_layout(name, box, min_items=1, max_items=8):
+    """
+    Register a layout function under a diagram type name.
+
+    Items beyond max_items are dropped: diagram data comes from the model
+    unchecked, and past that count the shapes no longer fit the box.
+    """
+    def decorator(func):
+        LAYOUTS[name] = Layout(func, tuple(box), min_items, max_items)
+        return func
+    return decorator
+
+
+def get_layout(diagram_type, count, box):
+    """Geometry for a diagram type, item count and bounding box (count clamped to max_items)"""
+    return _layout(diagram_type, min(count, LAYOUTS[diagram_type].max_items), box)
+
+
+@lru_cache(maxsize=512)
+def _layout(diagram_type, count, box):
+    return tuple(LAYOUTS[diagram_type].func(count, *box))
+
+
+def item_text(item):
+    """Extract display text from a diagram item (plain string or dict)"""
+    if isinstance(item, dict):
+        return item.get('text', item.get('title', item.get('name', str(item))))
+    return str(item)
+
+
+ShapeTemplate = namedtuple('ShapeTemplate', ['element', 'paragraph', 'basename'])
+
+
+@lru_cache(maxsize=256)
+def shape_template(kind, shape, fill, line, line_width, labelled, margin, centered, bold, color, flip=(False, False)):
+    """
+    Styled shape XML for one element style in one theme, built once with python-pptx.
+
+    `element` is a p:sp / p:cxnSp at the origin with fill and line applied;
+    for labelled styles its text frame is set up but holds no paragraphs, and
+    `paragraph` is an empty a:p carrying the alignment, bold and colour of the
+    style (None otherwise). Callers deep-copy both.
+    """
+    from copy import deepcopy
+    from pptx.util import Inches, Pt
+    from pptx.enum.shapes import MSO_SHAPE, MSO_CONNECTOR_TYPE
+    from pptx.enum.text import PP_ALIGN
+    from pptx.oxml.ns import qn
+    from pptx.oxml.shapes.autoshape import CT_Shape
+    from pptx.oxml.shapes.connector import CT_Connector
+    from pptx.shapes.autoshape import AutoShapeType, Shape
+    from pptx.shapes.connector import Connector
+
+    if kind == 'connector':
+        element = CT_Connector.new_cxnSp(
+            0, '', MSO_CONNECTOR_TYPE.to_xml(shape), 0, 0, 0, 0, *flip
+        )
+        connector = Connector(element, None)
+        connector.line.color.rgb = line
+        connector.line.width = Pt(line_width)
+        return ShapeTemplate(element, None, 'Connector')
+
+    if kind == 'textbox':
+        element = CT_Shape.new_textbox_sp(0, '', 0, 0, 0, 0)
+        basename = 'TextBox'
+    else:
+        autoshape_type = AutoShapeType(getattr(MSO_SHAPE, shape))
+        element = CT_Shape.new_autoshape_sp(0, '', autoshape_type.prst, 0, 0, 0, 0)
+        basename = autoshape_type.basename
+    sp = Shape(element, None)
+    if kind == 'shape':
+        sp.fill.solid()
+        sp.fill.fore_color.rgb = fill
+        if line is not None:
+            sp.line.color.rgb = line
+        sp.line.width = Pt(line_width)
+    if not labelled:
+        return ShapeTemplate(element, None, basename)
+
+    text_frame = sp.text_frame
+    text_frame.text = ''
+    text_frame.word_wrap = True
+    if margin:
+        text_frame.margin_left = Inches(margin[0])
+        text_frame.margin_right = Inches(margin[0])
+    p = text_frame.paragraphs[0]
+    if centered:
+        p.alignment = PP_ALIGN.CENTER
+    # Placeholder size keeps sz ahead of b in defRPr, as python-pptx writes it
+    p.font.size = Pt(1)
+    if bold:
+        p.font.bold = True
+    p.font.color.rgb = color
+    paragraph = deepcopy(p._p)
+    for old in element.txBody.findall(qn('a:p')):
+        element.txBody.remove(old)
+    return ShapeTemplate(element, paragraph, basename)
+
+
+def render_diagram(slide, diagram_type, items, theme_config, box=None):
+    """
+    Add a diagram to the slide.
+
+    Shapes are deep-copied from cached per-theme templates (shape_template),
+    patched with id, position, text and font size, and appended to the
+    slide's shape tree in one batch. Returns False when the type is unknown
+    or there are too few items.
+    """
+    layout = LAYOUTS.get(diagram_type)
+    if layout is None or len(items) < layout.min_items:
+        return False
+
+    # python-pptx is only needed once a diagram is actually emitted
+    from copy import deepcopy
+    from pptx.util import Inches, Pt
+    from pptx.dml.color import RGBColor
+    from pptx.oxml.ns import qn
+
+    colors = dict(theme_config, white=RGBColor(*WHITE))
+
+    sp_tree = slide.shapes._spTree
+    shape_id = sp_tree.max_shape_id
+    texts = [item_text(item) for item in items[:layout.max_items]]
+    emitted = []
+    for element in get_layout(diagram_type, len(items), tuple(box or layout.box)):
+        shape_id += 1
+        if element.kind == 'connector':
+            x1, y1, x2, y2 = (Inches(value) for value in element.box)
+            template = shape_template(
+                'connector', element.shape, None, colors[element.line], element.line_width,
+                False, None, False, False, None, (x1 > x2, y1 > y2)
+            )
+            left, top, width, height = min(x1, x2), min(y1, y2), abs(x2 - x1), abs(y2 - y1)
+        else:
+            template = shape_template(
+                element.kind, element.shape, colors.get(element.fill), colors.get(element.line),
+                element.line_width, element.label is not None, element.margin, element.centered,
+                element.bold, colors[element.color]
+            )
+            left, top, width, height = (Inches(value) for value in element.box)
+
+        shape = deepcopy(template.element)
+        c_nv_pr = shape[0][0]
+        c_nv_pr.set('id', str(shape_id))
+        c_nv_pr.set('name', f"{template.basename} {shape_id - 1}")
+        shape.x, shape.y, shape.cx, shape.cy = left, top, width, height
+        emitted.append(shape)
+
+        if template.paragraph is None:
+            continue
+        text = element.label
+        if element.slot is not None:
+            text = element.label.format(n=element.slot + 1, text=texts[element.slot])
+        size = Pt(label_size(element, text)).centipoints
+        for line in text.split('\n'):
+            p = deepcopy(template.paragraph)
+            p.append_text(line)
+            p.pPr.defRPr.sz = size
+            shape.txBody.append(p)
+
+    ext_lst = sp_tree.find(qn('p:extLst'))
+    if ext_lst is None:
+        sp_tree.extend(emitted)
+    else:
+        for shape in emitted:
+            ext_lst.addprevious(shape)
+    return True
+
+
+@register_layout('flowchart', box=(1, 2, 8, 4.5), max_items=6)
+def flowchart_layout(count, left, top, width, height):
+    """Vertical boxes joined by connectors"""
+    box_height = 0.6
+    spacing = (height - box_height * count) / (count + 1)
+
+    for i in range(count):
+        y_pos = top + spacing + i * (box_height + spacing)
+        yield Element(
+            'shape', 'ROUNDED_RECTANGLE', (left, y_pos, width, box_height),
+            fill='primary' if i % 2 == 0 else 'secondary', line='accent', line_width=2,
+            slot=i, label='{text}', font_pt=16, bold=True, centered=True, margin=(0.2, 0.05)
+        )
+        if i < count - 1:
+            yield Element(
+                'connector', 2,
+                (left + width / 2, y_pos + box_height, left + width / 2, y_pos + box_height + spacing),
+                line='accent', line_width=3
+            )
+
+
+@register_layout('timeline', box=(1, 2.5, 8, 1.3), max_items=7)
+def timeline_layout(count, left, top, width, height):
+    """Horizontal line with circular markers and labels underneath"""
+    spacing = width / (count - 1) if count > 1 else width
+
+    yield Element('connector', 1, (left, top, left + width, top), line='primary', line_width=4)
+    for i in range(count):
+        x_pos = left + i * spacing
+        yield Element(
+            'shape', 'OVAL', (x_pos - 0.15, top - 0.15, 0.3, 0.3),
+            fill='accent', line='secondary', line_width=2
+        )
+        yield Element(
+            'textbox', None, (x_pos - 0.6, top + 0.3, 1.2, height - 0.3),
+            slot=i, label='{text}', font_pt=14, color='text', centered=True
+        )
+
+
+@register_layout('comparison', box=(0.5, 2, 9, 4.5), min_items=2, max_items=12)
+def comparison_layout(count, left, top, width, height):
+    """Two columns; the first half of the items goes left, the second half right"""
+    column_width = (width - 0.5) / 2
+    mid = count // 2
+    item_height = 0.5
+
+    for label, x_pos, fill in (("Option A", left, 'primary'),
+                               ("Option B", left + column_width + 0.5, 'secondary')):
+        yield Element(
+            'shape', 'ROUNDED_RECTANGLE', (x_pos, top, column_width, 0.6),
+            fill=fill, line_width=0, label=label, font_pt=20, bold=True, centered=True
+        )
+
+    for i in range(min(mid, count - mid, 6)):
+        y_pos = top + 0.8 + i * (item_height + 0.1)
+        for slot, x_pos in ((i, left + 0.2), (mid + i, left + column_width + 0.7)):
+            yield Element(
+                'textbox', None, (x_pos, y_pos, column_width - 0.4, item_height),
+                slot=slot, label='✓ {text}', font_pt=14, color='text'
+            )
+
+
+@register_layout('cycle', box=(3, 2, 4, 4), max_items=8)
+def cycle_layout(count, left, top, width, height):
+    """Circles placed clockwise around a ring, starting at the top"""
+    radius = min(width, height) / 2
+    center_x, center_y = left + width / 2, top + height / 2
+
+    def point(i, offset=0.0):
+        angle = (2 * math.pi * (i % count) / count) - (math.pi / 2)
+        return (center_x + radius * math.cos(angle) + offset * math.cos(angle),
+                center_y + radius * math.sin(angle) + offset * math.sin(angle))
+
+    for i in range(count):
+        x, y = point(i)
+        yield Element(
+            'shape', 'OVAL', (x - 0.6, y - 0.6, 1.2, 1.2),
+            fill=CYCLE_COLORS[i % len(CYCLE_COLORS)], line='text', line_width=2,
+            slot=i, label='{n}\n{text}', font_pt=12, bold=True, centered=True
+        )
+        if count > 1:
+            start_x, start_y = point(i, 0.6)
+            end_x, end_y = point(i + 1, -0.6)
+            yield Element('connector', 2, (start_x, start_y, end_x, end_y), line='accent', line_width=3)
+
+
+@register_layout('pyramid', box=(2, 2, 6, 4.5), max_items=6)
+def pyramid_layout(count, left, top, width, height):
+    """Stacked bars that widen towards the bottom"""
+    level_height = height / count
+
+    for i in range(count):
+        level_width = width * (count - i) / count
+        yield Element(
+            'shape', 'RECTANGLE',
+            (left + (width - level_width) / 2, top + i * level_height, level_width, level_height - 0.1),
+            fill=CYCLE_COLORS[i % len(CYCLE_COLORS)], line='white', line_width=2,
+            slot=i, label='{text}', font_pt=16, bold=True, centered=True
+        )
@@ -0,0 +1,216 @@
+"""
+Local stand-ins for Gemini, Unsplash and Pollinations, for load testing
+Each service answers like the real endpoint the app calls, after a latency
+drawn from a configurable distribution, and fails at a configurable rate
+(Gemini with 429 + Retry-After or 500, the image services with 503). Point
+the app at them through the printed environment variables:
+
+    python fake_services.py --gemini-latency lognormal:1.5,0.4 --image-latency uniform:0.05,0.3
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8701 UNSPLASH_BASE_URL=http://127.0.0.1:8702 \\
+        POLLINATIONS_BASE_URL=http://127.0.0.1:8703 python serve.py
+
+Latency specs: `fixed:S`, `uniform:LOW,HIGH`, `lognormal:MEDIAN,SIGMA`
+(seconds). Only the standard library and Pillow are used.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+
+WORDS = (
+    'strategy growth cloud data market team design security network energy '
+    'platform customer research model pipeline roadmap finance health city ocean'
+).split()
+
+DIAGRAMS = ('flowchart', 'timeline', 'cycle', 'pyramid', 'comparison')
+
+
+def parse_latency(spec):
+    """Sampler for a latency spec: fixed:S, uniform:LOW,HIGH or lognormal:MEDIAN,SIGMA"""
+    kind, _, args = spec.partition(':')
+    values = [float(value) for value in args.split(',') if value]
+    if kind == 'fixed':
+        return lambda: values[0]
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1])
+    if kind == 'lognormal':
+        median, sigma = values
+        return lambda: random.lognormvariate(math.log(median), sigma)
+    raise argparse.ArgumentTypeError(f"Unknown latency spec: {spec}")
+
+
+def fake_slides(prompt, num_slides):
+    """Deterministic slide JSON for a prompt, with image queries and diagrams"""
+    rng = random.Random(hashlib.sha256(prompt.encode('utf-8')).digest())
+    slides = []
+    for index in range(num_slides):
+        words = rng.sample(WORDS, 3)
+        slide = {
+            'title': ' '.join(words).title(),
+            'bullets': [f"{word.title()} drives {rng.choice(WORDS)} outcomes" for word in words],
+            'notes': f"Talk about {words[0]} and {words[1]}.",
+            'image_search': f"{words[0]} {words[1]}",
+            'ai_image_prompt': f"illustration of {words[0]} {words[2]}",
+        }
+        if index % 3 == 2:
+            slide['diagram'] = {'type': rng.choice(DIAGRAMS), 'data': rng.sample(WORDS, 4)}
+        slides.append(slide)
+    return {'slides': slides}
+
+
+class FakeService:
+    """One fake HTTP service: latency, error rate and a response function"""
+
+    def __init__(self, name, port, latency, error_rate):
+        self.name = name
+        self.port = port
+        self.latency = latency
+        self.error_rate = error_rate
+        self.stats = {'requests': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+    def count(self, error):
+        with self._lock:
+            self.stats['requests'] += 1
+            if error:
+                self.stats['errors'] += 1
+
+    def serve(self, handler):
+        server = ThreadingHTTPServer(('127.0.0.1', self.port), handler)
+        server.daemon_threads = True
+        server.service = self
+        threading.Thread(target=server.serve_forever, name=self.name, daemon=True).start()
+        return server
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def simulate(self):
+        """Sleep for the configured latency; True if this request should fail"""
+        time.sleep(self.service.latency())
+        failed = random.random() < self.service.error_rate
+        self.service.count(failed)
+        return failed
+
+
+class GeminiHandler(_Handler):
+    """POST /v1beta/models/<model>:generateContent"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if ':generateContent' not in self.path:
+            return self.reply(404, b'{}', 'application/json')
+        if self.simulate():
+            if random.random() < 0.5:
+                error = {'error': {'code': 429, 'message': 'Resource exhausted. Please retry in 2s', 'status': 'RESOURCE_EXHAUSTED'}}
+                return self.reply(429, json.dumps(error).encode(), 'application/json', {'Retry-After': '2'})
+            error = {'error': {'code': 500, 'message': 'Internal error', 'status': 'INTERNAL'}}
+            return self.reply(500, json.dumps(error).encode(), 'application/json')
+
+        request = json.loads(body or b'{}')
+        prompt = ' '.join(
+            part.get('text', '') for content in request.get('contents', []) for part in content.get('parts', [])
+        )
+        match = re.search(r'(\d+)\s+slides', prompt)
+        text = json.dumps(fake_slides(prompt, int(match.group(1)) if match else 8))
+        response = {
+            'candidates': [{
+                'content': {'parts': [{'text': text}], 'role': 'model'},
+                'finishReason': 'STOP',
+                'index': 0,
+            }],
+            'usageMetadata': {
+                'promptTokenCount': len(prompt) // 4,
+                'candidatesTokenCount': len(text) // 4,
+                'totalTokenCount': (len(prompt) + len(text)) // 4,
+            },
+        }
+        self.reply(200, json.dumps(response).encode(), 'application/json')
+
+
+class ImageHandler(_Handler):
+    """Unsplash source (/<w>x<h>/?query) and Pollinations (/prompt/<text>?width=&height=)"""
+
+    def do_GET(self):
+        parsed = urllib.parse.urlparse(self.path)
+        query = urllib.parse.parse_qs(parsed.query)
+        size = re.match(r'/(\d+)x(\d+)', parsed.path)
+        if size:
+            width, height = int(size.group(1)), int(size.group(2))
+        else:
+            width = int(query.get('width', ['800'])[0])
+            height = int(query.get('height', ['600'])[0])
+        if self.simulate():
+            return self.reply(503, b'Service Unavailable', 'text/plain')
+        self.reply(200, self.image(self.path, width, height), 'image/jpeg')
+
+    @staticmethod
+    def image(key, width, height):
+        from PIL import Image
+
+        digest = hashlib.md5(key.encode('utf-8')).digest()
+        buffer = BytesIO()
+        Image.new('RGB', (width, height), tuple(digest[:3])).save(buffer, 'JPEG', quality=80)
+        return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Gemini/Unsplash/Pollinations servers for load tests')
+    parser.add_argument('--port', type=int, default=8701, help='Gemini port; Unsplash and Pollinations use the next two')
+    parser.add_argument('--gemini-latency', type=parse_latency, default='lognormal:1.5,0.4')
+    parser.add_argument('--gemini-error-rate', type=float, default=0.0)
+    parser.add_argument('--image-latency', type=parse_latency, default='lognormal:0.3,0.5')
+    parser.add_argument('--image-error-rate', type=float, default=0.0)
+    parser.add_argument('--ai-image-latency', type=parse_latency, default='lognormal:3.0,0.5')
+    parser.add_argument('--ai-image-error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    base = args.port
+    services = [
+        (FakeService('gemini', base, args.gemini_latency, args.gemini_error_rate), GeminiHandler, 'GEMINI_API_ENDPOINT'),
+        (FakeService('unsplash', base + 1, args.image_latency, args.image_error_rate), ImageHandler, 'UNSPLASH_BASE_URL'),
+        (FakeService('pollinations', base + 2, args.ai_image_latency, args.ai_image_error_rate), ImageHandler, 'POLLINATIONS_BASE_URL'),
+    ]
+    for service, handler, _ in services:
+        service.serve(handler)
+
+    print("🧪 Fake services running; start the app with:")
+    print(' '.join(f"{env}=http://127.0.0.1:{service.port}" for service, _, env in services))
+    try:
+        while True:
+            time.sleep(10)
+            print('📊 ' + '  '.join(
+                f"{service.name}: {service.stats['requests']} req, {service.stats['errors']} err"
+                for service, _, _ in services
+            ))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
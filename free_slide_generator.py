@@ -1,192 +1,529 @@
 import os
 import json
-import requests
+import threading
 from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
-from pptx.dml.color import RGBColor
-from pptx.enum.shapes import MSO_SHAPE
 from dotenv import load_dotenv
-import google.generativeai as genai
 import hashlib
 import urllib.parse
 import time
+from functools import lru_cache
+from json_salvage import parse_slides, salvage_slides, build_repair_prompt, merge_repaired
+from prompt_builder import build_slide_prompt, build_slide_schema
+from diagram_engine import render_diagram
+from image_cache import ImageCache
+from deck_cache import DeckCache, deck_key, copy_atomic
+from image_variants import VariantCache
+from request_coalescing import SingleFlight, AsyncSingleFlight
+from deadline import Deadline, DeadlineExceeded
+from circuit_breaker import CircuitBreaker
+from negative_cache import NegativeCache, ImageRefresher
+from llm_scheduler import LLMScheduler, estimate_tokens, SMALL_DECK_SLIDES
+from profiling import stage as profile_stage
+from image_query_index import QueryIndex, normalize_query, normalize_prompt
+from outline_index import OutlineIndex, variant_key, shingles, jaccard
+from deck_repository import DeckRepository
+from text_fit import space_before, warm_up as warm_text_metrics
+from slide_layout import plan_slide, title_size, TITLE_BOX, RULE, RULE_PT, IMAGE_BOX
 
 load_dotenv()
 
+# Bump when create_presentation output changes so cached decks are not served
+RENDERER_VERSION = 1
+
+# External endpoints; override to point at stand-ins (see fake_services.py)
+GEMINI_API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT')
+UNSPLASH_BASE_URL = os.getenv('UNSPLASH_BASE_URL', 'https://source.unsplash.com').rstrip('/')
+POLLINATIONS_BASE_URL = os.getenv('POLLINATIONS_BASE_URL', 'https://image.pollinations.ai').rstrip('/')
+
+# Heavy dependencies (python-pptx, PIL, requests, google-generativeai) are
+# imported where they are first used, so `--help`, short-lived workers and
+# cached re-renders do not pay for the ones they never touch.
+
+
 class FreeSlideGenerator:
     """Free-tier slide generator using only free APIs"""
     
+    # Theme colours as (r, g, b); see theme_config() for the python-pptx form
     THEMES = {
         "modern_blue": {
             "name": "Modern Blue",
-            "primary": RGBColor(33, 150, 243),
-            "secondary": RGBColor(13, 71, 161),
-            "accent": RGBColor(255, 193, 7),
-            "background": RGBColor(250, 250, 250),
-            "text": RGBColor(33, 33, 33),
+            "primary": (33, 150, 243),
+            "secondary": (13, 71, 161),
+            "accent": (255, 193, 7),
+            "background": (250, 250, 250),
+            "text": (33, 33, 33),
         },
         "corporate_gray": {
             "name": "Corporate Gray",
-            "primary": RGBColor(66, 66, 66),
-            "secondary": RGBColor(33, 33, 33),
-            "accent": RGBColor(0, 188, 212),
-            "background": RGBColor(245, 245, 245),
-            "text": RGBColor(66, 66, 66),
+            "primary": (66, 66, 66),
+            "secondary": (33, 33, 33),
+            "accent": (0, 188, 212),
+            "background": (245, 245, 245),
+            "text": (66, 66, 66),
         },
         "creative_purple": {
             "name": "Creative Purple",
-            "primary": RGBColor(156, 39, 176),
-            "secondary": RGBColor(74, 20, 140),
-            "accent": RGBColor(255, 235, 59),
-            "background": RGBColor(252, 252, 252),
-            "text": RGBColor(33, 33, 33),
+            "primary": (156, 39, 176),
+            "secondary": (74, 20, 140),
+            "accent": (255, 235, 59),
+            "background": (252, 252, 252),
+            "text": (33, 33, 33),
         },
         "tech_dark": {
             "name": "Tech Dark",
-            "primary": RGBColor(0, 188, 212),
-            "secondary": RGBColor(0, 150, 136),
-            "accent": RGBColor(255, 64, 129),
-            "background": RGBColor(18, 18, 18),
-            "text": RGBColor(255, 255, 255),
+            "primary": (0, 188, 212),
+            "secondary": (0, 150, 136),
+            "accent": (255, 64, 129),
+            "background": (18, 18, 18),
+            "text": (255, 255, 255),
         },
         "elegant_gold": {
             "name": "Elegant Gold",
-            "primary": RGBColor(139, 116, 61),
-            "secondary": RGBColor(101, 84, 44),
-            "accent": RGBColor(255, 215, 0),
-            "background": RGBColor(255, 255, 255),
-            "text": RGBColor(51, 51, 51),
+            "primary": (139, 116, 61),
+            "secondary": (101, 84, 44),
+            "accent": (255, 215, 0),
+            "background": (255, 255, 255),
+            "text": (51, 51, 51),
         },
         "nature_green": {
             "name": "Nature Green",
-            "primary": RGBColor(76, 175, 80),
-            "secondary": RGBColor(27, 94, 32),
-            "accent": RGBColor(255, 193, 7),
-            "background": RGBColor(250, 250, 250),
-            "text": RGBColor(33, 33, 33),
+            "primary": (76, 175, 80),
+            "secondary": (27, 94, 32),
+            "accent": (255, 193, 7),
+            "background": (250, 250, 250),
+            "text": (33, 33, 33),
         },
         "vibrant_orange": {
             "name": "Vibrant Orange",
-            "primary": RGBColor(255, 87, 34),
-            "secondary": RGBColor(230, 74, 25),
-            "accent": RGBColor(255, 193, 7),
-            "background": RGBColor(255, 255, 255),
-            "text": RGBColor(33, 33, 33),
+            "primary": (255, 87, 34),
+            "secondary": (230, 74, 25),
+            "accent": (255, 193, 7),
+            "background": (255, 255, 255),
+            "text": (33, 33, 33),
         },
         "minimal_mono": {
             "name": "Minimal Monochrome",
-            "primary": RGBColor(0, 0, 0),
-            "secondary": RGBColor(97, 97, 97),
-            "accent": RGBColor(189, 189, 189),
-            "background": RGBColor(255, 255, 255),
-            "text": RGBColor(33, 33, 33),
+            "primary": (0, 0, 0),
+            "secondary": (97, 97, 97),
+            "accent": (189, 189, 189),
+            "background": (255, 255, 255),
+            "text": (33, 33, 33),
         },
         "sunset_gradient": {
             "name": "Sunset Gradient",
-            "primary": RGBColor(255, 94, 77),
-            "secondary": RGBColor(255, 145, 77),
-            "accent": RGBColor(255, 209, 102),
-            "background": RGBColor(255, 250, 245),
-            "text": RGBColor(51, 51, 51),
+            "primary": (255, 94, 77),
+            "secondary": (255, 145, 77),
+            "accent": (255, 209, 102),
+            "background": (255, 250, 245),
+            "text": (51, 51, 51),
         },
         "ocean_blue": {
             "name": "Ocean Blue",
-            "primary": RGBColor(3, 169, 244),
-            "secondary": RGBColor(1, 87, 155),
-            "accent": RGBColor(0, 188, 212),
-            "background": RGBColor(240, 248, 255),
-            "text": RGBColor(33, 33, 33),
+            "primary": (3, 169, 244),
+            "secondary": (1, 87, 155),
+            "accent": (0, 188, 212),
+            "background": (240, 248, 255),
+            "text": (33, 33, 33),
         }
     }
     
-    def __init__(self, gemini_api_key=None):
+    def __init__(self, gemini_api_key=None, structured_output=None, render_only=False, render_pool=None):
         self.gemini_api_key = gemini_api_key or os.getenv('GEMINI_API_KEY')
         
-        if not self.gemini_api_key:
+        # Render-only instances (e.g. render pool workers) never talk to Gemini
+        if not self.gemini_api_key and not render_only:
             raise ValueError("GEMINI_API_KEY not found")
         
-        genai.configure(api_key=self.gemini_api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        # Native JSON output with a response schema (set GEMINI_STRUCTURED_OUTPUT=0 to disable)
+        if structured_output is None:
+            structured_output = os.getenv('GEMINI_STRUCTURED_OUTPUT', '1') != '0'
+        self.structured_output = structured_output
+        
+        # The Gemini client and HTTP session are built on first use
+        self.render_only = render_only
+        self._model = None
+        self._http = None
+        self._ahttp = None
+        self._ahttp_loop = None
+        self._thumbnails = None
+        self._client_lock = threading.Lock()
+        
+        # Optional RenderPool that builds decks in worker processes
+        self.render_pool = render_pool
         
         self.cache_dir = "cache"
         self.image_cache_dir = "cache/images"
+        self.thumbnail_cache_dir = "cache/thumbnails"
         os.makedirs(self.cache_dir, exist_ok=True)
         os.makedirs(self.image_cache_dir, exist_ok=True)
+        self.image_cache = ImageCache(self.image_cache_dir)
+        # Normalized stock-photo queries of downloaded images, for near-duplicate reuse
+        self.query_index = QueryIndex(os.path.join(self.image_cache_dir, 'queries.jsonl'))
+        # Slide data and metadata of every generated deck (viewer, thumbnails, history)
+        self.decks = DeckRepository(
+            os.getenv('DECK_DB_PATH') or os.path.join(self.cache_dir, 'decks.sqlite3'), legacy_dir=self.cache_dir
+        )
+        # Outlines of generated decks, reused or used as seeds for near-identical requests
+        self.outline_index = OutlineIndex(os.path.join(self.cache_dir, 'outlines'))
+        # Resized WebP/JPEG variants of cached images for previews
+        self.image_variants = VariantCache(self.image_cache, os.path.join(self.cache_dir, 'variants'))
+        # Finished decks keyed on their content; identical concurrent renders run once
+        self.deck_cache = DeckCache(os.path.join(self.cache_dir, 'decks'))
+        self.render_flight = SingleFlight()
+        self._image_flight = AsyncSingleFlight()
+        # Every Gemini call in this process is paced and prioritized here
+        self.llm_scheduler = LLMScheduler()
+        # Recently failed images (skipped for a while, retried in the background)
+        self.failed_images = NegativeCache(os.path.join(self.image_cache_dir, 'failed'))
+        self.image_refresher = None
+        # Shared by every thread of this worker: an outage skips straight to the fallback
+        self.breakers = {
+            'unsplash': CircuitBreaker('Unsplash'),
+            'pollinations': CircuitBreaker('Pollinations'),
+        }
+    
+    @property
+    def model(self):
+        """Gemini model, configured the first time content actually has to be generated"""
+        if self._model is None and not self.render_only:
+            with self._client_lock:
+                if self._model is None:
+                    import google.generativeai as genai
+                    if GEMINI_API_ENDPOINT:
+                        genai.configure(api_key=self.gemini_api_key, transport='rest',
+                                        client_options={'api_endpoint': GEMINI_API_ENDPOINT})
+                    else:
+                        genai.configure(api_key=self.gemini_api_key)
+                    self._model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        return self._model
+    
+    @model.setter
+    def model(self, model):
+        self._model = model
     
-    def get_free_image(self, search_query, width=800, height=600):
+    @property
+    def http(self):
+        """Pooled keep-alive session for image providers (one per process)"""
+        if self._http is None:
+            with self._client_lock:
+                if self._http is None:
+                    import requests
+                    session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._http = session
+        return self._http
+    
+    @classmethod
+    @lru_cache(maxsize=None)
+    def theme_config(cls, theme):
+        """Theme with colours as python-pptx RGBColor values"""
+        from pptx.dml.color import RGBColor
+        return {
+            key: RGBColor(*value) if isinstance(value, tuple) else value
+            for key, value in cls.THEMES[theme].items()
+        }
+    
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def presentation_skeleton():
+        """Serialized blank 10x7.5in presentation, built once and reused for every deck"""
+        from pptx import Presentation
+        from pptx.util import Inches
+        
+        prs = Presentation()
+        prs.slide_width = Inches(10)
+        prs.slide_height = Inches(7.5)
+        buffer = BytesIO()
+        prs.save(buffer)
+        return buffer.getvalue()
+    
+    @classmethod
+    def warm_up(cls):
+        """Load fonts, image codecs and the deck skeleton before serving (e.g. before forking)"""
+        from PIL import Image
+        import diagram_engine  # noqa: F401 (python-pptx shape helpers)
+        
+        Image.init()
+        warm_text_metrics()
+        cls.presentation_skeleton()
+        for theme in cls.THEMES:
+            cls.theme_config(theme)
+    
+    def image_cache_path(self, query, width, height, ai=False):
+        """Location of the cached image for a stock-photo query or AI prompt (keyed on its normalized form)"""
+        if ai:
+            cache_key = hashlib.md5(f"ai_{normalize_prompt(query)}_{width}_{height}".encode()).hexdigest()
+            return os.path.join(self.image_cache_dir, f"ai_{cache_key}.jpg")
+        cache_key = hashlib.md5(f"{normalize_query(query)}_{width}_{height}".encode()).hexdigest()
+        return os.path.join(self.image_cache_dir, f"{cache_key}.jpg")
+    
+    def legacy_image_cache_path(self, query, width, height, ai=False):
+        """Cache location used before queries were normalized (raw query text)"""
+        if ai:
+            cache_key = hashlib.md5(f"ai_{query}_{width}_{height}".encode()).hexdigest()
+            return os.path.join(self.image_cache_dir, f"ai_{cache_key}.jpg")
+        cache_key = hashlib.md5(f"{query}_{width}_{height}".encode()).hexdigest()
+        return os.path.join(self.image_cache_dir, f"{cache_key}.jpg")
+    
+    def placeholder_image_path(self, text, width, height):
+        """Where a query's placeholder is kept (separate from its real image, which stays uncached)"""
+        cache_key = hashlib.md5(f"{text}_{width}_{height}".encode()).hexdigest()
+        return os.path.join(self.image_cache_dir, f"placeholder_{cache_key}.jpg")
+    
+    def find_cached_image(self, query, width, height, ai=False):
+        """
+        Look a query up in the image cache without fetching anything.
+        
+        Returns (path, outcome) where outcome is 'exact' for the normalized (or
+        legacy raw) key, 'fuzzy' for a similar stock-photo query from the
+        trigram index, or 'miss' with path None.
+        """
+        for path in (self.image_cache_path(query, width, height, ai),
+                     self.legacy_image_cache_path(query, width, height, ai)):
+            if self.image_cache.lookup(path):
+                return path, 'exact'
+        
+        if not ai:
+            match = self.query_index.find_similar(normalize_query(query), width, height)
+            if match:
+                path = os.path.join(self.image_cache_dir, match[0])
+                if self.image_cache.lookup(path):
+                    print(f"🔎 Reusing image for similar query ({match[1]:.2f}): {query}")
+                    return path, 'fuzzy'
+        return None, 'miss'
+    
+    def _record_lookup(self, outcome, report):
+        self.query_index.record(outcome)
+        if report is not None:
+            report[outcome] = report.get(outcome, 0) + 1
+    
+    def cached_slide_image(self, slide_data):
+        """Path of an already-cached image for a slide, without fetching anything"""
+        candidates = []
+        if slide_data.get('ai_image_prompt'):
+            candidates.append((slide_data['ai_image_prompt'], 1024, 768, True))
+            candidates.append((slide_data['ai_image_prompt'], 1024, 768, False))
+        if slide_data.get('image_search'):
+            candidates.append((slide_data['image_search'], 800, 600, False))
+        for query, width, height, ai in candidates:
+            path, _ = self.find_cached_image(query, width, height, ai)
+            if path:
+                return path
+        return None
+    
+    @staticmethod
+    def _spent_budget(error, deadline):
+        """
+        True if a request timed out because its timeout was clipped to a spent
+        time budget; that says nothing about the provider, so callers raise
+        DeadlineExceeded instead of counting a provider failure.
+        """
+        if deadline is None or not deadline.expired:
+            return False
+        import requests
+        timeouts = (requests.exceptions.Timeout,)
+        try:
+            import httpx
+            timeouts += (httpx.TimeoutException,)
+        except ImportError:
+            pass
+        return isinstance(error, timeouts)
+    
+    def _provider_get(self, provider, url, timeout, deadline=None):
+        """GET through the provider's circuit breaker (errors, 429 and 5xx count as failures)"""
+        breaker = self.breakers[provider]
+        try:
+            response = self.http.get(url, timeout=timeout)
+        except Exception as e:
+            if self._spent_budget(e, deadline):
+                raise DeadlineExceeded(f"Time budget spent during {provider} download") from e
+            breaker.record_failure()
+            raise
+        breaker.record(response.status_code < 500 and response.status_code != 429)
+        return response
+    
+    def fallback_placeholder(self, text, width, height):
+        """Placeholder for an image that failed or was skipped, created once per query"""
+        path = self.placeholder_image_path(text, width, height)
+        return self.image_cache.lookup(path) or self.create_placeholder_image(text, width, height, path)
+    
+    @staticmethod
+    def _encode_jpeg(content, **save_options):
+        """Decode downloaded image bytes and re-encode them as JPEG"""
+        from PIL import Image
+        img = Image.open(BytesIO(content))
+        buffer = BytesIO()
+        img.convert('RGB').save(buffer, 'JPEG', **save_options)
+        return buffer.getvalue()
+    
+    @staticmethod
+    def image_url(provider, query, width, height):
+        """Download URL of an image at one of the free providers"""
+        if provider == 'pollinations':
+            # Pollinations.ai - Free unlimited AI image generation!
+            encoded_prompt = urllib.parse.quote(query)
+            return f"{POLLINATIONS_BASE_URL}/prompt/{encoded_prompt}?width={width}&height={height}&nologo=true&enhance=true"
+        # Unsplash Source (No API key needed!)
+        encoded_query = urllib.parse.quote(query)
+        return f"{UNSPLASH_BASE_URL}/{width}x{height}/?{encoded_query}"
+    
+    def _download_image(self, provider, query, width, height, timeout, deadline=None):
+        """JPEG bytes of a freshly downloaded image, or None if the provider failed"""
+        response = self._provider_get(provider, self.image_url(provider, query, width, height), timeout, deadline)
+        if response.status_code != 200:
+            return None
+        if provider == 'pollinations':
+            return self._encode_jpeg(response.content, quality=95)
+        return self._encode_jpeg(response.content)
+    
+    def _record_failure(self, provider, query, width, height, cache_path):
+        """Remember a failed image so requests skip it for a while and the refresher retries it"""
+        self.failed_images.add(cache_path, {
+            'provider': provider, 'query': query, 'width': width, 'height': height,
+            'cache_path': cache_path
+        })
+    
+    def _record_success(self, provider, query, width, height, cache_path):
+        """Index a freshly cached image and forget any earlier failure"""
+        if provider == 'unsplash':
+            self.query_index.add(normalize_query(query), width, height, os.path.basename(cache_path))
+        self.failed_images.clear(cache_path)
+    
+    def get_free_image(self, search_query, width=800, height=600, report=None, deadline=None):
         """
         Get free images from Unsplash API (free tier: unlimited)
+        
+        `report`, if given, counts cache outcomes ('exact', 'fuzzy', 'miss').
+        Cached images are always used; a download raises DeadlineExceeded
+        once `deadline` is spent. Failures return a placeholder stored under
+        its own key and are retried by the background refresher.
         """
+        deadline = Deadline.coerce(deadline)
+        cache_path = self.image_cache_path(search_query, width, height)
         try:
-            # Check cache first
-            cache_key = hashlib.md5(f"{search_query}_{width}_{height}".encode()).hexdigest()
-            cache_path = os.path.join(self.image_cache_dir, f"{cache_key}.jpg")
+            # Check cache first (normalized query, then similar queries)
+            cached_path, outcome = self.find_cached_image(search_query, width, height)
+            self._record_lookup(outcome, report)
             
-            if os.path.exists(cache_path):
+            if cached_path:
                 print(f"✅ Using cached image for: {search_query}")
-                return cache_path
+                return cached_path
             
-            print(f"🔍 Searching free image: {search_query}")
-            
-            # Unsplash Source (No API key needed!)
-            encoded_query = urllib.parse.quote(search_query)
-            url = f"https://source.unsplash.com/{width}x{height}/?{encoded_query}"
+            deadline.check(f"image download for '{search_query}'")
+            if self.failed_images.is_failed(cache_path):
+                print(f"⏭️  Recent failure for: {search_query}, using placeholder")
+                return self.fallback_placeholder(search_query, width, height)
+            if not self.breakers['unsplash'].allow():
+                print(f"⚡ Unsplash circuit open, using placeholder for: {search_query}")
+                self._record_failure('unsplash', search_query, width, height, cache_path)
+                return self.fallback_placeholder(search_query, width, height)
             
-            response = requests.get(url, timeout=10)
+            def download():
+                print(f"🔍 Searching free image: {search_query}")
+                return self._download_image('unsplash', search_query, width, height, deadline.timeout(10), deadline)
             
-            if response.status_code == 200:
-                img = Image.open(BytesIO(response.content))
-                img.save(cache_path, 'JPEG')
+            # Concurrent requests for the same query share one download
+            if self.image_cache.get_or_create(cache_path, download):
+                self._record_success('unsplash', search_query, width, height, cache_path)
                 print(f"✅ Downloaded and cached image")
                 return cache_path
-            else:
-                print(f"⚠️  Image download failed, creating placeholder")
-                return self.create_placeholder_image(search_query, width, height, cache_path)
+            deadline.check(f"image download for '{search_query}'")
+            print(f"⚠️  Image download failed, creating placeholder")
                 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
+            deadline.check(f"image download for '{search_query}'")
             print(f"⚠️  Image fetch error: {e}, creating placeholder")
-            return self.create_placeholder_image(search_query, width, height, cache_path)
+        
+        self._record_failure('unsplash', search_query, width, height, cache_path)
+        return self.fallback_placeholder(search_query, width, height)
     
-    def generate_ai_image(self, prompt, width=800, height=600):
+    def generate_ai_image(self, prompt, width=800, height=600, report=None, deadline=None):
         """
         Generate AI images using Pollinations.ai (100% FREE - no API key needed!)
         """
+        deadline = Deadline.coerce(deadline)
+        cache_path = self.image_cache_path(prompt, width, height, ai=True)
         try:
             # Check cache first
-            cache_key = hashlib.md5(f"ai_{prompt}_{width}_{height}".encode()).hexdigest()
-            cache_path = os.path.join(self.image_cache_dir, f"ai_{cache_key}.jpg")
+            cached_path, outcome = self.find_cached_image(prompt, width, height, ai=True)
+            self._record_lookup(outcome, report)
             
-            if os.path.exists(cache_path):
+            if cached_path:
                 print(f"✅ Using cached AI image for: {prompt}")
-                return cache_path
-            
-            print(f"🎨 Generating AI image: {prompt}")
+                return cached_path
             
-            # Pollinations.ai - Free unlimited AI image generation!
-            encoded_prompt = urllib.parse.quote(prompt)
-            url = f"https://image.pollinations.ai/prompt/{encoded_prompt}?width={width}&height={height}&nologo=true&enhance=true"
+            deadline.check(f"AI image for '{prompt}'")
+            if self.failed_images.is_failed(cache_path):
+                print(f"⏭️  Recent AI image failure for: {prompt}, using stock image")
+                return self.get_free_image(prompt, width, height, report, deadline)
+            if not self.breakers['pollinations'].allow():
+                print(f"⚡ Pollinations circuit open, using stock image for: {prompt}")
+                self._record_failure('pollinations', prompt, width, height, cache_path)
+                return self.get_free_image(prompt, width, height, report, deadline)
             
-            response = requests.get(url, timeout=30)
+            def generate():
+                print(f"🎨 Generating AI image: {prompt}")
+                data = self._download_image('pollinations', prompt, width, height, deadline.timeout(30), deadline)
+                if data is not None:
+                    time.sleep(1)  # Be nice to the free API
+                return data
             
-            if response.status_code == 200:
-                img = Image.open(BytesIO(response.content))
-                img.save(cache_path, 'JPEG', quality=95)
+            if self.image_cache.get_or_create(cache_path, generate):
+                self._record_success('pollinations', prompt, width, height, cache_path)
                 print(f"✅ AI image generated and cached")
-                time.sleep(1)  # Be nice to the free API
                 return cache_path
-            else:
-                print(f"⚠️  AI image generation failed, using stock image instead")
-                return self.get_free_image(prompt, width, height)
+            print(f"⚠️  AI image generation failed, using stock image instead")
+            self._record_failure('pollinations', prompt, width, height, cache_path)
+            return self.get_free_image(prompt, width, height, report, deadline)
                 
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"⚠️  AI image error: {e}, using stock image instead")
-            return self.get_free_image(prompt, width, height)
+            self._record_failure('pollinations', prompt, width, height, cache_path)
+            return self.get_free_image(prompt, width, height, report, deadline)
+    
+    def refresh_failed_image(self, entry):
+        """
+        Retry one failed image off the request path (used by the ImageRefresher)
+        
+        Returns True once the real image is cached; a failure is recorded again.
+        """
+        provider = entry['provider']
+        query, width, height = entry['query'], entry['width'], entry['height']
+        cache_path = self.image_cache_path(query, width, height, ai=provider == 'pollinations')
+        if self.image_cache.lookup(cache_path):
+            self.failed_images.clear(cache_path)
+            return True
+        if not self.breakers[provider].allow():
+            return False
+        
+        try:
+            stored = self.image_cache.get_or_create(
+                cache_path, lambda: self._download_image(provider, query, width, height, 30)
+            )
+        except Exception:
+            stored = None
+        if not stored:
+            self._record_failure(provider, query, width, height, cache_path)
+            return False
+        self._record_success(provider, query, width, height, cache_path)
+        return True
+    
+    def start_image_refresher(self):
+        """Start the background thread that upgrades placeholders once providers recover"""
+        if self.image_refresher is None:
+            self.image_refresher = ImageRefresher(self.failed_images, self.refresh_failed_image)
+        return self.image_refresher.start()
     
     def create_placeholder_image(self, text, width, height, save_path):
         """Create a nice placeholder image with gradient and text"""
+        from PIL import Image, ImageDraw, ImageFont
+        
         img = Image.new('RGB', (width, height), color=(240, 240, 245))
         draw = ImageDraw.Draw(img)
         
@@ -229,591 +566,862 @@ class FreeSlideGenerator:
             draw.text((x, y_offset), line, fill=(255, 255, 255), font=font)
             y_offset += 50
         
-        img.save(save_path, 'JPEG')
-        return save_path
+        buffer = BytesIO()
+        img.save(buffer, 'JPEG')
+        return self.image_cache.store(save_path, buffer.getvalue())
     
     def create_flowchart(self, slide, steps, theme_config, left=1, top=2, width=8, height=4.5):
         """Create a professional flowchart diagram"""
-        # Extract text from items (handle both strings and dicts)
-        def extract_text(item):
-            if isinstance(item, dict):
-                return item.get('text', item.get('title', item.get('name', str(item))))
-            return str(item)
-        
-        num_steps = len(steps)
-        box_height = 0.6
-        spacing = (height - box_height * num_steps) / (num_steps + 1)
-        
-        for i, step in enumerate(steps):
-            y_pos = top + spacing + i * (box_height + spacing)
-            
-            # Add shape
-            shape = slide.shapes.add_shape(
-                MSO_SHAPE.ROUNDED_RECTANGLE,
-                Inches(left), Inches(y_pos),
-                Inches(width), Inches(box_height)
-            )
-            
-            # Style the shape
-            shape.fill.solid()
-            shape.fill.fore_color.rgb = theme_config['primary'] if i % 2 == 0 else theme_config['secondary']
-            shape.line.color.rgb = theme_config['accent']
-            shape.line.width = Pt(2)
-            
-            # Add text
-            text_frame = shape.text_frame
-            text_frame.text = extract_text(step)
-            text_frame.word_wrap = True
-            text_frame.margin_left = Inches(0.2)
-            text_frame.margin_right = Inches(0.2)
-            
-            p = text_frame.paragraphs[0]
-            p.alignment = PP_ALIGN.CENTER
-            p.font.size = Pt(16)
-            p.font.bold = True
-            p.font.color.rgb = RGBColor(255, 255, 255)
-            
-            # Add arrow to next step
-            if i < num_steps - 1:
-                arrow = slide.shapes.add_connector(
-                    2,  # Arrow connector
-                    Inches(left + width/2), Inches(y_pos + box_height),
-                    Inches(left + width/2), Inches(y_pos + box_height + spacing)
-                )
-                arrow.line.color.rgb = theme_config['accent']
-                arrow.line.width = Pt(3)
+        render_diagram(slide, 'flowchart', steps, theme_config, (left, top, width, height))
     
     def create_timeline(self, slide, events, theme_config, left=1, top=2.5, width=8):
         """Create a horizontal timeline"""
-        # Extract text from items (handle both strings and dicts)
-        def extract_text(item):
-            if isinstance(item, dict):
-                return item.get('text', item.get('title', item.get('name', str(item))))
-            return str(item)
-        
-        num_events = len(events)
-        spacing = width / (num_events - 1) if num_events > 1 else width
-        
-        # Draw main timeline line
-        line = slide.shapes.add_connector(
-            1,  # Straight line
-            Inches(left), Inches(top),
-            Inches(left + width), Inches(top)
-        )
-        line.line.color.rgb = theme_config['primary']
-        line.line.width = Pt(4)
-        
-        for i, event in enumerate(events):
-            x_pos = left + i * spacing
-            
-            # Add circle marker
-            circle = slide.shapes.add_shape(
-                MSO_SHAPE.OVAL,
-                Inches(x_pos - 0.15), Inches(top - 0.15),
-                Inches(0.3), Inches(0.3)
-            )
-            circle.fill.solid()
-            circle.fill.fore_color.rgb = theme_config['accent']
-            circle.line.color.rgb = theme_config['secondary']
-            circle.line.width = Pt(2)
-            
-            # Add event text
-            text_box = slide.shapes.add_textbox(
-                Inches(x_pos - 0.6), Inches(top + 0.3),
-                Inches(1.2), Inches(1)
-            )
-            text_frame = text_box.text_frame
-            text_frame.text = extract_text(event)
-            text_frame.word_wrap = True
-            
-            p = text_frame.paragraphs[0]
-            p.alignment = PP_ALIGN.CENTER
-            p.font.size = Pt(14)
-            p.font.color.rgb = theme_config['text']
+        render_diagram(slide, 'timeline', events, theme_config, (left, top, width, 1.3))
     
     def create_comparison(self, slide, left_items, right_items, theme_config, left=0.5, top=2, width=9, height=4.5):
         """Create a two-column comparison diagram"""
-        column_width = (width - 0.5) / 2
-        
-        # Extract text from items (handle both strings and dicts)
-        def extract_text(item):
-            if isinstance(item, dict):
-                return item.get('text', item.get('title', item.get('name', str(item))))
-            return str(item)
-        
-        # Left column header
-        left_header = slide.shapes.add_shape(
-            MSO_SHAPE.ROUNDED_RECTANGLE,
-            Inches(left), Inches(top),
-            Inches(column_width), Inches(0.6)
-        )
-        left_header.fill.solid()
-        left_header.fill.fore_color.rgb = theme_config['primary']
-        left_header.line.width = Pt(0)
-        
-        header_text = left_header.text_frame
-        header_text.text = "Option A"
-        p = header_text.paragraphs[0]
-        p.alignment = PP_ALIGN.CENTER
-        p.font.size = Pt(20)
-        p.font.bold = True
-        p.font.color.rgb = RGBColor(255, 255, 255)
-        
-        # Right column header
-        right_header = slide.shapes.add_shape(
-            MSO_SHAPE.ROUNDED_RECTANGLE,
-            Inches(left + column_width + 0.5), Inches(top),
-            Inches(column_width), Inches(0.6)
-        )
-        right_header.fill.solid()
-        right_header.fill.fore_color.rgb = theme_config['secondary']
-        right_header.line.width = Pt(0)
-        
-        header_text = right_header.text_frame
-        header_text.text = "Option B"
-        p = header_text.paragraphs[0]
-        p.alignment = PP_ALIGN.CENTER
-        p.font.size = Pt(20)
-        p.font.bold = True
-        p.font.color.rgb = RGBColor(255, 255, 255)
-        
-        # Add items
-        item_height = 0.5
-        max_items = min(len(left_items), len(right_items), 6)
-        
-        for i in range(max_items):
-            y_pos = top + 0.8 + i * (item_height + 0.1)
-            
-            # Left item
-            if i < len(left_items):
-                left_box = slide.shapes.add_textbox(
-                    Inches(left + 0.2), Inches(y_pos),
-                    Inches(column_width - 0.4), Inches(item_height)
-                )
-                tf = left_box.text_frame
-                tf.text = "✓ " + extract_text(left_items[i])
-                tf.word_wrap = True
-                p = tf.paragraphs[0]
-                p.font.size = Pt(14)
-                p.font.color.rgb = theme_config['text']
-            
-            # Right item
-            if i < len(right_items):
-                right_box = slide.shapes.add_textbox(
-                    Inches(left + column_width + 0.7), Inches(y_pos),
-                    Inches(column_width - 0.4), Inches(item_height)
-                )
-                tf = right_box.text_frame
-                tf.text = "✓ " + extract_text(right_items[i])
-                tf.word_wrap = True
-                p = tf.paragraphs[0]
-                p.font.size = Pt(14)
-                p.font.color.rgb = theme_config['text']
+        rows = min(len(left_items), len(right_items))
+        render_diagram(slide, 'comparison', list(left_items[:rows]) + list(right_items[:rows]),
+                       theme_config, (left, top, width, height))
     
     def create_cycle_diagram(self, slide, steps, theme_config, center_x=5, center_y=4, radius=2):
         """Create a circular cycle diagram"""
-        # Extract text from items (handle both strings and dicts)
-        def extract_text(item):
-            if isinstance(item, dict):
-                return item.get('text', item.get('title', item.get('name', str(item))))
-            return str(item)
-        
-        num_steps = len(steps)
-        import math
-        
-        for i, step in enumerate(steps):
-            # Calculate position on circle
-            angle = (2 * math.pi * i / num_steps) - (math.pi / 2)  # Start at top
-            x = center_x + radius * math.cos(angle)
-            y = center_y + radius * math.sin(angle)
-            
-            # Add circle
-            circle = slide.shapes.add_shape(
-                MSO_SHAPE.OVAL,
-                Inches(x - 0.6), Inches(y - 0.6),
-                Inches(1.2), Inches(1.2)
-            )
-            circle.fill.solid()
-            
-            # Alternate colors
-            colors = [theme_config['primary'], theme_config['secondary'], theme_config['accent']]
-            circle.fill.fore_color.rgb = colors[i % len(colors)]
-            circle.line.color.rgb = theme_config['text']
-            circle.line.width = Pt(2)
-            
-            # Add number and text
-            text_frame = circle.text_frame
-            step_text = extract_text(step)
-            text_frame.text = f"{i+1}\n{step_text}"
-            text_frame.word_wrap = True
-            
-            for paragraph in text_frame.paragraphs:
-                paragraph.alignment = PP_ALIGN.CENTER
-                paragraph.font.size = Pt(12)
-                paragraph.font.bold = True
-                paragraph.font.color.rgb = RGBColor(255, 255, 255)
-            
-            # Add arrow to next step
-            if num_steps > 1:
-                next_angle = (2 * math.pi * ((i + 1) % num_steps) / num_steps) - (math.pi / 2)
-                next_x = center_x + radius * math.cos(next_angle)
-                next_y = center_y + radius * math.sin(next_angle)
-                
-                # Arrow between circles
-                arrow_start_x = x + 0.6 * math.cos(angle)
-                arrow_start_y = y + 0.6 * math.sin(angle)
-                
-                arrow = slide.shapes.add_connector(
-                    2,  # Arrow
-                    Inches(arrow_start_x), Inches(arrow_start_y),
-                    Inches(next_x - 0.6 * math.cos(next_angle)), 
-                    Inches(next_y - 0.6 * math.sin(next_angle))
-                )
-                arrow.line.color.rgb = theme_config['accent']
-                arrow.line.width = Pt(3)
+        render_diagram(slide, 'cycle', steps, theme_config,
+                       (center_x - radius, center_y - radius, 2 * radius, 2 * radius))
     
     def create_pyramid(self, slide, levels, theme_config, left=2, top=2, width=6, height=4.5):
         """Create a pyramid diagram"""
-        # Extract text from items (handle both strings and dicts)
-        def extract_text(item):
-            if isinstance(item, dict):
-                return item.get('text', item.get('title', item.get('name', str(item))))
-            return str(item)
-        
-        num_levels = len(levels)
-        
-        for i, level in enumerate(levels):
-            level_height = height / num_levels
-            y_pos = top + i * level_height
-            
-            # Calculate trapezoid width (wider at bottom)
-            level_width = width * (num_levels - i) / num_levels
-            x_pos = left + (width - level_width) / 2
-            
-            # Add rectangle (approximating pyramid)
-            shape = slide.shapes.add_shape(
-                MSO_SHAPE.RECTANGLE,
-                Inches(x_pos), Inches(y_pos),
-                Inches(level_width), Inches(level_height - 0.1)
-            )
-            
-            # Style
-            shape.fill.solid()
-            colors = [theme_config['primary'], theme_config['secondary'], theme_config['accent']]
-            shape.fill.fore_color.rgb = colors[i % len(colors)]
-            shape.line.color.rgb = RGBColor(255, 255, 255)
-            shape.line.width = Pt(2)
-            
-            # Add text
-            text_frame = shape.text_frame
-            text_frame.text = extract_text(level)
-            text_frame.word_wrap = True
-            
-            p = text_frame.paragraphs[0]
-            p.alignment = PP_ALIGN.CENTER
-            p.font.size = Pt(16)
-            p.font.bold = True
-            p.font.color.rgb = RGBColor(255, 255, 255)
-    
-    def generate_slide_content(self, prompt, num_slides, style, audience, include_code, include_images, use_ai_images, theme="modern_blue"):
-        """Generate slide content using Gemini (100% free)"""
-        
-        extra_fields = []
-        if include_images:
-            if use_ai_images:
-                extra_fields.append('"ai_image_prompt": "detailed AI image generation prompt (e.g., professional 3D render of...)"')
-            else:
-                extra_fields.append('"image_search": "short search query for free stock photo"')
-        if include_code:
-            extra_fields.append('"code": "code example here"')
+        render_diagram(slide, 'pyramid', levels, theme_config, (left, top, width, height))
+    
+    def slide_generation_config(self, include_code, image_field):
+        """Generation config enforcing the slides schema, or None in plain-JSON mode"""
+        if not self.structured_output:
+            return None
+        return {
+            "response_mime_type": "application/json",
+            "response_schema": build_slide_schema(include_code=include_code, image_field=image_field)
+        }
+    
+    @staticmethod
+    def image_field(include_images, use_ai_images):
+        """Slide field carrying the image query or prompt, if images were requested"""
+        if not include_images:
+            return None
+        return 'ai_image_prompt' if use_ai_images else 'image_search'
+    
+    def slide_content_request(self, prompt, num_slides, style, audience, include_code, include_images, use_ai_images, theme="modern_blue", outline=None):
+        """Prompt and generation config for one slide-content request"""
+        image_field = self.image_field(include_images, use_ai_images)
         
-        # Add diagram support
-        extra_fields.append('"diagram": {"type": "flowchart/timeline/comparison/cycle/pyramid", "data": [...items...]} (optional, for visual diagrams)')
+        ai_prompt = build_slide_prompt(
+            prompt, num_slides, style, audience,
+            include_code=include_code,
+            image_field=image_field,
+            theme_name=self.THEMES[theme]["name"],
+            structured=self.structured_output,
+            outline=outline
+        )
+        return ai_prompt, self.slide_generation_config(include_code, image_field)
+    
+    def find_outline(self, prompt, num_slides, style, audience, include_code, include_images, use_ai_images, mode=None, report=None, outline_id=None, owner=None):
+        """
+        Look for an earlier deck close to this request.
         
-        json_example = '{' + ','.join([
-            '"title": "Slide Title"',
-            '"bullets": ["Point 1", "Point 2", "Point 3"]',
-            '"notes": "Speaker notes"'
-        ] + extra_fields) + '}'
+        Returns (slides, outline): the stored slides when they can be reused as
+        they are, else the titles of a close match to seed the prompt with (or
+        None). `report`, if a dict, receives the match details; in 'seed' mode
+        it flags a match close enough to reuse, so clients can offer it and
+        accept the offer by asking again with its `outline_id`. Only decks
+        generated for the same `owner` are matched, and the report never
+        carries the matched deck's prompt.
+        """
+        variant = variant_key(num_slides, include_code, self.image_field(include_images, use_ai_images), owner)
+        if outline_id and mode != 'off':
+            match, slides = self.outline_index.reuse(outline_id, variant)
+            if match is not None:
+                similarity = jaccard(shingles(prompt, style, audience), set(match['features']))
+                if report is not None:
+                    report.update({
+                        'action': 'reuse', 'similarity': round(similarity, 3), 'reusable': True,
+                        'outline_id': outline_id
+                    })
+                print(f"♻️  Reusing the requested earlier deck: {match['prompt'][:60]}")
+                return slides, None
+            print(f"⚠️  Outline {outline_id} is not available for this deck shape, generating")
+        action, match, similarity, slides = self.outline_index.lookup(prompt, style, audience, variant, mode)
+        if action is None:
+            return None, None
+        if report is not None:
+            report.update({
+                'action': action,
+                'similarity': round(similarity, 3),
+                'reusable': action == 'reuse' or similarity >= self.outline_index.reuse_threshold,
+                'outline_id': match['id']
+            })
+        if action == 'reuse':
+            print(f"♻️  Reusing a similar deck ({similarity:.0%} match): {match['prompt'][:60]}")
+            return slides, None
+        print(f"🌱 Seeding the outline from a similar deck ({similarity:.0%} match): {match['prompt'][:60]}")
+        return None, [slide.get('title', '') for slide in slides]
+    
+    def remember_outline(self, prompt, num_slides, style, audience, include_code, include_images, use_ai_images, slides, owner=None):
+        """Index a complete generated deck for later reuse by the same owner"""
+        if len(slides) != num_slides:
+            return
+        variant = variant_key(num_slides, include_code, self.image_field(include_images, use_ai_images), owner)
+        try:
+            self.outline_index.add(prompt, style, audience, variant, slides)
+        except OSError as e:
+            print(f"⚠️  Could not index outline: {e}")
+    
+    def generate_slide_content(self, prompt, num_slides, style, audience, include_code, include_images, use_ai_images, theme="modern_blue", report=None, deadline=None, priority="normal", outline_reuse=None, outline_report=None, reuse_outline=None, owner=None):
+        """
+        Generate slide content using Gemini (100% free)
         
-        ai_prompt = f'''Create a {num_slides}-slide presentation based on this prompt:
-
-{prompt}
-
-STYLE: {style}
-AUDIENCE: {audience or "General audience"}
-THEME: {self.THEMES[theme]["name"]}
-
-Generate {num_slides} slides in valid JSON format. Each slide should have:
-- title: Clear, engaging title
-- bullets: 3-5 concise bullet points
-- notes: Detailed speaker notes
-{"- ai_image_prompt: DETAILED descriptive prompt for AI image generation (be specific, describe style, mood, colors)" if include_images and use_ai_images else ""}
-{"- image_search: SHORT search query for free stock photos (2-4 words max)" if include_images and not use_ai_images else ""}
-{"- code: Relevant code example with proper syntax" if include_code else ""}
-- diagram: (optional) Visual diagram object with:
-  * type: "flowchart" (for processes), "timeline" (for chronological events), "comparison" (for pros/cons), 
-          "cycle" (for recurring processes), or "pyramid" (for hierarchies)
-  * data: Array of items/steps for the diagram
-
-Use diagrams strategically for:
-- Flowchart: Step-by-step processes, workflows
-- Timeline: Historical events, project phases, roadmaps
-- Comparison: Pros vs cons, before vs after, two options
-- Cycle: Iterative processes, life cycles, continuous improvement
-- Pyramid: Hierarchies, priorities, levels
-
-Return ONLY a JSON object like:
-{{
-  "slides": [
-    {json_example},
-    {json_example}
-  ]
-}}
-
-Make the content engaging, well-structured, and visually rich with diagrams where appropriate.
-{"For AI images, be very descriptive: 'professional 3D render of a modern office workspace, bright natural lighting, minimalist design, blue and white colors'" if use_ai_images else ""}
-Include at least 2-3 diagrams throughout the presentation for better visual engagement.'''
+        Malformed JSON is salvaged slide by slide; if `report` is a dict it
+        receives the salvage counts when that happens. The repair request is
+        skipped once `deadline` is spent. Calls wait for quota in the
+        scheduler's `priority` lane. A near-identical earlier deck seeds the
+        outline, or is reused as is when `outline_reuse` is 'auto' ('seed', 'off');
+        `reuse_outline` names a stored outline (an offered one) to reuse as is.
+        Earlier decks are only matched among those generated for `owner`.
+        """
+        reused, outline = self.find_outline(
+            prompt, num_slides, style, audience, include_code, include_images, use_ai_images, outline_reuse, outline_report,
+            reuse_outline, owner
+        )
+        if reused is not None:
+            return reused
+        ai_prompt, generation_config = self.slide_content_request(
+            prompt, num_slides, style, audience, include_code, include_images, use_ai_images, theme, outline
+        )
 
         try:
             print(f"🤖 Generating content with Gemini ({theme} theme)...")
-            response = self.model.generate_content(ai_prompt)
+            response = self._gemini(ai_prompt, generation_config, num_slides, deadline, priority)
+            content = response.text
             
-            # Clean and parse JSON
-            content = response.text.strip()
-            if content.startswith('```json'):
-                content = content[7:]
-            if content.startswith('```'):
-                content = content[3:]
-            if content.endswith('```'):
-                content = content[:-3]
-            content = content.strip()
+            try:
+                slides = parse_slides(content)
+            except (json.JSONDecodeError, ValueError) as e:
+                print(f"⚠️  JSON parsing error: {e}, salvaging well-formed slides")
+                print(f"Response content: {content[:500]}")
+                slides = self.salvage_slide_content(ai_prompt, content, num_slides, report, generation_config, deadline, priority)
             
-            data = json.loads(content)
+            print(f"✅ Generated {len(slides)} slides")
+            self.remember_outline(prompt, num_slides, style, audience, include_code, include_images, use_ai_images, slides, owner)
+            return slides
             
-            if "slides" not in data:
-                raise ValueError("Response missing 'slides' key")
-            
-            print(f"✅ Generated {len(data['slides'])} slides")
-            return data["slides"]
-            
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON parsing error: {e}")
-            print(f"Response content: {content[:500]}")
-            raise
         except Exception as e:
             print(f"❌ Error: {e}")
             raise
     
-    def create_presentation(self, slides_data, output_path, theme="modern_blue", use_images=False, use_ai_images=False):
-        """Create PowerPoint with diagrams, free images, and AI-generated images"""
+    def _gemini(self, prompt, generation_config, num_slides, deadline=None, priority="normal"):
+        """One generate_content call, paced by the LLM scheduler"""
+        return self.llm_scheduler.call(
+            lambda: self.model.generate_content(
+                prompt, generation_config=generation_config, **self._request_options(deadline)
+            ),
+            estimate_tokens(prompt, num_slides), priority, num_slides <= SMALL_DECK_SLIDES, deadline
+        )
+    
+    async def _agemini(self, prompt, generation_config, num_slides, deadline=None, priority="normal"):
+        """Async _gemini: waits for quota without blocking the event loop"""
+        import asyncio
+
+        # The first call imports and configures genai; keep that off the loop
+        model = self._model or await asyncio.to_thread(lambda: self.model)
+
+        def factory():
+            options = self._request_options(deadline)
+            if GEMINI_API_ENDPOINT:
+                # The REST transport (custom endpoint) has no async client
+                return asyncio.to_thread(model.generate_content, prompt, generation_config=generation_config, **options)
+            return model.generate_content_async(prompt, generation_config=generation_config, **options)
+
+        return await self.llm_scheduler.acall(
+            factory, estimate_tokens(prompt, num_slides), priority, num_slides <= SMALL_DECK_SLIDES, deadline
+        )
+    
+    @staticmethod
+    def _request_options(deadline):
+        """generate_content keyword arguments bounding the call by the deadline"""
+        deadline = Deadline.coerce(deadline)
+        deadline.check("content generation")
+        if not deadline.bounded:
+            return {}
+        return {'request_options': {'timeout': deadline.timeout(600)}}
+    
+    def salvage_slide_content(self, ai_prompt, content, num_slides, report=None, generation_config=None, deadline=None, priority="normal"):
+        """Keep every well-formed slide and ask Gemini to regenerate only the broken ones"""
+        slides = salvage_slides(content, expected=num_slides)
+        salvaged = sum(1 for slide in slides if slide is not None)
+        repaired = 0
+        print(f"🩹 Salvaged {salvaged}/{num_slides} slides from malformed response")
         
-        prs = Presentation()
-        prs.slide_width = Inches(10)
-        prs.slide_height = Inches(7.5)
+        if salvaged < num_slides and not Deadline.coerce(deadline).expired:
+            try:
+                print(f"🔁 Requesting {num_slides - salvaged} missing slides")
+                response = self._gemini(
+                    build_repair_prompt(ai_prompt, slides), generation_config, num_slides - salvaged, deadline, priority
+                )
+                repaired = merge_repaired(slides, salvage_slides(response.text, expected=num_slides - salvaged))
+                print(f"✅ Repaired {repaired}/{num_slides - salvaged} slides")
+            except Exception as e:
+                print(f"⚠️  Repair request failed: {e}")
+        
+        return self._finish_salvage(slides, salvaged, repaired, num_slides, report)
+    
+    @staticmethod
+    def _finish_salvage(slides, salvaged, repaired, num_slides, report):
+        slides = [slide for slide in slides if slide is not None]
+        if not slides:
+            raise ValueError("Could not recover any slides from the response")
+        
+        if report is not None:
+            report.update({'salvaged': salvaged, 'repaired': repaired, 'dropped': num_slides - len(slides)})
+        return slides
+    
+    def get_slide_image(self, slide_data, use_images=False, use_ai_images=False, report=None, deadline=None):
+        """Fetch (or reuse from cache) the image for a slide, if one was requested"""
+        if not use_images:
+            return None
+        if use_ai_images and slide_data.get('ai_image_prompt'):
+            return self.generate_ai_image(slide_data['ai_image_prompt'], 1024, 768, report, deadline)
+        if slide_data.get('image_search'):
+            return self.get_free_image(slide_data['image_search'], 800, 600, report, deadline)
+        return None
+    
+    def degraded_slide_image(self, slide_data, use_ai_images=False):
+        """Placeholder for a slide whose image fetch was skipped or cut short"""
+        if use_ai_images and slide_data.get('ai_image_prompt'):
+            text, width, height = slide_data['ai_image_prompt'], 1024, 768
+        else:
+            text, width, height = slide_data.get('image_search') or slide_data.get('title', ''), 800, 600
+        return self.fallback_placeholder(text, width, height)
+    
+    def collect_slide_images(self, slides_data, use_images=False, use_ai_images=False, report=None, deadline=None, degraded=None):
+        """
+        Fetch every slide's image up front; returns one path (or None) per slide
+        
+        Once `deadline` is spent, slides whose image is not cached get a
+        placeholder and their index is appended to `degraded`.
+        """
+        image_paths = []
+        for index, slide_data in enumerate(slides_data):
+            try:
+                image_paths.append(self.get_slide_image(slide_data, use_images, use_ai_images, report, deadline))
+            except DeadlineExceeded as e:
+                print(f"⏱️  {e}; slide {index + 1} gets a placeholder")
+                image_paths.append(self.degraded_slide_image(slide_data, use_ai_images))
+                if degraded is not None:
+                    degraded.append(index)
+        return image_paths
+    
+    def provider_stats(self):
+        """Circuit breaker state and counters per image provider"""
+        return {name: breaker.snapshot() for name, breaker in self.breakers.items()}
+    
+    def image_cache_stats(self):
+        """Image cache lookups and hit rates since this process started"""
+        return self.query_index.hit_rate()
+    
+    def create_presentation(self, slides_data, output_path, theme="modern_blue", use_images=False, use_ai_images=False, image_paths=None):
+        """
+        Create PowerPoint with diagrams, free images, and AI-generated images
         
-        theme_config = self.THEMES[theme]
+        If `image_paths` is given (one entry per slide) those images are used
+        and nothing is fetched.
+        """
+        
+        from pptx import Presentation
+        
+        prs = Presentation(BytesIO(self.presentation_skeleton()))
+        
+        theme_config = self.theme_config(theme)
         
         print(f"🎨 Creating presentation with {theme_config['name']} theme...")
         
         for idx, slide_data in enumerate(slides_data):
             print(f"📄 Processing slide {idx + 1}/{len(slides_data)}: {slide_data.get('title', 'Untitled')}")
             
-            # Create blank slide
-            blank_layout = prs.slide_layouts[6]
-            slide = prs.slides.add_slide(blank_layout)
-            
-            # Add background
-            background = slide.background
-            fill = background.fill
-            fill.solid()
-            fill.fore_color.rgb = theme_config['background']
-            
-            # Title
-            title_box = slide.shapes.add_textbox(
-                Inches(0.5), Inches(0.3), Inches(9), Inches(1)
-            )
-            title_frame = title_box.text_frame
-            title_frame.text = slide_data.get('title', 'Untitled')
-            
-            title_p = title_frame.paragraphs[0]
-            title_p.font.size = Pt(44)
-            title_p.font.bold = True
-            title_p.font.color.rgb = theme_config['primary']
-            
-            # Decorative line
-            line = slide.shapes.add_shape(
-                1,  # Line shape
-                Inches(0.5), Inches(1.4), Inches(9), Inches(0)
-            )
-            line.line.color.rgb = theme_config['accent']
-            line.line.width = Pt(3)
-            
-            # Check for diagram
-            has_diagram = 'diagram' in slide_data and slide_data['diagram']
-            
-            # Get image if requested
-            image_path = None
-            if use_images:
-                if use_ai_images and 'ai_image_prompt' in slide_data and slide_data['ai_image_prompt']:
-                    image_path = self.generate_ai_image(slide_data['ai_image_prompt'], 1024, 768)
-                elif 'image_search' in slide_data and slide_data['image_search']:
-                    image_path = self.get_free_image(slide_data['image_search'], 800, 600)
-            
-            # Layout logic
-            content_top = 1.7
-            content_left = 0.5
-            content_width = 9
-            has_image = image_path and os.path.exists(image_path)
-            
-            if has_diagram:
-                # Diagram takes center stage
-                diagram_data = slide_data['diagram']
-                diagram_type = diagram_data.get('type', 'flowchart')
-                diagram_items = diagram_data.get('data', [])
-                
-                print(f"  📊 Adding {diagram_type} diagram with {len(diagram_items)} items")
-                
-                # Add diagram based on type
-                if diagram_type == 'flowchart' and diagram_items:
-                    self.create_flowchart(slide, diagram_items, theme_config)
-                elif diagram_type == 'timeline' and diagram_items:
-                    self.create_timeline(slide, diagram_items, theme_config)
-                elif diagram_type == 'comparison' and len(diagram_items) >= 2:
-                    mid = len(diagram_items) // 2
-                    self.create_comparison(slide, diagram_items[:mid], diagram_items[mid:], theme_config)
-                elif diagram_type == 'cycle' and diagram_items:
-                    self.create_cycle_diagram(slide, diagram_items, theme_config)
-                elif diagram_type == 'pyramid' and diagram_items:
-                    self.create_pyramid(slide, diagram_items, theme_config)
-                
-                # Add bullets below or skip if diagram is main content
-                if slide_data.get('bullets') and len(slide_data['bullets']) <= 3:
-                    text_box = slide.shapes.add_textbox(
-                        Inches(0.5), Inches(6.2),
-                        Inches(9), Inches(1)
-                    )
-                    text_frame = text_box.text_frame
-                    text_frame.word_wrap = True
-                    
-                    for bullet in slide_data['bullets'][:3]:
-                        p = text_frame.add_paragraph()
-                        p.text = bullet
-                        p.level = 0
-                        p.font.size = Pt(14)
-                        p.font.color.rgb = theme_config['text']
-                
-            elif has_image:
-                # Two-column layout with image
-                content_width = 5.2
-                
-                try:
-                    slide.shapes.add_picture(
-                        image_path,
-                        Inches(5.5), Inches(content_top),
-                        width=Inches(4), height=Inches(4.5)
-                    )
-                    print(f"  🖼️  Added image: {os.path.basename(image_path)}")
-                except Exception as e:
-                    print(f"  ⚠️  Could not add image: {e}")
-                    content_width = 9
-                
-                # Content bullets
-                if slide_data.get('bullets'):
-                    text_box = slide.shapes.add_textbox(
-                        Inches(content_left), Inches(content_top),
-                        Inches(content_width), Inches(4.5)
-                    )
-                    text_frame = text_box.text_frame
-                    text_frame.word_wrap = True
-                    
-                    for bullet in slide_data['bullets']:
-                        p = text_frame.add_paragraph()
-                        p.text = bullet
-                        p.level = 0
-                        p.font.size = Pt(18)
-                        p.font.color.rgb = theme_config['text']
-                        p.space_before = Pt(12)
-            
+            if image_paths is not None:
+                image_path = image_paths[idx]
             else:
-                # Full-width content
-                if slide_data.get('bullets'):
-                    text_box = slide.shapes.add_textbox(
-                        Inches(content_left), Inches(content_top),
-                        Inches(content_width), Inches(4.5)
-                    )
-                    text_frame = text_box.text_frame
-                    text_frame.word_wrap = True
-                    
-                    for bullet in slide_data['bullets']:
-                        p = text_frame.add_paragraph()
-                        p.text = bullet
-                        p.level = 0
-                        p.font.size = Pt(22)
-                        p.font.color.rgb = theme_config['text']
-                        p.space_before = Pt(14)
+                image_path = self.get_slide_image(slide_data, use_images, use_ai_images)
+            with profile_stage(f"slide {idx + 1} layout"):
+                self.add_slide(prs, slide_data, theme_config, image_path)
+        
+        with profile_stage("prs.save"):
+            prs.save(output_path)
+        print(f"✅ Saved presentation: {output_path}")
+    
+    def deck_key(self, slides_data, theme, image_paths):
+        """Content hash of a deck: slide data, theme, placed images and renderer version"""
+        image_ids = [
+            self.image_cache.fingerprint(path) if path and os.path.exists(path) else None
+            for path in image_paths
+        ]
+        return deck_key(slides_data, theme, image_ids, RENDERER_VERSION)
+    
+    def render_deck(self, slides_data, output_path, theme="modern_blue", image_paths=None):
+        """
+        Write the deck to output_path, reusing an identical rendered deck if cached.
+        
+        Rendering runs in the render pool when one is configured.
+        """
+        if image_paths is None:
+            image_paths = [None] * len(slides_data)
+        key = self.deck_key(slides_data, theme, image_paths)
+        if self.deck_cache.get(key, output_path):
+            print(f"♻️  Reusing rendered deck {key[:12]} for {output_path}")
+            return output_path
+        
+        def render():
+            if self.render_pool:
+                self.render_pool.render(slides_data, output_path, theme, image_paths)
+            else:
+                self.create_presentation(slides_data, output_path, theme, image_paths=image_paths)
+            self.deck_cache.put(key, output_path)
+            return output_path
+        
+        rendered_path, shared = self.render_flight.do(key, render)
+        if shared and rendered_path != output_path:
+            copy_atomic(rendered_path, output_path)
+        return output_path
+    
+    def save_render_options(self, deck_ref, theme, image_paths):
+        """Record the theme and images a deck (id or .pptx filename) was rendered with"""
+        self.decks.save_render_options(deck_ref, theme, image_paths)
+    
+    def load_render_options(self, deck_ref):
+        """Theme and image paths of an earlier render of a deck (id or .pptx filename), or None"""
+        return self.decks.render_options(deck_ref)
+    
+    def add_slide(self, prs, slide_data, theme_config, image_path=None):
+        """
+        Add one slide to the presentation.
+        
+        Text is measured before it is placed: bullet and code font sizes shrink
+        to fit their boxes, and bullets that still overflow at the minimum size
+        continue on extra slides. Geometry comes from slide_layout.plan_slide,
+        shared with the thumbnail and HTML renderers.
+        """
+        from pptx.util import Inches
+        
+        title = slide_data.get('title', 'Untitled')
+        slide = self._new_slide(prs, title, theme_config)
+        
+        # Check for diagram
+        has_diagram = 'diagram' in slide_data and slide_data['diagram']
+        has_image = not has_diagram and image_path and os.path.exists(image_path)
+        
+        if has_diagram:
+            # Diagram takes center stage
+            diagram_data = slide_data['diagram']
+            diagram_type = diagram_data.get('type', 'flowchart')
+            diagram_items = diagram_data.get('data', [])
             
-            # Code block (if no diagram)
-            if not has_diagram and 'code' in slide_data and slide_data['code']:
-                code_top = 5.8 if has_image else 5.5
-                code_box = slide.shapes.add_textbox(
-                    Inches(content_left), Inches(code_top),
-                    Inches(content_width), Inches(1.5)
-                )
-                code_frame = code_box.text_frame
-                code_frame.text = slide_data['code']
-                
-                code_p = code_frame.paragraphs[0]
-                code_p.font.size = Pt(12)
-                code_p.font.name = "Courier New"
-                code_p.font.color.rgb = RGBColor(248, 248, 242)
-                
-                # Code background
-                code_fill = code_box.fill
-                code_fill.solid()
-                code_fill.fore_color.rgb = RGBColor(40, 42, 54)
+            print(f"  📊 Adding {diagram_type} diagram with {len(diagram_items)} items")
             
-            # Speaker notes
-            if slide_data.get('notes'):
-                notes_slide = slide.notes_slide
-                notes_frame = notes_slide.notes_text_frame
-                notes_frame.text = slide_data['notes']
+            # Add diagram using its registered layout
+            render_diagram(slide, diagram_type, diagram_items, theme_config)
         
-        prs.save(output_path)
-        print(f"✅ Saved presentation: {output_path}")
+        elif has_image:
+            # Two-column layout with image
+            try:
+                slide.shapes.add_picture(image_path, *(Inches(value) for value in IMAGE_BOX))
+                print(f"  🖼️  Added image: {os.path.basename(image_path)}")
+            except Exception as e:
+                print(f"  ⚠️  Could not add image: {e}")
+                has_image = False
+        
+        page, *overflow = plan_slide(slide_data, has_image)
+        if page.bullets:
+            self._add_bullets(slide, page.bullets, theme_config, page.bullet_box, page.bullet_pt, page.spaced)
+        if overflow:
+            print(f"  ✂️  Bullets overflow, continuing on {len(overflow)} more slide(s)")
+        
+        # Code block (if no diagram)
+        if page.code:
+            self._add_code(slide, page.code, page.code_box, page.code_pt)
+        
+        # Speaker notes
+        if slide_data.get('notes'):
+            notes_slide = slide.notes_slide
+            notes_frame = notes_slide.notes_text_frame
+            notes_frame.text = slide_data['notes']
+        
+        for page in overflow:
+            slide = self._new_slide(prs, page.title, theme_config)
+            self._add_bullets(slide, page.bullets, theme_config, page.bullet_box, page.bullet_pt, page.spaced)
     
-    def generate_presentation(self, prompt, num_slides, output_path, **options):
-        """Generate complete presentation - 100% FREE with diagrams and AI images"""
+    def _new_slide(self, prs, title, theme_config):
+        """Blank slide with themed background, fitted title and decorative line"""
+        from pptx.util import Inches, Pt
+        
+        blank_layout = prs.slide_layouts[6]
+        slide = prs.slides.add_slide(blank_layout)
+        
+        # Add background
+        background = slide.background
+        fill = background.fill
+        fill.solid()
+        fill.fore_color.rgb = theme_config['background']
+        
+        # Title
+        title_box = slide.shapes.add_textbox(*(Inches(value) for value in TITLE_BOX))
+        title_frame = title_box.text_frame
+        title_frame.text = title
+        title_frame.word_wrap = True
         
-        style = options.get('style', 'professional')
-        audience = options.get('audience', '')
-        include_code = options.get('include_code', False)
-        include_images = options.get('include_images', False)
-        use_ai_images = options.get('use_ai_images', False)  # NEW: AI-generated images
-        theme = options.get('theme', 'modern_blue')
+        title_p = title_frame.paragraphs[0]
+        title_p.font.size = Pt(title_size(title))
+        title_p.font.bold = True
+        title_p.font.color.rgb = theme_config['primary']
         
-        # Generate content (FREE - Gemini)
-        slides_data = self.generate_slide_content(
-            prompt, num_slides, style, audience, include_code, include_images, use_ai_images, theme
+        # Decorative line
+        left, top, width = RULE
+        line = slide.shapes.add_shape(
+            1,  # Line shape
+            Inches(left), Inches(top), Inches(width), Inches(0)
         )
+        line.line.color.rgb = theme_config['accent']
+        line.line.width = Pt(RULE_PT)
+        return slide
+    
+    def _add_bullets(self, slide, bullets, theme_config, box, size, spaced=True):
+        """Bullet list text box at a precomputed font size"""
+        from pptx.util import Inches, Pt
+        
+        left, top, width, height = box
+        text_box = slide.shapes.add_textbox(
+            Inches(left), Inches(top), Inches(width), Inches(height)
+        )
+        text_frame = text_box.text_frame
+        text_frame.word_wrap = True
+        
+        for i, bullet in enumerate(bullets):
+            p = text_frame.paragraphs[0] if i == 0 else text_frame.add_paragraph()
+            p.text = bullet
+            p.level = 0
+            p.font.size = Pt(size)
+            p.font.color.rgb = theme_config['text']
+            if spaced and i > 0:
+                p.space_before = Pt(space_before(size))
+    
+    def _add_code(self, slide, code, box, size):
+        """Dark code block in a monospace font at a precomputed size"""
+        from pptx.util import Inches, Pt
+        from pptx.dml.color import RGBColor
         
-        # Save slides data to cache
-        cache_filename = os.path.basename(output_path).replace('.pptx', '.json')
-        cache_path = os.path.join(self.cache_dir, cache_filename)
-        with open(cache_path, 'w', encoding='utf-8') as f:
-            json.dump(slides_data, f, indent=2, ensure_ascii=False)
+        left, top, width, height = box
+        code_box = slide.shapes.add_textbox(
+            Inches(left), Inches(top), Inches(width), Inches(height)
+        )
+        code_frame = code_box.text_frame
+        code_frame.text = code
+        code_frame.word_wrap = True
         
-        # Create presentation with FREE images and diagrams
-        self.create_presentation(slides_data, output_path, theme, include_images, use_ai_images)
+        for code_p in code_frame.paragraphs:
+            code_p.font.size = Pt(size)
+            code_p.font.name = "Courier New"
+            code_p.font.color.rgb = RGBColor(248, 248, 242)
         
+        # Code background
+        code_fill = code_box.fill
+        code_fill.solid()
+        code_fill.fore_color.rgb = RGBColor(40, 42, 54)
+    
+    @property
+    def thumbnails(self):
+        """Thumbnail cache (PIL is imported on first use)"""
+        if self._thumbnails is None:
+            with self._client_lock:
+                if self._thumbnails is None:
+                    from thumbnail_renderer import ThumbnailCache
+                    self._thumbnails = ThumbnailCache(self.thumbnail_cache_dir)
+        return self._thumbnails
+    
+    def open_thumbnail(self, slide_data, theme="modern_blue", width=480, fmt="png"):
+        """Open file of a cached PNG/WebP preview of one slide, rendered with PIL on a miss"""
+        return self.thumbnails.open(
+            slide_data, theme, self.THEMES[theme],
+            image_path=self.cached_slide_image(slide_data), width=width, fmt=fmt
+        )
+    
+    def slide_image_path(self, deck_ref, index, slides_data):
+        """Image placed on a slide of a rendered deck (or the cached one for it), or None"""
+        options = self.load_render_options(deck_ref) or {}
+        image_paths = options.get('image_paths')
+        if image_paths and index < len(image_paths):
+            path = image_paths[index]
+            return path if path and self.image_cache.lookup(path) else None
+        return self.cached_slide_image(slides_data[index])
+    
+    def export_html(self, slides_data, output_dir, theme="modern_blue", image_paths=None, title=None):
+        """
+        Write a static HTML bundle (index.html + assets/) for a deck.
+        
+        Defaults to the images already cached for each slide; returns the
+        path of index.html.
+        """
+        from html_export import export_html
+        
+        if image_paths is None:
+            image_paths = [self.cached_slide_image(slide_data) for slide_data in slides_data]
+        print(f"🌐 Exporting HTML bundle to {output_dir}")
+        return export_html(slides_data, self.THEMES[theme], output_dir, image_paths, title)
+    
+    @staticmethod
+    def presentation_options(options):
+        """generate_presentation keyword options with their defaults"""
+        return {
+            'style': options.get('style', 'professional'),
+            'audience': options.get('audience', ''),
+            'include_code': options.get('include_code', False),
+            'include_images': options.get('include_images', False),
+            'use_ai_images': options.get('use_ai_images', False),  # NEW: AI-generated images
+            'theme': options.get('theme', 'modern_blue'),
+            # Seconds (or a Deadline) bounding the whole generation; None = no limit
+            'deadline': Deadline.coerce(options.get('time_budget')),
+            # Scheduler lane for Gemini calls: 'interactive', 'normal' or 'batch'
+            'priority': options.get('priority', 'normal'),
+            # Reuse of similar earlier decks: 'seed', 'auto' or 'off' (None = OUTLINE_REUSE)
+            'outline_reuse': options.get('outline_reuse'),
+            # Id of a stored outline the client chose to reuse as is
+            'reuse_outline': options.get('reuse_outline'),
+            # User or tenant the deck is generated for; earlier decks are only matched within it
+            'owner': options.get('owner'),
+        }
+    
+    def save_slides_data(self, output_path, slides_data, prompt=None, theme=None):
+        """Save slides data to the deck repository (read by the viewer and thumbnail endpoints); returns the deck id"""
+        return self.decks.save(os.path.basename(output_path), slides_data, prompt, theme)
+    
+    @staticmethod
+    def _print_image_report(image_report, degraded, deadline):
+        if image_report:
+            hits = image_report.get('exact', 0) + image_report.get('fuzzy', 0)
+            print(f"🖼️  Image cache: {hits}/{sum(image_report.values())} hits "
+                  f"({image_report.get('fuzzy', 0)} similar-query reuses)")
+        if degraded:
+            print(f"⏱️  Time budget of {deadline.budget:g}s spent: "
+                  f"{len(degraded)} slide(s) use placeholder images")
+    
+    @staticmethod
+    def _presentation_result(output_path, slides_data, theme, salvage_report, image_report, degraded, deadline, outline_report=None, deck_id=None):
         return {
             'success': True,
             'output_path': output_path,
+            # Stable id of the deck in the deck repository
+            'deck_id': deck_id,
             'slides_data': slides_data,
             'theme': theme,
-            'num_slides': len(slides_data)
+            'num_slides': len(slides_data),
+            'salvage': salvage_report or None,
+            'image_cache': image_report or None,
+            # Indexes of slides that fell back to placeholders when the time budget ran out
+            'degraded_slides': degraded or None,
+            # Set when a similar earlier deck was reused or seeded the outline
+            'outline': outline_report or None,
+            'elapsed': round(deadline.elapsed(), 2)
         }
-
+    
+    def generate_presentation(self, prompt, num_slides, output_path, **options):
+        """Generate complete presentation - 100% FREE with diagrams and AI images"""
+        
+        opts = self.presentation_options(options)
+        theme = opts['theme']
+        deadline = opts['deadline']
+        
+        # Generate content (FREE - Gemini); without content there is no deck, so
+        # a spent budget raises DeadlineExceeded here
+        salvage_report = {}
+        outline_report = {}
+        with profile_stage("content generation"):
+            slides_data = self.generate_slide_content(
+                prompt, num_slides, opts['style'], opts['audience'], opts['include_code'],
+                opts['include_images'], opts['use_ai_images'], theme, report=salvage_report, deadline=deadline,
+                priority=opts['priority'], outline_reuse=opts['outline_reuse'], outline_report=outline_report,
+                reuse_outline=opts['reuse_outline'], owner=opts['owner']
+            )
+        deck_id = self.save_slides_data(output_path, slides_data, prompt, theme)
+        
+        # Fetch FREE images here (network-bound), then build the deck (CPU-bound, cached)
+        image_report = {}
+        degraded = []
+        with profile_stage("image acquisition"):
+            image_paths = self.collect_slide_images(
+                slides_data, opts['include_images'], opts['use_ai_images'], image_report, deadline, degraded
+            )
+        self._print_image_report(image_report, degraded, deadline)
+        with profile_stage("render"):
+            self.render_deck(slides_data, output_path, theme, image_paths)
+        self.save_render_options(deck_id, theme, image_paths)
+        
+        return self._presentation_result(
+            output_path, slides_data, theme, salvage_report, image_report, degraded, deadline, outline_report, deck_id
+        )
+    
+    # ----------------------------------------------------------------------
+    # asyncio API: the same pipeline and caches, with Gemini and image
+    # downloads awaited on the running event loop and CPU-bound work (JPEG
+    # encoding, placeholders, rendering) offloaded to worker threads.
+    # ----------------------------------------------------------------------
+    
+    def _async_client(self):
+        """httpx.AsyncClient for the running loop, or None when httpx is not installed"""
+        import asyncio
+        try:
+            import httpx
+        except ImportError:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._ahttp is None or self._ahttp_loop is not loop or self._ahttp.is_closed:
+            self._ahttp = httpx.AsyncClient(
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+            )
+            self._ahttp_loop = loop
+        return self._ahttp
+    
+    async def _aget(self, url, timeout):
+        """GET on the event loop (httpx), or on a thread with the requests session"""
+        import asyncio
+        client = self._async_client()
+        if client is None:
+            return await asyncio.to_thread(self.http.get, url, timeout=timeout)
+        return await client.get(url, timeout=timeout)
+    
+    async def aclose(self):
+        """Close the async HTTP client"""
+        if self._ahttp is not None:
+            await self._ahttp.aclose()
+            self._ahttp = None
+    
+    async def _afetch_image(self, provider, cache_path, query, width, height, timeout, deadline=None):
+        """Download, re-encode and store one image; True if it was cached"""
+        import asyncio
+        breaker = self.breakers[provider]
+        url = self.image_url(provider, query, width, height)
+        save_options = {'quality': 95} if provider == 'pollinations' else {}
+        
+        async def download():
+            try:
+                response = await self._aget(url, timeout)
+            except Exception as e:
+                if self._spent_budget(e, deadline):
+                    raise DeadlineExceeded(f"Time budget spent during {provider} download") from e
+                breaker.record_failure()
+                raise
+            breaker.record(response.status_code < 500 and response.status_code != 429)
+            if response.status_code != 200:
+                return False
+            data = await asyncio.to_thread(self._encode_jpeg, response.content, **save_options)
+            await asyncio.to_thread(self.image_cache.put_if_absent, cache_path, data)
+            return True
+        
+        # Coroutines asking for the same image share one download
+        stored, _ = await self._image_flight.do(cache_path, download)
+        return stored
+    
+    async def aget_free_image(self, search_query, width=800, height=600, report=None, deadline=None):
+        """Async get_free_image: same cache keys, similar-query reuse, placeholders and deadline"""
+        import asyncio
+        deadline = Deadline.coerce(deadline)
+        cache_path = self.image_cache_path(search_query, width, height)
+        try:
+            # Index lookups, stats and lock files stay off the event loop
+            cached_path, outcome = await asyncio.to_thread(self.find_cached_image, search_query, width, height)
+            self._record_lookup(outcome, report)
+            if cached_path:
+                print(f"✅ Using cached image for: {search_query}")
+                return cached_path
+            
+            deadline.check(f"image download for '{search_query}'")
+            if await asyncio.to_thread(self.failed_images.is_failed, cache_path):
+                print(f"⏭️  Recent failure for: {search_query}, using placeholder")
+                return await asyncio.to_thread(self.fallback_placeholder, search_query, width, height)
+            if not self.breakers['unsplash'].allow():
+                print(f"⚡ Unsplash circuit open, using placeholder for: {search_query}")
+                await asyncio.to_thread(self._record_failure, 'unsplash', search_query, width, height, cache_path)
+                return await asyncio.to_thread(self.fallback_placeholder, search_query, width, height)
+            print(f"🔍 Searching free image: {search_query}")
+            if await self._afetch_image('unsplash', cache_path, search_query, width, height, deadline.timeout(10), deadline):
+                await asyncio.to_thread(self._record_success, 'unsplash', search_query, width, height, cache_path)
+                print(f"✅ Downloaded and cached image")
+                return cache_path
+            deadline.check(f"image download for '{search_query}'")
+            print(f"⚠️  Image download failed, creating placeholder")
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            deadline.check(f"image download for '{search_query}'")
+            print(f"⚠️  Image fetch error: {e}, creating placeholder")
+        await asyncio.to_thread(self._record_failure, 'unsplash', search_query, width, height, cache_path)
+        return await asyncio.to_thread(self.fallback_placeholder, search_query, width, height)
+    
+    async def agenerate_ai_image(self, prompt, width=800, height=600, report=None, deadline=None):
+        """Async generate_ai_image, falling back to a stock image like the sync path"""
+        import asyncio
+        deadline = Deadline.coerce(deadline)
+        cache_path = self.image_cache_path(prompt, width, height, ai=True)
+        try:
+            cached_path, outcome = await asyncio.to_thread(self.find_cached_image, prompt, width, height, True)
+            self._record_lookup(outcome, report)
+            if cached_path:
+                print(f"✅ Using cached AI image for: {prompt}")
+                return cached_path
+            
+            deadline.check(f"AI image for '{prompt}'")
+            if await asyncio.to_thread(self.failed_images.is_failed, cache_path):
+                print(f"⏭️  Recent AI image failure for: {prompt}, using stock image")
+                return await self.aget_free_image(prompt, width, height, report, deadline)
+            if not self.breakers['pollinations'].allow():
+                print(f"⚡ Pollinations circuit open, using stock image for: {prompt}")
+                await asyncio.to_thread(self._record_failure, 'pollinations', prompt, width, height, cache_path)
+                return await self.aget_free_image(prompt, width, height, report, deadline)
+            print(f"🎨 Generating AI image: {prompt}")
+            if await self._afetch_image('pollinations', cache_path, prompt, width, height, deadline.timeout(30), deadline):
+                await asyncio.to_thread(self._record_success, 'pollinations', prompt, width, height, cache_path)
+                print(f"✅ AI image generated and cached")
+                await asyncio.sleep(1)  # Be nice to the free API
+                return cache_path
+            print(f"⚠️  AI image generation failed, using stock image instead")
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"⚠️  AI image error: {e}, using stock image instead")
+        await asyncio.to_thread(self._record_failure, 'pollinations', prompt, width, height, cache_path)
+        return await self.aget_free_image(prompt, width, height, report, deadline)
+    
+    async def aget_slide_image(self, slide_data, use_images=False, use_ai_images=False, report=None, deadline=None):
+        if not use_images:
+            return None
+        if use_ai_images and slide_data.get('ai_image_prompt'):
+            return await self.agenerate_ai_image(slide_data['ai_image_prompt'], 1024, 768, report, deadline)
+        if slide_data.get('image_search'):
+            return await self.aget_free_image(slide_data['image_search'], 800, 600, report, deadline)
+        return None
+    
+    async def acollect_slide_images(self, slides_data, use_images=False, use_ai_images=False, report=None, deadline=None, degraded=None):
+        """
+        Fetch every slide's image concurrently; returns one path (or None) per slide
+        
+        Fetches still running when `deadline` expires are cancelled (a shared
+        download keeps going and lands in the cache for later requests) and
+        those slides get placeholders, like in collect_slide_images.
+        """
+        import asyncio
+        deadline = Deadline.coerce(deadline)
+        tasks = [
+            asyncio.ensure_future(self.aget_slide_image(slide_data, use_images, use_ai_images, report, deadline))
+            for slide_data in slides_data
+        ]
+        if not tasks:
+            return []
+        await asyncio.wait(tasks, timeout=deadline.remaining())
+        
+        image_paths = []
+        for index, (slide_data, task) in enumerate(zip(slides_data, tasks)):
+            if task.done() and not isinstance(task.exception(), DeadlineExceeded):
+                image_paths.append(task.result())
+                continue
+            task.cancel()
+            print(f"⏱️  Time budget spent; slide {index + 1} gets a placeholder")
+            image_paths.append(await asyncio.to_thread(self.degraded_slide_image, slide_data, use_ai_images))
+            if degraded is not None:
+                degraded.append(index)
+        return image_paths
+    
+    async def agenerate_slide_content(self, prompt, num_slides, style, audience, include_code, include_images, use_ai_images, theme="modern_blue", report=None, deadline=None, priority="normal", outline_reuse=None, outline_report=None, reuse_outline=None, owner=None):
+        """Async generate_slide_content (awaits Gemini instead of blocking a thread)"""
+        import asyncio
+        
+        reused, outline = await asyncio.to_thread(
+            self.find_outline, prompt, num_slides, style, audience, include_code, include_images, use_ai_images,
+            outline_reuse, outline_report, reuse_outline, owner
+        )
+        if reused is not None:
+            return reused
+        ai_prompt, generation_config = self.slide_content_request(
+            prompt, num_slides, style, audience, include_code, include_images, use_ai_images, theme, outline
+        )
+        try:
+            print(f"🤖 Generating content with Gemini ({theme} theme)...")
+            response = await self._agemini(ai_prompt, generation_config, num_slides, deadline, priority)
+            content = response.text
+            
+            try:
+                slides = parse_slides(content)
+            except (json.JSONDecodeError, ValueError) as e:
+                print(f"⚠️  JSON parsing error: {e}, salvaging well-formed slides")
+                slides = await self.asalvage_slide_content(ai_prompt, content, num_slides, report, generation_config, deadline, priority)
+            
+            print(f"✅ Generated {len(slides)} slides")
+            await asyncio.to_thread(
+                self.remember_outline, prompt, num_slides, style, audience, include_code, include_images, use_ai_images, slides, owner
+            )
+            return slides
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            raise
+    
+    async def asalvage_slide_content(self, ai_prompt, content, num_slides, report=None, generation_config=None, deadline=None, priority="normal"):
+        slides = salvage_slides(content, expected=num_slides)
+        salvaged = sum(1 for slide in slides if slide is not None)
+        repaired = 0
+        print(f"🩹 Salvaged {salvaged}/{num_slides} slides from malformed response")
+        
+        if salvaged < num_slides and not Deadline.coerce(deadline).expired:
+            try:
+                print(f"🔁 Requesting {num_slides - salvaged} missing slides")
+                response = await self._agemini(
+                    build_repair_prompt(ai_prompt, slides), generation_config, num_slides - salvaged, deadline, priority
+                )
+                repaired = merge_repaired(slides, salvage_slides(response.text, expected=num_slides - salvaged))
+                print(f"✅ Repaired {repaired}/{num_slides - salvaged} slides")
+            except Exception as e:
+                print(f"⚠️  Repair request failed: {e}")
+        
+        return self._finish_salvage(slides, salvaged, repaired, num_slides, report)
+    
+    async def arender_deck(self, slides_data, output_path, theme="modern_blue", image_paths=None):
+        """render_deck on a worker thread (the render pool, if any, still does the work)"""
+        import asyncio
+        return await asyncio.to_thread(self.render_deck, slides_data, output_path, theme, image_paths)
+    
+    async def agenerate_presentation(self, prompt, num_slides, output_path, **options):
+        """Async generate_presentation with the same options, caches and result"""
+        import asyncio
+        
+        opts = self.presentation_options(options)
+        theme = opts['theme']
+        deadline = opts['deadline']
+        
+        salvage_report = {}
+        outline_report = {}
+        slides_data = await self.agenerate_slide_content(
+            prompt, num_slides, opts['style'], opts['audience'], opts['include_code'],
+            opts['include_images'], opts['use_ai_images'], theme, report=salvage_report, deadline=deadline,
+            priority=opts['priority'], outline_reuse=opts['outline_reuse'], outline_report=outline_report,
+            reuse_outline=opts['reuse_outline'], owner=opts['owner']
+        )
+        deck_id = await asyncio.to_thread(self.save_slides_data, output_path, slides_data, prompt, theme)
+        
+        image_report = {}
+        degraded = []
+        image_paths = await self.acollect_slide_images(
+            slides_data, opts['include_images'], opts['use_ai_images'], image_report, deadline, degraded
+        )
+        self._print_image_report(image_report, degraded, deadline)
+        await self.arender_deck(slides_data, output_path, theme, image_paths)
+        await asyncio.to_thread(self.save_render_options, deck_id, theme, image_paths)
+        
+        return self._presentation_result(
+            output_path, slides_data, theme, salvage_report, image_report, degraded, deadline, outline_report, deck_id
+        )
 
 if __name__ == "__main__":
     import argparse
@@ -828,24 +1436,53 @@ if __name__ == "__main__":
     parser.add_argument('--code', action='store_true', help='Include code examples')
     parser.add_argument('--images', action='store_true', help='Include stock images')
     parser.add_argument('--ai-images', action='store_true', help='Use AI-generated images instead of stock photos')
+    parser.add_argument('--html', metavar='DIR', help='Also export a static HTML bundle to DIR')
+    parser.add_argument('--time-budget', type=float, metavar='SECONDS',
+                        help='Stop fetching images after this long and use placeholders')
+    parser.add_argument('--outline-reuse', choices=['auto', 'seed', 'off'],
+                        help="Seed from similar earlier decks, or with 'auto' also reuse near-identical ones as is (default: OUTLINE_REUSE or seed)")
+    parser.add_argument('--profile', nargs='?', const='profile', metavar='DIR',
+                        help='Write per-stage timings, memory peaks and sampled stacks to DIR (default: profile/)')
     
     args = parser.parse_args()
     
     generator = FreeSlideGenerator()
     
-    result = generator.generate_presentation(
-        args.prompt,
-        args.slides,
-        args.output,
-        style=args.style,
-        audience=args.audience,
-        include_code=args.code,
-        include_images=args.images or args.ai_images,
-        use_ai_images=args.ai_images,
-        theme=args.theme
-    )
+    profiler = None
+    if args.profile:
+        from profiling import Profiler
+        # Profile a real render rather than a copy from the deck cache
+        generator.deck_cache.max_bytes = 0
+        profiler = Profiler(args.profile).start()
+    
+    try:
+        result = generator.generate_presentation(
+            args.prompt,
+            args.slides,
+            args.output,
+            style=args.style,
+            audience=args.audience,
+            include_code=args.code,
+            include_images=args.images or args.ai_images,
+            use_ai_images=args.ai_images,
+            theme=args.theme,
+            time_budget=args.time_budget,
+            outline_reuse=args.outline_reuse
+        )
+    finally:
+        if profiler:
+            profiler.stop()
+            print(f"\n📈 Profile ({args.profile}/stages.json, {args.profile}/stacks.folded):")
+            print(profiler.summary())
     
     print(f"\n🎉 Success! Created {result['num_slides']} slides with {result['theme']} theme")
     print(f"📁 Saved to: {result['output_path']}")
+    if result['degraded_slides']:
+        print(f"⏱️  Placeholder images on slides: {', '.join(str(i + 1) for i in result['degraded_slides'])}")
+    if args.html:
+        options = generator.load_render_options(result['deck_id']) or {}
+        html_path = generator.export_html(result['slides_data'], args.html, result['theme'],
+                                          options.get('image_paths'))
+        print(f"🌐 HTML bundle: {html_path}")
     print(f"✨ Features: Diagrams, {'AI Images' if args.ai_images else 'Stock Photos' if args.images else 'No Images'}")
 
@@ -42,20 +42,13 @@ function App() {
     }))
   }
 
-  const handleSubmit = async (e) => {
-    e.preventDefault()
-    
-    if (!formData.prompt.trim()) {
-      setError({ message: 'Please enter a prompt for your presentation' })
-      return
-    }
-
+  const generate = async (request) => {
     setLoading(true)
     setError(null)
     setResult(null)
 
     try {
-      const data = await generatePresentation(formData)
+      const data = await generatePresentation(request)
       setResult(data)
     } catch (err) {
       if (err instanceof APIError) {
@@ -74,6 +67,20 @@ function App() {
     }
   }
 
+  const handleSubmit = (e) => {
+    e.preventDefault()
+    
+    if (!formData.prompt.trim()) {
+      setError({ message: 'Please enter a prompt for your presentation' })
+      return
+    }
+
+    generate(formData)
+  }
+
+  // Accept the offer: ask again for the near-identical earlier deck as is
+  const handleReuseEarlierDeck = () => generate({ ...formData, reuseOutline: result.outline.outline_id })
+
   const handleNewPresentation = () => {
     setResult(null)
     setError(null)
@@ -256,6 +263,22 @@ function App() {
         <div className="success">
           <h3>✅ Presentation Created Successfully!</h3>
           <p>Your presentation has been generated with {result.num_slides} slides using the {result.theme.replace('_', ' ')} theme.</p>
+          {result.outline?.action === 'reuse' && (
+            <p>♻️ This is an earlier deck for a near-identical request ({Math.round(result.outline.similarity * 100)}% match).</p>
+          )}
+          {result.outline?.action === 'seed' && (
+            <p>
+              🌱 Outline based on an earlier deck ({Math.round(result.outline.similarity * 100)}% match).
+              {result.outline.reusable && (
+                <>
+                  {' '}
+                  <button onClick={handleReuseEarlierDeck} className="btn-secondary" disabled={loading}>
+                    ♻️ Use the earlier deck instead
+                  </button>
+                </>
+              )}
+            </p>
+          )}
           
           <div className="feature-notice">
             <strong>📊 What's included:</strong>
@@ -282,7 +305,7 @@ function App() {
               📥 Download PowerPoint (Full Version)
             </a>
             <a
-              href={getViewerUrl(result.filename, result.slides_data, result.theme)}
+              href={getViewerUrl(result.deck_id || result.filename, result.theme)}
               className="btn-secondary"
               target="_blank"
               rel="noopener noreferrer"
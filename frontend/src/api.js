@@ -10,14 +10,56 @@ export class APIError extends Error {
   }
 }
 
-export async function generatePresentation(formData) {
+const RETRY_STATUSES = [502, 503, 504];
+const MAX_ATTEMPTS = 3;
+const MAX_RETRY_DELAY_MS = 30000;
+
+// Retries reuse the same Idempotency-Key, so a deck that was already built
+// (or is still being built) is returned instead of generated again
+async function postGenerate(body, idempotencyKey) {
+  for (let attempt = 1; ; attempt++) {
+    let retryAfter = 0;
+    try {
+      const response = await fetch('/generate', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Idempotency-Key': idempotencyKey,
+        },
+        body,
+      });
+      if (!RETRY_STATUSES.includes(response.status) || attempt >= MAX_ATTEMPTS) {
+        return response;
+      }
+      // A full Gemini queue answers 503 with a Retry-After estimate
+      retryAfter = Number(response.headers.get('Retry-After')) || 0;
+    } catch (error) {
+      if (attempt >= MAX_ATTEMPTS) {
+        throw error;
+      }
+    }
+    const delay = Math.min(Math.max(1000 * attempt, 1000 * retryAfter), MAX_RETRY_DELAY_MS);
+    await new Promise((resolve) => setTimeout(resolve, delay));
+  }
+}
+
+// crypto.randomUUID only exists in secure contexts (HTTPS or localhost), not
+// when the app is opened over plain HTTP from another machine on the LAN
+function newIdempotencyKey() {
+  if (typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function') {
+    return crypto.randomUUID();
+  }
+  if (typeof crypto !== 'undefined' && typeof crypto.getRandomValues === 'function') {
+    const bytes = crypto.getRandomValues(new Uint8Array(16));
+    return Array.from(bytes, (byte) => byte.toString(16).padStart(2, '0')).join('');
+  }
+  return `${Date.now().toString(16)}-${Math.random().toString(16).slice(2)}${Math.random().toString(16).slice(2)}`;
+}
+
+export async function generatePresentation(formData, idempotencyKey = newIdempotencyKey()) {
   try {
-    const response = await fetch('/generate', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({
+    const response = await postGenerate(
+      JSON.stringify({
         prompt: formData.prompt,
         num_slides: parseInt(formData.numSlides),
         style: formData.style,
@@ -25,8 +67,11 @@ export async function generatePresentation(formData) {
         include_images: formData.includeImages,
         include_code: formData.includeCode,
         theme: formData.theme,
+        // An earlier deck the server offered as reusable, returned as is
+        ...(formData.reuseOutline ? { reuse_outline: formData.reuseOutline } : {}),
       }),
-    });
+      idempotencyKey
+    );
 
     if (!response.ok) {
       const errorText = await response.text();
@@ -60,13 +105,12 @@ export function getDownloadUrl(filename) {
   return `/download/${encodeURIComponent(filename)}`;
 }
 
-export function getViewerUrl(filename, slidesData, theme) {
-  // Pass slides data and theme as JSON strings in URL parameters
-  const slidesJson = JSON.stringify(slidesData);
-  let url = `/viewer/${encodeURIComponent(filename)}?slides=${encodeURIComponent(slidesJson)}`;
+export function getViewerUrl(filename, theme) {
+  // The viewer fetches the slides it shows from /api/slides/<filename>
+  let url = `/viewer/${encodeURIComponent(filename)}`;
   
   if (theme) {
-    url += `&theme=${encodeURIComponent(theme)}`;
+    url += `?theme=${encodeURIComponent(theme)}`;
   }
   
   return url;
@@ -0,0 +1,290 @@
+"""
+Static HTML export
+Writes a deck as one self-contained index.html plus an assets/ folder of image
+variants, ready to drop on any static host or CDN. Critical CSS and the theme's
+colours are inlined, slides are laid out from the same slide_layout geometry
+as FreeSlideGenerator.add_slide (in container-query units, so they scale with
+the page), diagrams are inline SVG built from the shared diagram layouts, and
+images are lazily loaded AVIF/WebP variants at several widths.
+"""
+
+import hashlib
+import os
+from html import escape
+
+from diagram_engine import LAYOUTS, get_layout, item_text
+from image_variants import resize_to_width
+from slide_layout import plan_slide, label_box, label_size, SLIDE_WIDTH, SLIDE_HEIGHT, TITLE_BOX, RULE, RULE_PT
+from text_fit import space_before, wrap_text, LINE_SPACING, FRAME_INSET
+
+# Rendered widths of slide images in pixels; the image box is 40% of the slide
+IMAGE_WIDTHS = (320, 640, 960)
+IMAGE_SIZES = "(min-width: 1000px) 400px, 40vw"
+
+# (extension, mime type, PIL format, save options), best compression first
+IMAGE_FORMATS = (
+    ('avif', 'image/avif', 'AVIF', {'quality': 50}),
+    ('webp', 'image/webp', 'WEBP', {'quality': 75, 'method': 6}),
+)
+FALLBACK_FORMAT = ('jpg', 'image/jpeg', 'JPEG', {'quality': 80, 'optimize': True, 'progressive': True})
+
+# Slides are 10in wide, so 1in = 10cqw of the slide container
+CRITICAL_CSS = """
+*{box-sizing:border-box;margin:0;padding:0}
+body{background:#1a1a1a;color:#ddd;font-family:Calibri,Carlito,'Segoe UI',Arial,sans-serif;padding:24px 12px}
+main{max-width:1000px;margin:0 auto;display:grid;gap:28px}
+.slide{position:relative;aspect-ratio:4/3;container-type:inline-size;overflow:hidden;border-radius:6px;
+background:var(--background);color:var(--text);box-shadow:0 4px 18px rgba(0,0,0,.4);
+content-visibility:auto;contain-intrinsic-size:auto 750px}
+.slide>*{position:absolute}
+.slide h2{color:var(--primary);font-weight:700;line-height:1.2}
+.slide hr{border:0}
+.slide ul{list-style:none;padding:.5cqw 1cqw;line-height:1.2}
+.slide li+li{margin-top:var(--gap)}
+.slide pre{background:#282a36;color:#f8f8f2;font-family:'Courier New',Consolas,monospace;padding:.5cqw 1cqw;
+line-height:1.2;white-space:pre-wrap;overflow:hidden}
+.slide img{width:100%;height:100%;object-fit:cover}
+.slide svg{inset:0;width:100%;height:100%}
+.notes{font-size:14px;color:#aaa;margin-top:-18px}
+.notes summary{cursor:pointer}
+@media print{body{background:#fff;padding:0}.slide{box-shadow:none;break-inside:avoid}.notes{display:none}}
+""".strip()
+
+
+def _rgb(color):
+    return 'rgb({}, {}, {})'.format(*tuple(color))
+
+
+def theme_css(theme_config):
+    """CSS custom properties for one theme"""
+    keys = ('primary', 'secondary', 'accent', 'background', 'text')
+    return ':root{' + ';'.join(f"--{key}:{_rgb(theme_config[key])}" for key in keys) + '}'
+
+
+def _cqw(inches):
+    return f"{inches * 100 / SLIDE_WIDTH:.3f}cqw"
+
+
+def _font(size_pt):
+    return _cqw(size_pt / 72)
+
+
+def _box(left, top, width, height):
+    return f"left:{_cqw(left)};top:{_cqw(top)};width:{_cqw(width)};height:{_cqw(height)}"
+
+
+def _num(value):
+    return f"{value:.3f}".rstrip('0').rstrip('.')
+
+
+def layout_css():
+    """Title and rule placement from the shared slide geometry"""
+    left, top, width = RULE
+    padding = f"{_cqw(FRAME_INSET[1])} {_cqw(FRAME_INSET[0])}"
+    return (
+        f".slide h2{{{_box(*TITLE_BOX)};padding:{padding}}}\n"
+        f".slide hr{{left:{_cqw(left)};top:{_cqw(top)};width:{_cqw(width)};"
+        f"border-top:{_font(RULE_PT)} solid var(--accent)}}"
+    )
+
+
+def _color_var(key):
+    return 'rgb(255, 255, 255)' if key == 'white' else f"var(--{key})"
+
+
+def diagram_svg(diagram):
+    """Inline SVG (viewBox in slide inches) for a diagram, or '' if it cannot be drawn"""
+    diagram_type = diagram.get('type', 'flowchart')
+    items = diagram.get('data', [])
+    layout = LAYOUTS.get(diagram_type)
+    if layout is None or len(items) < layout.min_items:
+        return ''
+
+    texts = [item_text(item) for item in items]
+    parts = []
+    for element in get_layout(diagram_type, len(items), layout.box):
+        stroke_width = (element.line_width or 0) / 72
+        if element.kind == 'connector':
+            x1, y1, x2, y2 = element.box
+            points = [(x1, y1), (x2, y2)]
+            if element.shape == 2:
+                # Elbow connector: horizontal, vertical, horizontal
+                mid = (x1 + x2) / 2
+                points = [(x1, y1), (mid, y1), (mid, y2), (x2, y2)]
+            parts.append(
+                f'<polyline points="{" ".join(f"{_num(x)},{_num(y)}" for x, y in points)}" '
+                f'style="fill:none;stroke:{_color_var(element.line)};stroke-width:{_num(stroke_width)}"/>'
+            )
+            continue
+
+        left, top, width, height = element.box
+        if element.kind == 'shape':
+            style = f"fill:{_color_var(element.fill)}"
+            if element.line and stroke_width:
+                style += f";stroke:{_color_var(element.line)};stroke-width:{_num(stroke_width)}"
+            if element.shape == 'OVAL':
+                parts.append(
+                    f'<ellipse cx="{_num(left + width / 2)}" cy="{_num(top + height / 2)}" '
+                    f'rx="{_num(width / 2)}" ry="{_num(height / 2)}" style="{style}"/>'
+                )
+            else:
+                radius = min(width, height) / 6 if element.shape == 'ROUNDED_RECTANGLE' else 0
+                parts.append(
+                    f'<rect x="{_num(left)}" y="{_num(top)}" width="{_num(width)}" height="{_num(height)}" '
+                    f'rx="{_num(radius)}" style="{style}"/>'
+                )
+
+        if element.label is not None:
+            text = element.label
+            if element.slot is not None:
+                text = element.label.format(n=element.slot + 1, text=texts[element.slot])
+            parts.append(_svg_label(element, text))
+
+    return (
+        f'<svg viewBox="0 0 {SLIDE_WIDTH} {SLIDE_HEIGHT}" role="img" aria-label="'
+        f'{escape(diagram_type)} diagram">' + ''.join(parts) + '</svg>'
+    )
+
+
+def _svg_label(element, text):
+    """Fitted, pre-wrapped text for a diagram element"""
+    left, top, width, height = label_box(element)
+    size = label_size(element, text)
+    lines = wrap_text(text, width, size, element.bold)
+    line_height = size * LINE_SPACING / 72
+    # Shapes anchor text in the middle, text boxes at the top
+    y = top if element.kind == 'textbox' else top + (height - len(lines) * line_height) / 2
+    x = left + width / 2 if element.centered else left
+    anchor = ' text-anchor="middle"' if element.centered else ''
+    weight = ' font-weight="700"' if element.bold else ''
+    spans = ''.join(
+        f'<tspan x="{_num(x)}" y="{_num(y + i * line_height + size / 72 * 0.9)}">{escape(line)}</tspan>'
+        for i, line in enumerate(lines)
+    )
+    return (
+        f'<text font-size="{_num(size / 72)}"{anchor}{weight} '
+        f'style="fill:{_color_var(element.color)}">{spans}</text>'
+    )
+
+
+def _bullets_html(bullets, box, size, spaced=True):
+    gap = f"--gap:{_font(space_before(size))};" if spaced else "--gap:0;"
+    items = ''.join(f"<li>{escape(str(bullet))}</li>" for bullet in bullets)
+    return f'<ul style="{_box(*box)};font-size:{_font(size)};{gap}">{items}</ul>'
+
+
+def _section(page, body, notes=None):
+    html = (
+        f'<section class="slide"><h2 style="font-size:{_font(page.title_pt)}">{escape(page.title)}</h2><hr>'
+        + body + '</section>'
+    )
+    if notes:
+        html += f'<details class="notes"><summary>Notes</summary><p>{escape(notes)}</p></details>'
+    return html
+
+
+def _page_body(page, picture_html=None):
+    body = []
+    if page.diagram:
+        body.append(diagram_svg(page.diagram))
+    if page.image_box:
+        body.append(f'<picture style="{_box(*page.image_box)}">{picture_html}</picture>')
+    if page.bullets:
+        body.append(_bullets_html(page.bullets, page.bullet_box, page.bullet_pt, page.spaced))
+    if page.code:
+        body.append(
+            f'<pre style="{_box(*page.code_box)};font-size:{_font(page.code_pt)}">'
+            f'{escape(str(page.code))}</pre>'
+        )
+    return ''.join(body)
+
+
+def slide_sections(slide_data, picture_html=None):
+    """HTML <section>s for one slide (more than one when bullets continue)"""
+    has_image = picture_html is not None and not slide_data.get('diagram')
+    page, *overflow = plan_slide(slide_data, has_image)
+    sections = [_section(page, _page_body(page, picture_html), slide_data.get('notes'))]
+    for page in overflow:
+        sections.append(_section(page, _page_body(page)))
+    return sections
+
+
+def image_variants(image_path, assets_dir, widths=IMAGE_WIDTHS):
+    """
+    Write resized AVIF/WebP variants and a JPEG fallback of one image.
+
+    Files are named by content hash and width, so re-exports skip existing
+    variants and URLs can be cached forever. Returns {format: [(width, name)]}.
+    """
+    from PIL import Image, features
+
+    with open(image_path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+
+    os.makedirs(assets_dir, exist_ok=True)
+    variants = {}
+    with Image.open(image_path) as source:
+        # Each width once: a source at least as wide as the largest width would repeat it
+        usable = sorted({w for w in widths if w < source.width} | {min(max(widths), source.width)})
+        formats = [fmt for fmt in IMAGE_FORMATS if features.check(fmt[0])]
+        for ext, _, pil_format, options in formats + [FALLBACK_FORMAT]:
+            # One fallback JPEG at the largest width is enough
+            targets = usable if ext != FALLBACK_FORMAT[0] else usable[-1:]
+            for width in targets:
+                name = f"{digest}-{width}.{ext}"
+                path = os.path.join(assets_dir, name)
+                if not os.path.exists(path):
+                    resize_to_width(source, width).save(path, pil_format, **options)
+                variants.setdefault(ext, []).append((width, name))
+    return variants
+
+
+def picture_html(variants, assets_url='assets', eager=False):
+    """<source>/<img> markup for a <picture> from image_variants() output"""
+    sources = []
+    for ext, mime, _, _ in IMAGE_FORMATS:
+        if ext in variants:
+            srcset = ', '.join(f"{assets_url}/{name} {width}w" for width, name in variants[ext])
+            sources.append(f'<source type="{mime}" srcset="{srcset}" sizes="{IMAGE_SIZES}">')
+    fallback_width, fallback = variants[FALLBACK_FORMAT[0]][-1]
+    loading = 'eager" fetchpriority="high' if eager else 'lazy'
+    return ''.join(sources) + (
+        f'<img src="{assets_url}/{fallback}" alt="" width="{fallback_width}" '
+        f'loading="{loading}" decoding="async">'
+    )
+
+
+def export_html(slides_data, theme_config, output_dir, image_paths=None, title=None):
+    """Write output_dir/index.html (and output_dir/assets/) for a deck; returns the HTML path"""
+    assets_dir = os.path.join(output_dir, 'assets')
+    if image_paths is None:
+        image_paths = [None] * len(slides_data)
+    title = title or (slides_data[0].get('title') if slides_data else None) or 'Presentation'
+
+    sections = []
+    variants_by_path = {}
+    for slide_data, image_path in zip(slides_data, image_paths):
+        picture = None
+        if image_path and os.path.exists(image_path) and not slide_data.get('diagram'):
+            try:
+                if image_path not in variants_by_path:
+                    variants_by_path[image_path] = image_variants(image_path, assets_dir)
+                # Only an image on the first slide is above the fold; the rest load lazily
+                picture = picture_html(variants_by_path[image_path], eager=not sections)
+            except Exception as e:
+                print(f"⚠️  Skipping image {os.path.basename(image_path)}: {e}")
+        sections.extend(slide_sections(slide_data, picture))
+
+    document = (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">'
+        f'<title>{escape(title)}</title>'
+        f'<style>{CRITICAL_CSS}\n{layout_css()}\n{theme_css(theme_config)}</style></head>'
+        f'<body><main>{"".join(sections)}</main></body></html>\n'
+    )
+
+    os.makedirs(output_dir, exist_ok=True)
+    index_path = os.path.join(output_dir, 'index.html')
+    with open(index_path, 'w', encoding='utf-8') as f:
+        f.write(document)
+    return index_path
@@ -0,0 +1,249 @@
+"""
+Concurrency-safe on-disk image cache
+Concurrent requests for the same image share one download: threads coalesce on
+a per-key SingleFlight and lock, and processes serialize on one of a fixed pool
+of file locks picked by hashing the key, so a slow download only holds up the
+rare image sharing its lock file. Files are written to a temp file and
+atomically renamed, and a sidecar records their size and SHA-256 so truncated
+or corrupt entries are detected and refetched.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+
+from request_coalescing import SingleFlight
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev server, thread-level locking only
+    fcntl = None
+
+# JPEG start/end-of-image markers, used to vet entries written before sidecars existed
+JPEG_SOI = b'\xff\xd8'
+JPEG_EOI = b'\xff\xd9'
+
+# Cross-process lock files; keys hash onto these so the lock directory stays a fixed size
+LOCK_FILES = 256
+
+
+def atomic_write(path, data):
+    """Write bytes to a temp file in the target directory and rename it into place"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ImageCache:
+    """
+    Validated image files under one cache directory.
+
+    lookup(path) returns a path only when the file matches its sidecar;
+    get_or_create(path, produce) fills a missing entry exactly once across the
+    threads and processes asking for it.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.lock_dir = os.path.join(cache_dir, '.locks')
+        os.makedirs(self.lock_dir, exist_ok=True)
+        self._prune_lock_files()
+        self.flight = SingleFlight()
+        # Per-entry thread locks with their number of users: name -> [lock, users]
+        self._thread_locks = {}
+        self._thread_locks_guard = threading.Lock()
+        # Files whose hash was already checked in this process: (path, size, mtime_ns)
+        self._verified = set()
+        self._verified_lock = threading.Lock()
+
+    @staticmethod
+    def meta_path(path):
+        return path + '.json'
+
+    @contextmanager
+    def _thread_lock(self, name):
+        with self._thread_locks_guard:
+            entry = self._thread_locks.setdefault(name, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._thread_locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._thread_locks[name]
+
+    def _lock_file(self, name):
+        """Lock file shared by every key hashing to the same slot (stable across processes)"""
+        return os.path.join(self.lock_dir, f"{zlib.crc32(name.encode('utf-8')) % LOCK_FILES:03d}.lock")
+
+    def _prune_lock_files(self):
+        """Remove per-key lock files left by older versions"""
+        pooled = {f"{slot:03d}.lock" for slot in range(LOCK_FILES)}
+        for entry in os.scandir(self.lock_dir):
+            if entry.name not in pooled:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    @contextmanager
+    def lock(self, path):
+        """Exclusive lock for one cache entry, across threads and processes"""
+        name = os.path.basename(path)
+        with self._thread_lock(name):
+            if fcntl is None:
+                yield
+                return
+            # Keys sharing a lock file (1 in LOCK_FILES) wait on each other; nothing else does
+            with open(self._lock_file(name), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def lookup(self, path, locked=False):
+        """Path of a complete, valid cached file, or None"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        meta = self._read_meta(path)
+        if meta is not None and meta.get('size') == stat.st_size and self._hash_ok(path, stat, meta):
+            return path
+
+        # Missing or mismatched sidecar: either a write is in progress, the entry
+        # predates sidecars, or the file is damaged. Decide under the lock.
+        if not locked:
+            with self.lock(path):
+                return self.lookup(path, locked=True)
+
+        if meta is None and self._looks_complete(path):
+            self._write_meta(path)
+            return path
+
+        print(f"⚠️  Discarding corrupt cache entry: {os.path.basename(path)}")
+        self.discard(path)
+        return None
+
+    def get_or_create(self, path, produce):
+        """
+        Return the cached file, calling produce() for its bytes on a miss.
+
+        produce() may return None to signal failure; nothing is stored then
+        and None is returned.
+        """
+        found = self.lookup(path)
+        if found:
+            return found
+
+        def fill():
+            with self.lock(path):
+                found = self.lookup(path, locked=True)
+                if found:
+                    return found
+                data = produce()
+                if data is None:
+                    return None
+                self._store(path, data)
+                return path
+
+        result, _ = self.flight.do(path, fill)
+        return result
+
+    def store(self, path, data):
+        """Write an entry unconditionally (atomic, under the entry's lock)"""
+        with self.lock(path):
+            self._store(path, data)
+        return path
+
+    def put_if_absent(self, path, data):
+        """Store data unless a valid entry appeared meanwhile (e.g. from another process)"""
+        with self.lock(path):
+            if not self.lookup(path, locked=True):
+                self._store(path, data)
+        return path
+
+    def fingerprint(self, path):
+        """SHA-256 of a cached file (from its sidecar when present)"""
+        meta = self._read_meta(path)
+        if meta and meta.get('sha256'):
+            return meta['sha256']
+        return file_sha256(path)
+
+    def discard(self, path):
+        for name in (path, self.meta_path(path)):
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
+
+    def _store(self, path, data):
+        atomic_write(path, data)
+        self._write_meta(path, data)
+
+    def _write_meta(self, path, data=None):
+        if data is None:
+            size, sha256 = os.path.getsize(path), file_sha256(path)
+        else:
+            size, sha256 = len(data), hashlib.sha256(data).hexdigest()
+        atomic_write(self.meta_path(path), json.dumps({'size': size, 'sha256': sha256}).encode('utf-8'))
+
+    def _read_meta(self, path):
+        try:
+            with open(self.meta_path(path), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _hash_ok(self, path, stat, meta):
+        """Full hash check, done once per file version per process"""
+        marker = (path, stat.st_size, stat.st_mtime_ns)
+        if marker in self._verified:
+            return True
+        if file_sha256(path) != meta.get('sha256'):
+            return False
+        with self._verified_lock:
+            if len(self._verified) > 65536:
+                self._verified.clear()
+            self._verified.add(marker)
+        return True
+
+    @staticmethod
+    def _looks_complete(path):
+        """Legacy entries are trusted when they start and end like a JPEG"""
+        try:
+            with open(path, 'rb') as f:
+                head = f.read(2)
+                f.seek(-2, os.SEEK_END)
+                tail = f.read(2)
+        except OSError:
+            return False
+        return head == JPEG_SOI and tail == JPEG_EOI
@@ -0,0 +1,167 @@
+"""
+Image query normalization and approximate matching
+Stock-photo queries are reduced to a canonical form (case, punctuation,
+stopwords, plural/verb suffixes, word order) before they become cache keys, and
+a character-trigram index over previously downloaded queries lets a
+near-identical query reuse an existing image.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import Counter
+
+STOPWORDS = frozenset("""
+a an the and or of for in on at to by with from about into over under
+is are be this that these those its it your our their
+image images photo photos picture pictures stock illustration
+""".split())
+
+_NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def _stem(word):
+    """Strip common English inflections (a deliberately small Porter-style subset)"""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 5 and word.endswith('ing'):
+        return word[:-3]
+    if len(word) > 4 and word.endswith('ed'):
+        return word[:-2]
+    if len(word) > 4 and word.endswith(('ches', 'shes', 'sses', 'xes', 'zes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def normalize_query(query):
+    """
+    Canonical form of a stock-photo query.
+
+    "Cloud Computing", "cloud computing " and "cloud-computing" all normalize
+    to "cloud comput".
+    """
+    words = _NON_WORD.sub(' ', str(query).casefold()).split()
+    tokens = sorted({_stem(word) for word in words if word not in STOPWORDS})
+    # A query made only of stopwords keeps its words rather than becoming empty
+    return ' '.join(tokens) if tokens else ' '.join(words)
+
+
+def normalize_prompt(prompt):
+    """AI image prompts only ignore case and whitespace; wording changes the image"""
+    return ' '.join(str(prompt).split()).casefold()
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class QueryIndex:
+    """
+    Trigram index over the normalized queries of downloaded images.
+
+    Entries are appended to a JSON-lines file so every process sharing the
+    cache directory sees new downloads; each process tails the file before
+    searching.
+
+    threshold: minimum Jaccard similarity of trigram sets for a fuzzy match
+        (IMAGE_MATCH_THRESHOLD, default 0.7; 1 disables approximate matching)
+    """
+
+    def __init__(self, path, threshold=None):
+        self.path = path
+        self.threshold = threshold if threshold is not None else float(os.getenv('IMAGE_MATCH_THRESHOLD', 0.7))
+        self._lock = threading.Lock()
+        self._offset = 0
+        self._entries = []
+        self._grams = []
+        self._postings = {}
+        self._known = set()
+        self.stats = Counter()
+
+    def add(self, query, width, height, filename):
+        """Record a downloaded image under its normalized query"""
+        record = {'q': query, 'w': width, 'h': height, 'file': filename}
+        if (query, width, height) in self._known:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # One short line per append, so concurrent writers do not interleave
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.refresh()
+
+    def refresh(self):
+        """Load entries appended since the last refresh (by any process)"""
+        with self._lock:
+            try:
+                if os.path.getsize(self.path) <= self._offset:
+                    return
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    f.seek(self._offset)
+                    chunk = f.read()
+            except OSError:
+                return
+            # Only consume complete lines; a partial last line is read next time
+            complete = chunk[:chunk.rfind('\n') + 1]
+            self._offset += len(complete.encode('utf-8'))
+            for line in complete.splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self._insert(record)
+
+    def _insert(self, record):
+        key = (record['q'], record['w'], record['h'])
+        if key in self._known:
+            return
+        self._known.add(key)
+        grams = trigrams(record['q'])
+        index = len(self._entries)
+        self._entries.append(record)
+        self._grams.append(grams)
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(index)
+
+    def find_similar(self, query, width, height):
+        """Best (filename, similarity) of the same size above the threshold, or None"""
+        if self.threshold >= 1:
+            return None
+        self.refresh()
+        grams = trigrams(query)
+        with self._lock:
+            shared = Counter()
+            for gram in grams:
+                for index in self._postings.get(gram, ()):
+                    shared[index] += 1
+            best = None
+            for index, common in shared.items():
+                record = self._entries[index]
+                if record['w'] != width or record['h'] != height or record['q'] == query:
+                    continue
+                similarity = common / (len(grams) + len(self._grams[index]) - common)
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (record['file'], similarity)
+        return best
+
+    def record(self, outcome):
+        """Count a lookup outcome: 'exact', 'fuzzy' or 'miss'"""
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def hit_rate(self):
+        """Lookup counters and hit rates for this process"""
+        with self._lock:
+            exact, fuzzy, miss = self.stats['exact'], self.stats['fuzzy'], self.stats['miss']
+        total = exact + fuzzy + miss
+        return {
+            'lookups': total,
+            'exact_hits': exact,
+            'fuzzy_hits': fuzzy,
+            'misses': miss,
+            'hit_rate': round((exact + fuzzy) / total, 3) if total else None,
+            'fuzzy_hit_rate': round(fuzzy / total, 3) if total else None,
+        }
@@ -0,0 +1,193 @@
+"""
+Resized and transcoded image variants
+Serves width-constrained WebP/JPEG versions of cached images. Variants are
+derived once on a small bounded thread pool (PIL releases the GIL while
+resampling and encoding), stored under cache/variants and addressed by the
+source's content hash, so their URLs can be cached as immutable. Like the
+rendered-deck cache, least recently used variants are evicted once the
+directory exceeds its disk budget.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from image_cache import atomic_write
+from request_coalescing import SingleFlight
+
+# Requested widths snap up to one of these, so the variant cache stays small
+VARIANT_WIDTHS = (160, 320, 480, 640, 800, 1024)
+
+# format -> (PIL format, mime type, save options)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'image/webp', {'quality': 78, 'method': 4}),
+    'jpeg': ('JPEG', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Length of the content hash used in URLs and variant file names
+DIGEST_LENGTH = 16
+
+
+def snap_width(width):
+    """Smallest supported variant width that is at least `width`"""
+    for candidate in VARIANT_WIDTHS:
+        if candidate >= width:
+            return candidate
+    return VARIANT_WIDTHS[-1]
+
+
+def resize_to_width(image, width):
+    """RGB copy of a PIL image scaled down to `width` (never upscaled)"""
+    from PIL import Image
+
+    image = image.convert('RGB')
+    if width >= image.width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+class VariantCache:
+    """
+    Derived image variants of the files in one source directory.
+
+    variant_dir: where variants are stored (default cache/variants)
+    max_workers: concurrent resize/encode jobs (IMAGE_VARIANT_WORKERS, default 2)
+    max_bytes: disk budget (IMAGE_VARIANT_CACHE_MAX_MB, default 200; 0 = unbounded)
+    """
+
+    def __init__(self, image_cache, variant_dir=None, max_workers=None, max_bytes=None):
+        self.image_cache = image_cache
+        self.source_dir = image_cache.cache_dir
+        self.variant_dir = variant_dir or os.path.join('cache', 'variants')
+        os.makedirs(self.variant_dir, exist_ok=True)
+        max_workers = max_workers or int(os.getenv('IMAGE_VARIANT_WORKERS', 2))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='image-variant')
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv('IMAGE_VARIANT_CACHE_MAX_MB', 200)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self._flight = SingleFlight()
+        self._digests = {}
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self.stats = {'encoded': 0, 'evictions': 0}
+
+    def source_path(self, name):
+        """Path of a cached source image by file name, or None if it is not a valid entry"""
+        if os.path.basename(name) != name or name.startswith('.') or not name.endswith('.jpg'):
+            return None
+        return self.image_cache.lookup(os.path.join(self.source_dir, name))
+
+    def digest(self, path):
+        """Short content hash of a source image, memoized per file version"""
+        stat = os.stat(path)
+        marker = (path, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._digests.get(path)
+        if cached and cached[0] == marker:
+            return cached[1]
+        digest = self.image_cache.fingerprint(path)[:DIGEST_LENGTH]
+        with self._lock:
+            self._digests[path] = (marker, digest)
+        return digest
+
+    def url(self, path, width, fmt='webp'):
+        """Content-addressed URL of a variant of a cached image"""
+        return f"/api/images/{os.path.basename(path)}/{self.digest(path)}/{snap_width(width)}.{fmt}"
+
+    def get(self, path, width, fmt='webp'):
+        """Path of the variant, generating it on the thread pool on a miss"""
+        width = snap_width(width)
+        variant_path = os.path.join(self.variant_dir, f"{self.digest(path)}-{width}.{fmt}")
+        if self._touch(variant_path):
+            return variant_path
+
+        def build():
+            if not os.path.exists(variant_path):
+                self._executor.submit(self._encode, path, variant_path, width, fmt).result()
+                self.evict(keep=variant_path)
+            return variant_path
+
+        # Concurrent requests for one variant wait on a single encode
+        result, _ = self._flight.do(variant_path, build)
+        return result
+
+    def open(self, path, width, fmt='webp'):
+        """
+        Open file of the variant, rebuilding it if eviction removed it first.
+
+        An open file survives a concurrent evict(), so serve from this rather
+        than from the path get() returns.
+        """
+        for _ in range(3):
+            try:
+                return open(self.get(path, width, fmt), 'rb')
+            except FileNotFoundError:
+                continue
+        raise FileNotFoundError(f"Variant of {path} was evicted while being served")
+
+    @staticmethod
+    def _touch(variant_path):
+        """True if the variant exists; its mtime doubles as the last-use time for eviction"""
+        try:
+            os.utime(variant_path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _encode(self, path, variant_path, width, fmt):
+        from PIL import Image
+
+        pil_format, _, options = VARIANT_FORMATS[fmt]
+        buffer = BytesIO()
+        with Image.open(path) as source:
+            resize_to_width(source, width).save(buffer, pil_format, **options)
+        atomic_write(variant_path, buffer.getvalue())
+        with self._lock:
+            self.stats['encoded'] += 1
+
+    def evict(self, keep=None):
+        """Delete least recently used variants until the directory fits its budget"""
+        if self.max_bytes <= 0:
+            return
+        with self._evict_lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.variant_dir):
+                if not entry.name.endswith(tuple(f".{fmt}" for fmt in VARIANT_FORMATS)):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            for _, size, variant_path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                # The variant just built is about to be served
+                if variant_path == keep:
+                    continue
+                try:
+                    os.remove(variant_path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                with self._lock:
+                    self.stats['evictions'] += 1
+
+    def usage(self):
+        """Variant counters and current size on disk"""
+        size = count = 0
+        for entry in os.scandir(self.variant_dir):
+            if entry.name.endswith(tuple(f".{fmt}" for fmt in VARIANT_FORMATS)):
+                size += entry.stat().st_size
+                count += 1
+        with self._lock:
+            stats = dict(self.stats)
+        return dict(stats, variants=count, bytes=size, max_bytes=self.max_bytes)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
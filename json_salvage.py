@@ -0,0 +1,158 @@
+"""
+Tolerant JSON parsing for LLM slide responses
+Recovers every well-formed slide object from a malformed or truncated response
+"""
+
+import json
+import re
+
+_decoder = json.JSONDecoder()
+_TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+
+
+def strip_code_fences(content):
+    """Remove markdown code fences wrapped around a JSON payload"""
+    content = content.strip()
+    if "```" in content:
+        match = re.search(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", content, re.DOTALL)
+        if match:
+            content = match.group(1)
+    return content.strip()
+
+
+def parse_slides(content):
+    """
+    Strictly parse a slides response.
+
+    Accepts either {"slides": [...]} or a bare [...] array and returns the list.
+    Raises json.JSONDecodeError or ValueError when the payload is not usable.
+    """
+    data = json.loads(strip_code_fences(content))
+    if isinstance(data, dict):
+        if "slides" not in data:
+            raise ValueError("Response missing 'slides' key")
+        data = data["slides"]
+    if not isinstance(data, list):
+        raise ValueError("Response is not a list of slides")
+    return data
+
+
+def _skip_object(text, pos):
+    """Return the index just past the object starting at pos, or None if it never closes"""
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(pos, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '{[':
+            depth += 1
+        elif ch in '}]':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return None
+
+
+def _decode_object(text, pos):
+    """Decode the object at pos, retrying once with trailing commas removed"""
+    try:
+        obj, end = _decoder.raw_decode(text, pos)
+        return obj, end
+    except json.JSONDecodeError:
+        pass
+
+    end = _skip_object(text, pos)
+    if end is None:
+        return None, None
+    try:
+        obj = json.loads(_TRAILING_COMMA.sub(r'\1', text[pos:end]))
+    except json.JSONDecodeError:
+        obj = None
+    return obj, end
+
+
+def _is_slide(obj):
+    return isinstance(obj, dict) and bool(obj.get('title') or obj.get('bullets'))
+
+
+def salvage_slides(content, expected=None):
+    """
+    Recover slide objects from a malformed response.
+
+    Returns a list with one entry per slide position: the slide dict when it
+    parsed cleanly, or None when the object was broken or missing. When
+    `expected` is given the list is padded with None up to that length, so
+    truncated responses show up as missing trailing slides.
+    """
+    text = strip_code_fences(content)
+
+    # Start scanning inside the slides array when there is one
+    start = 0
+    key = re.search(r'"slides"\s*:\s*\[', text)
+    if key:
+        start = key.end()
+    elif text.startswith('['):
+        start = 1
+    elif text.startswith('{'):
+        start = 0
+
+    slides = []
+    pos = start
+    length = len(text)
+    while pos < length:
+        ch = text[pos]
+        if ch == '{':
+            obj, end = _decode_object(text, pos)
+            if end is None:
+                # Truncated object: everything after it is lost
+                slides.append(None)
+                break
+            slides.append(obj if _is_slide(obj) else None)
+            pos = end
+        elif ch == ']':
+            break
+        else:
+            pos += 1
+
+    if expected is not None:
+        slides = slides[:expected]
+        slides.extend([None] * (expected - len(slides)))
+    return slides
+
+
+def build_repair_prompt(base_prompt, slides):
+    """Build a follow-up prompt asking only for the slides that could not be recovered"""
+    missing = [str(i + 1) for i, slide in enumerate(slides) if slide is None]
+    existing = "\n".join(
+        f"{i + 1}. {slide.get('title', 'Untitled')}"
+        for i, slide in enumerate(slides) if slide is not None
+    )
+    return f'''{base_prompt}
+
+The previous response was cut off or contained invalid JSON.
+These slides were recovered and must NOT be regenerated:
+{existing or "(none)"}
+
+Generate ONLY slides {", ".join(missing)} ({len(missing)} slides, in that order),
+keeping the same fields and fitting into the flow above.
+Return ONLY a JSON object like {{"slides": [...]}}.'''
+
+
+def merge_repaired(slides, repaired):
+    """Fill the missing positions of `slides` in order with the repaired slide objects"""
+    missing = [i for i, slide in enumerate(slides) if slide is None]
+    filled = 0
+    for index, slide in zip(missing, repaired):
+        if slide is not None:
+            slides[index] = slide
+            filled += 1
+    return filled
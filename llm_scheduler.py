@@ -0,0 +1,295 @@
+"""
+Quota-aware scheduler for Gemini calls
+Every LLM call in a worker goes through one LLMScheduler, which keeps the
+process inside a requests-per-minute and tokens-per-minute budget. Waiting
+calls are queued by priority lane (interactive before normal before batch,
+small decks first within a lane), a 429 pauses the whole queue for the
+provider's retry-after hint instead of letting every thread retry in lockstep,
+and a full queue rejects new work immediately with an estimated wait.
+"""
+
+import heapq
+import itertools
+import math
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError
+
+from deadline import DeadlineExceeded
+
+# Priority lanes, served in this order
+LANES = {'interactive': 0, 'normal': 1, 'batch': 2}
+
+# Decks up to this many slides are "small" and go first within their lane
+SMALL_DECK_SLIDES = 10
+
+# Rough output size used to estimate a request's tokens before it is sent
+OUTPUT_TOKENS_PER_SLIDE = 250
+
+# Back-off when a 429 carries no retry-after hint
+DEFAULT_RETRY_AFTER = 10.0
+
+_RETRY_HINTS = (
+    re.compile(r'retry in ([\d.]+)\s*s', re.IGNORECASE),
+    re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)', re.IGNORECASE),
+    re.compile(r'retry[- ]after[^\d]{0,4}([\d.]+)', re.IGNORECASE),
+)
+
+
+class QueueFull(Exception):
+    """The scheduler's queue is full; retry after `retry_after` seconds"""
+
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+        super().__init__(f"Gemini request queue is full, retry in about {math.ceil(retry_after)}s")
+
+
+class Cancellation:
+    """Handle for withdrawing an acquire() that is waiting on another thread (see acall)"""
+
+    def __init__(self):
+        self.cancelled = False
+        self.slot = None
+
+
+def estimate_tokens(prompt, num_slides=0):
+    """Prompt plus expected output tokens (about four characters per token)"""
+    return len(prompt) // 4 + num_slides * OUTPUT_TOKENS_PER_SLIDE
+
+
+def rate_limit_delay(error):
+    """Seconds to wait if `error` is a rate-limit (429) error, else None"""
+    status = getattr(error, 'code', None)
+    response = getattr(error, 'response', None)
+    if status != 429 and getattr(response, 'status_code', None) != 429:
+        if type(error).__name__ != 'ResourceExhausted' and '429' not in str(error):
+            return None
+
+    header = getattr(response, 'headers', None) or {}
+    if header.get('Retry-After'):
+        try:
+            return float(header['Retry-After'])
+        except ValueError:
+            pass
+    delay = getattr(error, 'retry_delay', None)
+    if delay is not None:
+        return float(getattr(delay, 'seconds', delay))
+    for pattern in _RETRY_HINTS:
+        match = pattern.search(str(error))
+        if match:
+            return float(match.group(1))
+    return DEFAULT_RETRY_AFTER
+
+
+def response_tokens(response):
+    """Tokens actually used by a generate_content response, when reported"""
+    usage = getattr(response, 'usage_metadata', None)
+    return getattr(usage, 'total_token_count', None) or None
+
+
+class LLMScheduler:
+    """
+    Admission control and pacing for LLM calls in one process.
+
+    rpm: requests per minute (GEMINI_RPM, default 10)
+    tpm: tokens per minute (GEMINI_TPM, default 250000)
+    max_queue: calls allowed to wait before new ones are rejected (GEMINI_MAX_QUEUE, default 32)
+    max_retries: retries of a call that hit a 429 (GEMINI_MAX_RETRIES, default 3)
+    """
+
+    def __init__(self, rpm=None, tpm=None, max_queue=None, max_retries=None):
+        self.rpm = rpm or int(os.getenv('GEMINI_RPM', 10))
+        self.tpm = tpm or int(os.getenv('GEMINI_TPM', 250000))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv('GEMINI_MAX_QUEUE', 32))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('GEMINI_MAX_RETRIES', 3))
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        # [start time, tokens] of the calls granted in the last minute
+        self._window = deque()
+        self._paused_until = 0.0
+        self.stats = {'granted': 0, 'rejected': 0, 'rate_limited': 0, 'timed_out': 0, 'cancelled': 0}
+
+    def acquire(self, tokens, priority='normal', small=True, timeout=None, cancellation=None):
+        """
+        Block until the call may be sent; returns a ticket for complete().
+
+        Raises QueueFull at once when too many calls are waiting,
+        DeadlineExceeded if no slot frees up within `timeout` seconds, and
+        CancelledError once `cancellation` is withdrawn.
+        """
+        with self._cond:
+            # Only calls that would have to wait count against the queue limit
+            must_wait = self._queue or self._budget_wait(tokens, time.monotonic()) > 0
+            if must_wait and len(self._queue) >= self.max_queue:
+                self.stats['rejected'] += 1
+                raise QueueFull(self._estimate_wait(len(self._queue)))
+
+            entry = [LANES.get(priority, LANES['normal']), 0 if small else 1, next(self._seq)]
+            heapq.heappush(self._queue, entry)
+            give_up = time.monotonic() + timeout if timeout is not None else None
+            try:
+                while True:
+                    if cancellation is not None and cancellation.cancelled:
+                        raise CancelledError()
+                    now = time.monotonic()
+                    wait = None
+                    if self._queue[0] is entry:
+                        wait = self._budget_wait(tokens, now)
+                        if wait <= 0:
+                            heapq.heappop(self._queue)
+                            slot = [now, tokens]
+                            self._window.append(slot)
+                            self.stats['granted'] += 1
+                            if cancellation is not None:
+                                cancellation.slot = slot
+                            self._cond.notify_all()
+                            return slot
+                    if give_up is not None:
+                        if now >= give_up:
+                            self.stats['timed_out'] += 1
+                            raise DeadlineExceeded("Time budget spent waiting for Gemini quota")
+                        wait = min(wait, give_up - now) if wait is not None else give_up - now
+                    self._cond.wait(wait)
+            except BaseException:
+                if entry in self._queue:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                raise
+
+    def withdraw(self, cancellation):
+        """Drop a waiting acquire(), or hand back its slot if it was granted but never used"""
+        with self._cond:
+            if cancellation.cancelled:
+                return
+            cancellation.cancelled = True
+            self.stats['cancelled'] += 1
+            if cancellation.slot is not None and cancellation.slot in self._window:
+                self._window.remove(cancellation.slot)
+            self._cond.notify_all()
+
+    def complete(self, ticket, used_tokens=None):
+        """Replace a granted call's token estimate with what it actually used"""
+        if used_tokens is not None:
+            with self._cond:
+                ticket[1] = used_tokens
+                self._cond.notify_all()
+
+    def rate_limited(self, retry_after):
+        """Pause every queued call after a 429"""
+        with self._cond:
+            self.stats['rate_limited'] += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            self._cond.notify_all()
+
+    def call(self, func, tokens, priority='normal', small=True, deadline=None):
+        """Run func() within the quota, retrying on 429 after the provider's hint"""
+        for attempt in range(self.max_retries + 1):
+            ticket = self.acquire(tokens, priority, small, self._timeout(deadline))
+            try:
+                response = func()
+            except Exception as e:
+                retry_after = rate_limit_delay(e)
+                if retry_after is None or attempt == self.max_retries:
+                    raise
+                print(f"⏳ Gemini rate limit hit, pausing requests for {retry_after:g}s")
+                self.rate_limited(retry_after)
+                continue
+            self.complete(ticket, response_tokens(response))
+            return response
+
+    async def acall(self, factory, tokens, priority='normal', small=True, deadline=None):
+        """
+        call() for coroutines: waits for quota on a worker thread, awaits factory().
+
+        Cancelling the coroutine withdraws its place in the queue, so the
+        waiting thread neither lingers nor takes a slot nobody will use.
+        """
+        import asyncio
+
+        for attempt in range(self.max_retries + 1):
+            cancellation = Cancellation()
+            try:
+                ticket = await asyncio.to_thread(
+                    self.acquire, tokens, priority, small, self._timeout(deadline), cancellation
+                )
+            except asyncio.CancelledError:
+                self.withdraw(cancellation)
+                raise
+            try:
+                response = await factory()
+            except Exception as e:
+                retry_after = rate_limit_delay(e)
+                if retry_after is None or attempt == self.max_retries:
+                    raise
+                print(f"⏳ Gemini rate limit hit, pausing requests for {retry_after:g}s")
+                self.rate_limited(retry_after)
+                continue
+            self.complete(ticket, response_tokens(response))
+            return response
+
+    def estimated_wait(self):
+        """Seconds a call submitted now would probably wait"""
+        with self._cond:
+            return self._estimate_wait(len(self._queue))
+
+    def snapshot(self):
+        """Queue, quota usage and counters, for metrics"""
+        with self._cond:
+            now = time.monotonic()
+            self._prune(now)
+            queued = {lane: 0 for lane in LANES}
+            names = {rank: lane for lane, rank in LANES.items()}
+            for entry in self._queue:
+                queued[names[entry[0]]] += 1
+            return dict(
+                self.stats,
+                queued=queued,
+                requests_last_minute=len(self._window),
+                tokens_last_minute=sum(tokens for _, tokens in self._window),
+                rpm=self.rpm,
+                tpm=self.tpm,
+                paused_for=round(max(0.0, self._paused_until - now), 1),
+                estimated_wait=round(self._estimate_wait(len(self._queue)), 1)
+            )
+
+    @staticmethod
+    def _timeout(deadline):
+        return deadline.remaining() if deadline is not None else None
+
+    def _prune(self, now):
+        while self._window and now - self._window[0][0] >= 60:
+            self._window.popleft()
+
+    def _budget_wait(self, tokens, now):
+        """Seconds until a call of `tokens` fits the quota (<= 0 means now)"""
+        self._prune(now)
+        wait = self._paused_until - now
+        if len(self._window) >= self.rpm:
+            wait = max(wait, self._window[len(self._window) - self.rpm][0] + 60 - now)
+        used = sum(slot_tokens for _, slot_tokens in self._window)
+        if self._window and used + tokens > self.tpm:
+            # Wait for enough of the oldest calls to leave the window
+            for started, slot_tokens in self._window:
+                used -= slot_tokens
+                if used + tokens <= self.tpm:
+                    wait = max(wait, started + 60 - now)
+                    break
+            else:
+                # Larger than the whole budget: send it once the window is empty
+                wait = max(wait, self._window[-1][0] + 60 - now)
+        return wait
+
+    def _estimate_wait(self, position):
+        now = time.monotonic()
+        self._prune(now)
+        paused = max(0.0, self._paused_until - now)
+        free_slots = self.rpm - len(self._window)
+        if position < free_slots:
+            return paused
+        # Calls beyond the free slots go out at the sustained rate
+        return paused + (position - free_slots + 1) * 60.0 / self.rpm
@@ -0,0 +1,176 @@
+"""
+Load-test driver for the SlidesGPT web app
+Each virtual user loops over the full user journey: POST /generate, then
+GET /api/slides/<file> and GET /download/<file>. The requested concurrency is
+held until the given number of journeys has run, and the driver reports
+throughput plus p50/p95/p99 latency per endpoint. Run it against an app wired
+to fake_services.py to size workers without touching the real providers:
+
+    python loadtest.py --url http://127.0.0.1:5000 --concurrency 16 --journeys 200
+    python loadtest.py --journeys 50 --json baseline.json --max-p95-ms 8000
+
+Exits non-zero if any --max-* threshold is exceeded, so it can gate regressions.
+"""
+
+import argparse
+import json
+import math
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+ENDPOINTS = ('generate', 'slides', 'download')
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class Recorder:
+    """Latencies and status codes per endpoint, shared by all virtual users"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {name: [] for name in ENDPOINTS}
+        self.statuses = {name: {} for name in ENDPOINTS}
+
+    def record(self, endpoint, seconds, status):
+        with self._lock:
+            if status == 200:
+                self.latencies[endpoint].append(seconds)
+            counts = self.statuses[endpoint]
+            counts[status] = counts.get(status, 0) + 1
+
+    def report(self, elapsed, journeys):
+        result = {'elapsed_s': round(elapsed, 2), 'journeys': journeys,
+                  'journeys_per_s': round(journeys / elapsed, 3) if elapsed else None, 'endpoints': {}}
+        for name in ENDPOINTS:
+            latencies = self.latencies[name]
+            requests = sum(self.statuses[name].values())
+            result['endpoints'][name] = {
+                'requests': requests,
+                'ok': len(latencies),
+                'errors': requests - len(latencies),
+                'statuses': {str(status): count for status, count in sorted(self.statuses[name].items(), key=str)},
+                'requests_per_s': round(requests / elapsed, 3) if elapsed else None,
+                **{
+                    f"p{pct}_ms": round(percentile(latencies, pct) * 1000, 1) if latencies else None
+                    for pct in (50, 95, 99)
+                },
+            }
+        return result
+
+
+def timed(recorder, endpoint, call):
+    """Run one request, recording its latency and status (0 = connection error)"""
+    start = time.perf_counter()
+    try:
+        response = call()
+        status = response.status_code
+    except Exception:
+        response, status = None, 0
+    recorder.record(endpoint, time.perf_counter() - start, status)
+    return response if status == 200 else None
+
+
+def journey(session, args, recorder, number):
+    """One user: generate a deck, load it in the viewer, download it"""
+    payload = {
+        # Unique topics keep coalescing and caches from hiding the real cost
+        'prompt': f"{args.topic} {number if args.unique else ''}".strip(),
+        'num_slides': args.slides,
+        'include_images': args.images or args.ai_images,
+        'use_ai_images': args.ai_images,
+        'theme': args.theme,
+    }
+    if args.time_budget:
+        payload['time_budget'] = args.time_budget
+    response = timed(recorder, 'generate', lambda: session.post(
+        f"{args.url}/generate", json=payload, timeout=args.timeout,
+        headers={'Idempotency-Key': str(uuid.uuid4())}
+    ))
+    if response is None:
+        return False
+    filename = response.json()['filename']
+    timed(recorder, 'slides', lambda: session.get(f"{args.url}/api/slides/{filename}", timeout=args.timeout))
+    timed(recorder, 'download', lambda: session.get(f"{args.url}/download/{filename}", timeout=args.timeout))
+    return True
+
+
+def run(args):
+    import requests
+
+    recorder = Recorder()
+    local = threading.local()
+
+    def user(number):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        return journey(local.session, args, recorder, number)
+
+    print(f"🚦 {args.journeys} journeys at concurrency {args.concurrency} against {args.url}")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        completed = sum(pool.map(user, range(args.journeys)))
+    return recorder.report(time.perf_counter() - start, completed)
+
+
+def print_report(report):
+    print(f"\n⏱️  {report['elapsed_s']}s, {report['journeys']} complete journeys "
+          f"({report['journeys_per_s']}/s)")
+    print(f"   {'endpoint':<10} {'req':>6} {'err':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stats in report['endpoints'].items():
+        cells = [stats[key] if stats[key] is not None else '-' for key in ('p50_ms', 'p95_ms', 'p99_ms')]
+        print(f"   {name:<10} {stats['requests']:>6} {stats['errors']:>5} {stats['requests_per_s']:>8} "
+              f"{cells[0]:>9} {cells[1]:>9} {cells[2]:>9}")
+        if stats['errors']:
+            print(f"   {'':<10} statuses: {stats['statuses']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the SlidesGPT web app')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Base URL of the app')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent virtual users')
+    parser.add_argument('--journeys', type=int, default=50, help='Generate/view/download journeys to run')
+    parser.add_argument('--slides', type=int, default=8)
+    parser.add_argument('--topic', default='Load test deck')
+    parser.add_argument('--theme', default='modern_blue')
+    parser.add_argument('--images', action='store_true', help='Request stock images')
+    parser.add_argument('--ai-images', action='store_true', help='Request AI images')
+    parser.add_argument('--repeat-topics', dest='unique', action='store_false',
+                        help='Send the same topic every time (measures coalescing and caches)')
+    parser.add_argument('--time-budget', type=float, help='time_budget sent with each /generate')
+    parser.add_argument('--timeout', type=float, default=300, help='Per-request timeout in seconds')
+    parser.add_argument('--json', metavar='PATH', help='Also write the report as JSON')
+    parser.add_argument('--max-p95-ms', type=float, help='Fail if /generate p95 exceeds this')
+    parser.add_argument('--max-error-rate', type=float, help='Fail if more than this fraction of requests fail')
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    p95 = report['endpoints']['generate']['p95_ms']
+    if args.max_p95_ms is not None and (p95 is None or p95 > args.max_p95_ms):
+        failures.append(f"/generate p95 {p95} ms exceeds {args.max_p95_ms:.0f} ms")
+    if args.max_error_rate is not None:
+        requests = sum(stats['requests'] for stats in report['endpoints'].values())
+        errors = sum(stats['errors'] for stats in report['endpoints'].values())
+        if requests and errors / requests > args.max_error_rate:
+            failures.append(f"error rate {errors / requests:.1%} exceeds {args.max_error_rate:.1%}")
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
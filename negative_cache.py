@@ -0,0 +1,173 @@
+"""
+Negative cache for failed image lookups
+A failed download is remembered for a short TTL instead of being cached as a
+placeholder under the real image's key: requests inside the window skip the
+provider and get a placeholder (stored under its own key), and a background
+refresher retries the failed images so the real ones land in the cache once
+the provider recovers.
+"""
+
+import json
+import os
+import threading
+import time
+
+from image_cache import atomic_write
+
+# Failed entries nobody managed to refresh are forgotten a day after their
+# first failure, or after this many failed attempts (IMAGE_REFRESH_MAX_ATTEMPTS)
+MAX_AGE = 86400
+MAX_ATTEMPTS = 10
+
+
+class NegativeCache:
+    """
+    Recently failed image lookups, one small JSON file per image.
+
+    Entries live on disk so every worker process on the host honours them;
+    the file's mtime is the time of the last failure (or retry), and the entry
+    records the first failure and the number of failed attempts.
+
+    cache_dir: where entries are kept (default cache/images/failed)
+    ttl: seconds a failure suppresses new attempts (IMAGE_FAILURE_TTL, default 300)
+    """
+
+    def __init__(self, cache_dir=None, ttl=None):
+        self.cache_dir = cache_dir or os.path.join('cache', 'images', 'failed')
+        self.ttl = ttl if ttl is not None else float(os.getenv('IMAGE_FAILURE_TTL', 300))
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, cache_path):
+        return os.path.join(self.cache_dir, os.path.basename(cache_path) + '.json')
+
+    def is_failed(self, cache_path):
+        """True if the image failed within the last `ttl` seconds"""
+        try:
+            return time.time() - os.path.getmtime(self._path(cache_path)) < self.ttl
+        except OSError:
+            return False
+
+    def _read(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def add(self, cache_path, entry):
+        """Record (or refresh) a failure; `entry` says how to retry it"""
+        previous = self._read(self._path(cache_path)) or {}
+        entry = dict(
+            entry,
+            first_failed=previous.get('first_failed', time.time()),
+            attempts=previous.get('attempts', 0) + 1
+        )
+        atomic_write(self._path(cache_path), json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+
+    def claim(self, cache_path, min_age):
+        """
+        Take an entry for a retry unless it failed or was claimed in the last
+        `min_age` seconds, so worker processes do not retry it in lockstep.
+        """
+        path = self._path(cache_path)
+        try:
+            if time.time() - os.path.getmtime(path) < min_age:
+                return False
+            os.utime(path)
+        except OSError:
+            return False
+        return True
+
+    def clear(self, cache_path):
+        try:
+            os.remove(self._path(cache_path))
+        except FileNotFoundError:
+            pass
+
+    def entries(self):
+        """(seconds since the last failure, entry) for every recorded failure"""
+        now = time.time()
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                age = now - os.path.getmtime(path)
+            except OSError:
+                continue
+            entry = self._read(path)
+            if entry is not None:
+                yield age, entry
+
+    def usage(self):
+        failures = list(self.entries())
+        return {
+            'failed': len(failures),
+            'suppressed': sum(1 for age, _ in failures if age < self.ttl),
+            'ttl': self.ttl
+        }
+
+
+class ImageRefresher:
+    """
+    Daemon thread that retries failed images off the request path.
+
+    refresh(entry) retries one entry and returns True once the real image is
+    cached; it is responsible for clearing or re-recording the failure.
+
+    interval: seconds between passes, and the least time between two retries
+        of one entry by any process (IMAGE_REFRESH_INTERVAL, default 60)
+    max_attempts: failed attempts after which an entry is dropped
+        (IMAGE_REFRESH_MAX_ATTEMPTS, default 10)
+    """
+
+    def __init__(self, negative_cache, refresh, interval=None, max_attempts=None):
+        self.negative_cache = negative_cache
+        self.refresh = refresh
+        self.interval = interval or float(os.getenv('IMAGE_REFRESH_INTERVAL', 60))
+        self.max_attempts = max_attempts or int(os.getenv('IMAGE_REFRESH_MAX_ATTEMPTS', MAX_ATTEMPTS))
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {'passes': 0, 'refreshed': 0, 'expired': 0}
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='image-refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self):
+        """Retry every recorded failure once; returns how many were upgraded"""
+        refreshed = 0
+        now = time.time()
+        for age, entry in self.negative_cache.entries():
+            if self._stop.is_set():
+                break
+            cache_path = entry.get('cache_path', '')
+            # Retries re-record the failure, so expiry counts from the first one
+            failed_for = now - entry.get('first_failed', now - age)
+            if failed_for > MAX_AGE or entry.get('attempts', 1) >= self.max_attempts:
+                self.negative_cache.clear(cache_path)
+                self.stats['expired'] += 1
+                continue
+            # Another worker retried it recently (or it just failed again)
+            if not self.negative_cache.claim(cache_path, self.interval):
+                continue
+            try:
+                if self.refresh(entry):
+                    refreshed += 1
+            except Exception as e:
+                print(f"⚠️  Image refresh error: {e}")
+        self.stats['passes'] += 1
+        self.stats['refreshed'] += refreshed
+        if refreshed:
+            print(f"🔄 Upgraded {refreshed} placeholder image(s) to real images")
+        return refreshed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
@@ -0,0 +1,282 @@
+"""
+Similarity index over previously generated deck outlines
+Near-identical requests ("Intro to Kubernetes for managers" and "Kubernetes
+introduction for management") do not need a cold Gemini generation each. Every
+generated deck is recorded under the shingles of its normalized prompt, style
+and audience; a MinHash/LSH index finds earlier decks of the same shape (slide
+count, code and image fields) whose shingle sets are close, and the generator
+seeds the new generation with the match's outline. Returning a very close
+match as is, without calling Gemini, is opt-in ('auto'); by default such a
+match is only offered.
+
+Entries are appended to a JSON-lines file (slides live in one JSON file per
+outline) so every process sharing the cache directory sees them, like the
+image QueryIndex. Decks generated for one owner (user or tenant) are never
+matched for another.
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import zlib
+from collections import Counter
+
+from image_query_index import STOPWORDS
+
+# Signature length and LSH banding (32 bands of 2 rows: candidates down to ~0.3 similarity)
+NUM_PERMUTATIONS = 64
+BAND_ROWS = 2
+
+# Words are cut to this many characters, a cheap stemmer that also merges
+# "intro"/"introduction" and "manager"/"management"
+TOKEN_PREFIX = 5
+
+_MERSENNE = (1 << 61) - 1
+_rng = random.Random(0x0D1CE)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERMUTATIONS)
+]
+
+_NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+
+# OUTLINE_REUSE modes: 'auto' reuses very close matches or seeds, 'seed' (the
+# default) only seeds and offers the reusable ones, 'off' disables
+REUSE_MODES = ('auto', 'seed', 'off')
+
+
+def _tokens(text):
+    words = _NON_WORD.sub(' ', str(text).casefold()).split()
+    return {word[:TOKEN_PREFIX] for word in words if word not in STOPWORDS}
+
+
+def shingles(prompt, style='', audience=''):
+    """Shingle set of a request: prompt word stems plus its style and audience"""
+    features = _tokens(prompt)
+    if style:
+        features.add(f"style={str(style).casefold()}")
+    features.update(f"@{token}" for token in _tokens(audience))
+    return features
+
+
+def minhash(features):
+    """MinHash signature of a shingle set (stable across processes)"""
+    hashes = [zlib.crc32(feature.encode('utf-8')) for feature in features] or [0]
+    # Kept to 32 bits so index lines stay short
+    return [min((a * h + b) % _MERSENNE for h in hashes) & 0xFFFFFFFF for a, b in _PERMUTATIONS]
+
+
+def jaccard(first, second):
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+def variant_key(num_slides, include_code, image_field, owner=None):
+    """
+    Only outlines generated for the same deck shape, and for the same owner
+    when one is given, are interchangeable. The owner is stored hashed.
+    """
+    key = f"{num_slides}|{int(bool(include_code))}|{image_field or ''}"
+    if owner:
+        key += '|' + hashlib.sha256(str(owner).encode('utf-8')).hexdigest()[:16]
+    return key
+
+
+class OutlineIndex:
+    """
+    MinHash/LSH index over the outlines of generated decks.
+
+    reuse_threshold: similarity at which a stored deck is reused without calling
+        Gemini (OUTLINE_REUSE_THRESHOLD, default 0.9; above 1 disables reuse)
+    seed_threshold: similarity at which its outline seeds the new generation
+        (OUTLINE_SEED_THRESHOLD, default 0.6; above 1 disables seeding)
+    mode: default reuse mode, one of REUSE_MODES (OUTLINE_REUSE, default 'seed')
+    """
+
+    def __init__(self, cache_dir, reuse_threshold=None, seed_threshold=None, mode=None):
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, 'index.jsonl')
+        self.reuse_threshold = reuse_threshold if reuse_threshold is not None else float(
+            os.getenv('OUTLINE_REUSE_THRESHOLD', 0.9)
+        )
+        self.seed_threshold = seed_threshold if seed_threshold is not None else float(
+            os.getenv('OUTLINE_SEED_THRESHOLD', 0.6)
+        )
+        self.mode = mode or os.getenv('OUTLINE_REUSE', 'seed')
+        self._lock = threading.Lock()
+        self._offset = 0
+        self._entries = []
+        self._features = []
+        self._buckets = {}
+        self._known = set()
+        self._by_id = {}
+        self.stats = Counter()
+
+    def outline_path(self, outline_id):
+        return os.path.join(self.cache_dir, f"{outline_id}.json")
+
+    def add(self, prompt, style, audience, variant, slides_data):
+        """Record a generated deck; its slides are stored next to the index"""
+        features = shingles(prompt, style, audience)
+        outline_id = hashlib.sha1(
+            json.dumps([variant, sorted(features)]).encode('utf-8')
+        ).hexdigest()[:16]
+        self.refresh()
+        if outline_id in self._known:
+            return outline_id
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(slides_data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.outline_path(outline_id))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        record = {
+            'id': outline_id,
+            'variant': variant,
+            'prompt': prompt[:200],
+            'features': sorted(features),
+            'sig': minhash(features),
+        }
+        # One line per append, so concurrent writers do not interleave
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.refresh()
+        return outline_id
+
+    def refresh(self):
+        """Load entries appended since the last refresh (by any process)"""
+        with self._lock:
+            try:
+                if os.path.getsize(self.path) <= self._offset:
+                    return
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    f.seek(self._offset)
+                    chunk = f.read()
+            except OSError:
+                return
+            # Only consume complete lines; a partial last line is read next time
+            complete = chunk[:chunk.rfind('\n') + 1]
+            self._offset += len(complete.encode('utf-8'))
+            for line in complete.splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self._insert(record)
+
+    def _insert(self, record):
+        if record['id'] in self._known:
+            return
+        self._known.add(record['id'])
+        self._by_id[record['id']] = record
+        index = len(self._entries)
+        self._entries.append(record)
+        self._features.append(frozenset(record['features']))
+        for bucket in self._bands(record['variant'], record['sig']):
+            self._buckets.setdefault(bucket, []).append(index)
+
+    @staticmethod
+    def _bands(variant, signature):
+        for start in range(0, NUM_PERMUTATIONS, BAND_ROWS):
+            yield (variant, start, tuple(signature[start:start + BAND_ROWS]))
+
+    def find_similar(self, prompt, style, audience, variant):
+        """Closest stored outline of the same variant as (record, similarity), or None"""
+        self.refresh()
+        features = shingles(prompt, style, audience)
+        with self._lock:
+            candidates = set()
+            for bucket in self._bands(variant, minhash(features)):
+                candidates.update(self._buckets.get(bucket, ()))
+            # LSH only narrows the search; candidates are ranked on exact Jaccard
+            best = None
+            for index in candidates:
+                similarity = jaccard(features, self._features[index])
+                if best is None or similarity > best[1]:
+                    best = (self._entries[index], similarity)
+        return best
+
+    def lookup(self, prompt, style, audience, variant, mode=None):
+        """
+        Decide how to use earlier outlines for a request.
+
+        Returns (action, record, similarity, slides) where action is 'reuse',
+        'seed' or None; the lookup outcome is counted in the hit statistics.
+        """
+        mode = mode or self.mode
+        if mode not in REUSE_MODES:
+            raise ValueError(f"outline reuse mode must be one of: {', '.join(REUSE_MODES)}")
+        if mode == 'off':
+            return None, None, 0.0, None
+
+        match = self.find_similar(prompt, style, audience, variant)
+        action = None
+        if match is not None:
+            if mode == 'auto' and match[1] >= self.reuse_threshold:
+                action = 'reuse'
+            elif match[1] >= self.seed_threshold:
+                action = 'seed'
+        slides = self.load(match[0]['id']) if action else None
+        if action and slides is None:
+            action = None
+        self.record(action or 'miss')
+        if action is None:
+            return None, None, 0.0, None
+        return action, match[0], match[1], slides
+
+    def reuse(self, outline_id, variant):
+        """
+        A specific stored outline chosen by the client (e.g. one offered as
+        reusable) as (record, slides), or (None, None) if it is unknown, of
+        another deck shape or gone; counted as a reuse when found.
+        """
+        self.refresh()
+        with self._lock:
+            record = self._by_id.get(outline_id)
+        if record is None or record['variant'] != variant:
+            return None, None
+        slides = self.load(outline_id)
+        if slides is None:
+            return None, None
+        self.record('reuse')
+        return record, slides
+
+    def load(self, outline_id):
+        """Stored slides of an outline, or None if its file is gone"""
+        try:
+            with open(self.outline_path(outline_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def record(self, outcome):
+        """Count a lookup outcome: 'reuse', 'seed' or 'miss'"""
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def hit_rate(self):
+        """Lookup counters and hit rates for this process"""
+        with self._lock:
+            reused, seeded, miss = self.stats['reuse'], self.stats['seed'], self.stats['miss']
+            entries = len(self._entries)
+        total = reused + seeded + miss
+        return {
+            'entries': entries,
+            'lookups': total,
+            'reused': reused,
+            'seeded': seeded,
+            'misses': miss,
+            'hit_rate': round((reused + seeded) / total, 3) if total else None,
+            'reuse_rate': round(reused / total, 3) if total else None,
+            'reuse_threshold': self.reuse_threshold,
+            'seed_threshold': self.seed_threshold,
+        }
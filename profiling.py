@@ -0,0 +1,181 @@
+"""
+Built-in profiling for the CLI entry points (--profile)
+Code marks its stages with `with stage('name'):`, which costs nothing unless
+a Profiler is active. An active profiler records each stage's wall and CPU
+time and tracemalloc peak memory, samples every thread's call stack on a
+background thread, and writes:
+
+  stages.json     per-stage wall/CPU time and peak memory (plus top allocations
+                  for top-level stages)
+  stacks.folded   sampled stacks in folded format (flamegraph.pl, speedscope,
+                  inferno)
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# The profiler of the current run, if any (one per process)
+_active = None
+
+# Seconds between stack samples (PROFILE_SAMPLE_INTERVAL, default 5 ms)
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# Allocation sites listed per top-level stage
+TOP_ALLOCATIONS = 10
+
+
+def stage(name):
+    """Context manager timing one stage under the active profiler (no-op otherwise)"""
+    if _active is None:
+        return nullcontext()
+    return _active.stage(name)
+
+
+class _Stage:
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak = 0
+        self.top_allocations = None
+
+
+class Profiler:
+    """
+    Stage timings, stack samples and memory peaks for one run.
+
+    output_dir: where the report files are written
+    sample_interval: seconds between stack samples
+    """
+
+    def __init__(self, output_dir='profile', sample_interval=None):
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval or float(
+            os.getenv('PROFILE_SAMPLE_INTERVAL', DEFAULT_SAMPLE_INTERVAL)
+        )
+        self.stages = []
+        self.samples = {}
+        self._stack = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._started = None
+
+    def start(self):
+        global _active
+        tracemalloc.start()
+        self._started = (time.perf_counter(), time.process_time())
+        self._sampler = threading.Thread(target=self._sample_loop, name='profile-sampler', daemon=True)
+        self._sampler.start()
+        _active = self
+        return self
+
+    def stop(self):
+        """Stop sampling and write the report; returns the stage list"""
+        global _active
+        _active = None
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+        total = _Stage('total', 0)
+        total.wall = time.perf_counter() - self._started[0]
+        total.cpu = time.process_time() - self._started[1]
+        total.peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.stages.append(total)
+        self.write()
+        return self.stages
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @contextmanager
+    def stage(self, name):
+        # Stages opened on other threads are timed but not nested or memory-tracked
+        owner = threading.current_thread() is threading.main_thread()
+        record = _Stage(name, len(self._stack) if owner else 0)
+        with self._lock:
+            self.stages.append(record)
+        if owner:
+            # Fold the running peak into the parent before resetting it for this stage
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._stack.append(record)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield record
+        finally:
+            record.wall = time.perf_counter() - wall
+            record.cpu = time.thread_time() - cpu
+            if owner:
+                self._stack.pop()
+                record.peak = max(record.peak, tracemalloc.get_traced_memory()[1])
+                if self._stack:
+                    self._stack[-1].peak = max(self._stack[-1].peak, record.peak)
+                else:
+                    record.top_allocations = self._top_allocations()
+
+    @staticmethod
+    def _top_allocations():
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        return [
+            {'where': str(stat.traceback[0]), 'size': stat.size, 'count': stat.count}
+            for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]
+        ]
+
+    def _sample_loop(self):
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.sample_interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                key = ';'.join(reversed(stack))
+                self.samples[key] = self.samples.get(key, 0) + 1
+
+    def write(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, 'stacks.folded'), 'w', encoding='utf-8') as f:
+            for key, count in sorted(self.samples.items()):
+                f.write(f"{key} {count}\n")
+        with open(os.path.join(self.output_dir, 'stages.json'), 'w', encoding='utf-8') as f:
+            json.dump([
+                {
+                    'stage': record.name,
+                    'depth': record.depth,
+                    'wall_ms': round(record.wall * 1000, 2),
+                    'cpu_ms': round(record.cpu * 1000, 2),
+                    'peak_kb': round(record.peak / 1024, 1),
+                    'top_allocations': record.top_allocations,
+                }
+                for record in self.stages
+            ], f, indent=2)
+
+    def summary(self):
+        """Printable per-stage table"""
+        lines = [f"{'stage':<40} {'wall ms':>10} {'cpu ms':>10} {'peak KB':>10}"]
+        for record in self.stages:
+            label = ('  ' * record.depth + record.name)[:40]
+            lines.append(f"{label:<40} {record.wall * 1000:>10.1f} {record.cpu * 1000:>10.1f} {record.peak / 1024:>10.1f}")
+        return '\n'.join(lines)
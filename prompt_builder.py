@@ -0,0 +1,157 @@
+"""
+Shared prompt and response-schema builder for slide generation
+Used by both FreeSlideGenerator and the legacy SlideGenerator
+"""
+
+DIAGRAM_TYPES = ["flowchart", "timeline", "comparison", "cycle", "pyramid"]
+
+STYLE_GUIDANCE = {
+    "professional": "Use formal language, focus on business value and ROI, include data and metrics",
+    "educational": "Use clear explanations, include learning objectives, break down complex concepts",
+    "technical": "Use technical terminology, include detailed examples, focus on implementation",
+    "creative": "Use engaging language, include storytelling elements, focus on inspiration",
+    "minimalist": "Use concise points, minimal text per slide, focus on key takeaways",
+    "playful": "Use casual language, include fun analogies, make it engaging and light"
+}
+
+# Per-field guidance shown to the model, and the example value used in plain-JSON mode
+FIELD_GUIDANCE = {
+    "ai_image_prompt": (
+        "DETAILED descriptive prompt for AI image generation (be specific, describe style, mood, colors)",
+        "professional 3D render of ..."
+    ),
+    "image_search": (
+        "SHORT search query for free stock photos (2-4 words max)",
+        "short stock photo query"
+    ),
+    "image_prompt": (
+        "description of a relevant image (only where images add value, otherwise empty)",
+        "Description of image (optional)"
+    ),
+    "code": (
+        "relevant, concise code example with proper syntax (empty when not relevant)",
+        "code example here"
+    ),
+}
+
+_STRING = {"type": "STRING"}
+
+
+def build_slide_schema(include_code=False, image_field=None, include_diagrams=True, numbered=False):
+    """
+    Build a compact response schema for {"slides": [...]} with only the enabled fields.
+
+    The schema uses the OpenAPI subset accepted by Gemini's `response_schema`.
+    """
+    properties = {
+        "title": _STRING,
+        "bullets": {"type": "ARRAY", "items": _STRING},
+        "notes": _STRING,
+    }
+    required = ["title", "bullets", "notes"]
+
+    if numbered:
+        properties["slide_number"] = {"type": "INTEGER"}
+        required.insert(0, "slide_number")
+    if image_field:
+        properties[image_field] = _STRING
+    if include_code:
+        properties["code"] = _STRING
+    if include_diagrams:
+        properties["diagram"] = {
+            "type": "OBJECT",
+            "properties": {
+                "type": {"type": "STRING", "enum": DIAGRAM_TYPES},
+                "data": {"type": "ARRAY", "items": _STRING},
+            },
+            "required": ["type", "data"],
+        }
+
+    return {
+        "type": "OBJECT",
+        "properties": {
+            "slides": {
+                "type": "ARRAY",
+                "items": {"type": "OBJECT", "properties": properties, "required": required},
+            }
+        },
+        "required": ["slides"],
+    }
+
+
+def _json_example(include_code, image_field, include_diagrams, numbered):
+    """One-line example slide object for plain-JSON mode"""
+    fields = []
+    if numbered:
+        fields.append('"slide_number": 1')
+    fields += ['"title": "Slide Title"', '"bullets": ["Point 1", "Point 2", "Point 3"]', '"notes": "Speaker notes"']
+    if image_field:
+        fields.append(f'"{image_field}": "{FIELD_GUIDANCE[image_field][1]}"')
+    if include_code:
+        fields.append(f'"code": "{FIELD_GUIDANCE["code"][1]}"')
+    if include_diagrams:
+        fields.append('"diagram": {"type": "flowchart", "data": ["Step 1", "Step 2", "Step 3"]}')
+    return '{' + ', '.join(fields) + '}'
+
+
+def build_slide_prompt(topic, num_slides, style="professional", audience="", include_code=False,
+                       image_field=None, include_diagrams=True, numbered=False, theme_name=None,
+                       structured=True, outline=None):
+    """
+    Build the slide-generation prompt.
+
+    In structured mode the response shape is enforced by the schema from
+    build_slide_schema(), so the prompt only carries content guidance.
+    Otherwise a single compact JSON example is appended. `outline` is a list
+    of slide titles from a similar earlier deck to start from.
+    """
+    lines = [
+        f"Create a {style} presentation with {num_slides} slides based on this request:",
+        "",
+        topic,
+        "",
+        f"STYLE: {style} - {STYLE_GUIDANCE.get(style, STYLE_GUIDANCE['professional'])}",
+        f"AUDIENCE: {audience or 'General audience'}",
+    ]
+    if theme_name:
+        lines.append(f"THEME: {theme_name}")
+    if outline:
+        lines += ["", "Start from this outline of a similar earlier presentation. Keep its structure where it "
+                      "fits the request, adjust titles that do not, and write fresh bullets, notes and details:"]
+        lines += [f"{number}. {title}" for number, title in enumerate(outline, 1)]
+
+    lines += [
+        "",
+        "Each slide has:",
+        "- title: clear, engaging title (max 10 words)",
+        "- bullets: 3-5 concise bullet points",
+        "- notes: speaker notes with additional context",
+    ]
+    if image_field:
+        lines.append(f"- {image_field}: {FIELD_GUIDANCE[image_field][0]}")
+    if include_code:
+        lines.append(f"- code: {FIELD_GUIDANCE['code'][0]}")
+    if include_diagrams:
+        lines += [
+            "- diagram (optional): {type, data} where data is a list of short item labels and type is",
+            "  flowchart (step-by-step processes), timeline (chronological events, roadmaps),",
+            "  comparison (pros vs cons, first half vs second half of data), cycle (iterative processes)",
+            "  or pyramid (hierarchies, priorities)",
+        ]
+
+    lines += [
+        "",
+        "Slide 1 introduces the topic and the last slide is a conclusion or summary.",
+        "Keep a logical flow and make the content engaging and well-structured.",
+    ]
+    if include_diagrams:
+        lines.append("Include at least 2-3 diagrams where they help visual engagement.")
+    if image_field == "ai_image_prompt":
+        lines.append("For AI images, be very descriptive: 'professional 3D render of a modern office "
+                     "workspace, bright natural lighting, minimalist design, blue and white colors'")
+
+    if not structured:
+        example = _json_example(include_code, image_field, include_diagrams, numbered)
+        lines += ["", f'Return ONLY a JSON object like {{"slides": [{example}, ...]}}']
+
+    return "\n".join(lines)
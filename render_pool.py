@@ -0,0 +1,128 @@
+"""
+Process pool for CPU-bound PPTX rendering
+Building the slide XML, encoding images and zipping the package all hold the
+GIL, so decks are rendered in warm worker processes instead of Flask threads.
+Images are fetched by the caller; workers only receive slide data, theme and
+the image paths, and write the package to the requested output path.
+"""
+
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+# Per-worker renderer, created once by the pool initializer
+_renderer = None
+
+
+class RenderTimeout(Exception):
+    """Raised when a render task exceeds its time limit"""
+
+
+def _init_worker():
+    global _renderer
+    from free_slide_generator import FreeSlideGenerator
+    from text_fit import warm_up
+
+    _renderer = FreeSlideGenerator(render_only=True)
+    warm_up()
+
+
+def _on_alarm(signum, frame):
+    raise RenderTimeout("Render task timed out")
+
+
+def _render(slides_data, output_path, theme, image_paths, timeout):
+    # Enforce the limit inside the worker where SIGALRM exists, so a slow deck
+    # fails on its own without taking the other in-flight renders down with it
+    use_alarm = timeout and hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.alarm(int(timeout))
+    try:
+        _renderer.create_presentation(slides_data, output_path, theme, image_paths=image_paths)
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+    return output_path
+
+
+def _ping():
+    # Linger briefly so concurrent pings land on different workers
+    time.sleep(0.2)
+    return os.getpid()
+
+
+class RenderPool:
+    """
+    Warm pool of rendering processes.
+
+    size: number of worker processes (RENDER_POOL_SIZE, default CPU count)
+    task_timeout: seconds allowed per deck (RENDER_TIMEOUT, default 120)
+    max_tasks_per_child: decks a worker renders before it is replaced, which
+        bounds memory growth (RENDER_MAX_TASKS_PER_CHILD, default 50; needs
+        Python 3.11+, older versions keep their workers)
+    """
+
+    def __init__(self, size=None, task_timeout=None, max_tasks_per_child=None):
+        self.size = size or int(os.getenv('RENDER_POOL_SIZE', 0)) or os.cpu_count() or 1
+        self.task_timeout = task_timeout or float(os.getenv('RENDER_TIMEOUT', 120))
+        self.max_tasks_per_child = max_tasks_per_child or int(os.getenv('RENDER_MAX_TASKS_PER_CHILD', 50))
+        self._lock = threading.Lock()
+        self._executor = self._new_executor()
+
+    def _new_executor(self):
+        # Worker recycling is not available with fork; spawn also keeps workers
+        # free of the parent's threads and open sockets
+        options = {}
+        if sys.version_info >= (3, 11):
+            options['max_tasks_per_child'] = self.max_tasks_per_child
+        return ProcessPoolExecutor(
+            max_workers=self.size,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            **options
+        )
+
+    def warm(self):
+        """Start every worker now instead of on the first request"""
+        futures = [self._executor.submit(_ping) for _ in range(self.size)]
+        return sorted({future.result() for future in futures})
+
+    def render(self, slides_data, output_path, theme="modern_blue", image_paths=None):
+        """Render a deck in a worker process and return the package path"""
+        executor = self._executor
+        future = executor.submit(_render, slides_data, output_path, theme, image_paths, self.task_timeout)
+        try:
+            # Small grace period on top of the in-worker alarm
+            return future.result(timeout=self.task_timeout + 5)
+        except FutureTimeout:
+            print(f"⚠️  Render timed out after {self.task_timeout}s, recycling pool")
+            self._recycle(executor)
+            raise RenderTimeout(f"Rendering took longer than {self.task_timeout}s")
+        except BrokenProcessPool:
+            print("⚠️  Render worker died, recycling pool")
+            self._recycle(executor)
+            raise
+
+    def _recycle(self, broken):
+        """Replace a stuck or broken executor, killing its processes"""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = self._new_executor()
+        for process in list((getattr(broken, '_processes', None) or {}).values()):
+            process.terminate()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def is_alive(self):
+        """False once the current executor has a dead worker or was shut down"""
+        executor = self._executor
+        return not (getattr(executor, '_broken', False) or getattr(executor, '_shutdown_thread', False))
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,167 @@
+"""
+Request coalescing and idempotency keys
+SingleFlight lets concurrent callers with the same key share one computation
+instead of repeating it; IdempotencyStore keeps finished /generate responses on
+disk for a window so client retries get the already-built deck back.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+class _Call:
+    """One in-flight computation and its outcome"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Per-key in-flight deduplication.
+
+    The first caller for a key runs the function; callers that arrive while it
+    is running wait and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.stats = {'leaders': 0, 'shared': 0}
+
+    def do(self, key, func):
+        """Run func() once per concurrent key; returns (result, shared)"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.stats['leaders'] += 1
+            else:
+                self.stats['shared'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines sharing one event loop"""
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, factory):
+        """Await factory() once per concurrent key; returns (result, shared)"""
+        import asyncio
+
+        task = self._calls.get(key)
+        shared = task is not None
+        if not shared:
+            task = self._calls[key] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda done: self._calls.pop(key, None) if self._calls.get(key) is done else None)
+        # shield() so one cancelled waiter does not cancel the work the others share
+        return await asyncio.shield(task), shared
+
+
+def normalize_text(value):
+    """Case- and whitespace-insensitive form of a free-text parameter"""
+    return ' '.join(str(value or '').split()).casefold()
+
+
+def params_key(params):
+    """Stable hash of a dict of (already normalized) generation parameters"""
+    payload = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused with different request parameters"""
+
+
+class IdempotencyStore:
+    """
+    Stored responses for Idempotency-Key headers.
+
+    Entries are JSON files named by the hashed key, so every worker process on
+    the host sees them; they expire `ttl` seconds after they were written.
+
+    cache_dir: where responses are kept (default cache/idempotency)
+    ttl: replay window in seconds (IDEMPOTENCY_TTL, default 86400)
+    """
+
+    def __init__(self, cache_dir=None, ttl=None):
+        self.cache_dir = cache_dir or os.path.join('cache', 'idempotency')
+        self.ttl = ttl if ttl is not None else float(os.getenv('IDEMPOTENCY_TTL', 86400))
+        self._last_prune = 0.0
+
+    def _path(self, key):
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, key, fingerprint):
+        """
+        Stored response for the key, or None when missing or expired.
+
+        Raises IdempotencyConflict when the key was used for other parameters.
+        """
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get('fingerprint') != fingerprint:
+            raise IdempotencyConflict(
+                'Idempotency-Key was already used for a request with different parameters'
+            )
+        return entry['response']
+
+    def put(self, key, fingerprint, response):
+        """Store a finished response (written atomically)"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': fingerprint, 'response': response}, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+        self.prune()
+
+    def prune(self, interval=300):
+        """Delete expired entries, at most once per `interval` seconds"""
+        now = time.time()
+        if now - self._last_prune < interval:
+            return
+        self._last_prune = now
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                if now - os.path.getmtime(path) > self.ttl:
+                    os.remove(path)
+            except OSError:
+                continue
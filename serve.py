@@ -0,0 +1,133 @@
+"""
+Production server entry point for SlidesGPT
+Runs app.py under gunicorn with pre-forked, pre-warmed workers:
+
+    python serve.py
+
+Configuration (environment variables):
+    HOST / PORT              bind address (default 0.0.0.0:5000)
+    WEB_WORKERS              worker processes (default: CPU count)
+    WEB_THREADS              threads per worker (default 8)
+    WEB_TIMEOUT              seconds before a silent worker is killed (default 300)
+    WEB_GRACEFUL_TIMEOUT     seconds to drain in-flight jobs on shutdown (default 120)
+    WEB_MAX_REQUESTS         requests before a worker is recycled (default 1000, 0 = never)
+    RENDER_POOL_SIZE         render processes per worker (default: CPU count / workers)
+"""
+
+import os
+import sys
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def build_options():
+    """gunicorn settings derived from the environment"""
+    cpus = os.cpu_count() or 1
+    workers = _env_int('WEB_WORKERS', cpus)
+    graceful_timeout = _env_int('WEB_GRACEFUL_TIMEOUT', 120)
+
+    # Split the cores between workers so render pools do not oversubscribe them
+    os.environ.setdefault('RENDER_POOL_SIZE', str(max(1, cpus // workers)))
+    os.environ.setdefault('SHUTDOWN_DRAIN_TIMEOUT', str(max(graceful_timeout - 5, 1)))
+
+    return {
+        'bind': f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5000')}",
+        'workers': workers,
+        'threads': _env_int('WEB_THREADS', 8),
+        'worker_class': 'gthread',
+        'timeout': _env_int('WEB_TIMEOUT', 300),
+        'graceful_timeout': graceful_timeout,
+        'keepalive': 5,
+        'max_requests': _env_int('WEB_MAX_REQUESTS', 1000),
+        'max_requests_jitter': 50,
+        # Import the app, fonts and deck skeleton once in the master so every
+        # forked worker shares them copy-on-write
+        'preload_app': True,
+        'post_fork': post_fork,
+        'post_worker_init': post_worker_init,
+        'worker_int': worker_int,
+        'worker_exit': worker_exit,
+    }
+
+
+def warm_shared_state():
+    """Imports, text metrics, image codecs and the deck skeleton, shared by all workers"""
+    from free_slide_generator import FreeSlideGenerator
+    FreeSlideGenerator.warm_up()
+
+
+def post_fork(server, worker):
+    """Per-worker state (Gemini client, HTTP pools, render pool) is created after fork"""
+    import app
+    app.init_generator()
+    if app.render_pool:
+        app.render_pool.warm()
+    server.log.info("Worker %s ready", worker.pid)
+
+
+def post_worker_init(worker):
+    """Start draining as soon as the worker is asked to stop, not after its last request"""
+    import signal
+    import app
+
+    # gunicorn installs its own SIGTERM handler just before this hook; chain to it
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def on_term(signum, frame):
+        app.start_draining()
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(signal.SIGTERM, on_term)
+
+
+def worker_int(worker):
+    """SIGINT/SIGQUIT: refuse new jobs while the worker shuts down"""
+    import app
+    app.start_draining()
+
+
+def worker_exit(server, worker):
+    """Drain in-flight generations and stop the worker's render pool"""
+    import app
+    app.shutdown()
+    server.log.info("Worker %s drained", worker.pid)
+
+
+def main():
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        # gunicorn is POSIX-only; fall back to the threaded development server
+        print("⚠️  gunicorn is not installed; serving with the threaded Flask server")
+        import app
+        app.init_generator()
+        app.app.run(host=os.getenv('HOST', '0.0.0.0'), port=_env_int('PORT', 5000),
+                    threaded=True, debug=False)
+        return 0
+
+    class SlidesGPTServer(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            warm_shared_state()
+            from app import app as flask_app
+            return flask_app
+
+    options = build_options()
+    print(f"🚀 SlidesGPT serving on {options['bind']} "
+          f"({options['workers']} workers x {options['threads']} threads)")
+    SlidesGPTServer(options).run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,29 +6,41 @@ Generates PowerPoint presentations using Google Gemini AI
 import os
 import argparse
 from typing import List, Dict
-import requests
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN
-from pptx.dml.color import RGBColor
 from dotenv import load_dotenv
 import json
+from json_salvage import parse_slides, salvage_slides, build_repair_prompt, merge_repaired
+from prompt_builder import build_slide_prompt, build_slide_schema
+from profiling import stage as profile_stage
 
 # Load environment variables
 load_dotenv()
 
+# requests and python-pptx are imported where they are used so that `--help`
+# and argument errors return without loading them
+
 
 class SlideGenerator:
     """Main class for generating AI-powered presentations"""
     
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, structured_output: bool = None):
         """Initialize the slide generator with Gemini API key"""
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
         if not self.api_key:
             raise ValueError("Gemini API key not found. Please set GEMINI_API_KEY in .env file")
         
         # Use gemini-2.5-flash which is available and fast
-        self.api_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={self.api_key}"
+        # (GEMINI_API_ENDPOINT points it at another host, e.g. fake_services.py)
+        endpoint = os.getenv('GEMINI_API_ENDPOINT', 'https://generativelanguage.googleapis.com').rstrip('/')
+        self.api_url = f"{endpoint}/v1beta/models/gemini-2.5-flash:generateContent?key={self.api_key}"
+        
+        # Native JSON output with a response schema (set GEMINI_STRUCTURED_OUTPUT=0 to disable)
+        if structured_output is None:
+            structured_output = os.getenv('GEMINI_STRUCTURED_OUTPUT', '1') != '0'
+        self.structured_output = structured_output
+        
+        # httpx.AsyncClient of the async API, created on first use per event loop
+        self._ahttp = None
+        self._ahttp_loop = None
     
     def generate_slide_content(self, topic: str, num_slides: int = 8, include_images: bool = False, include_code: bool = False, style: str = "professional", audience: str = "") -> List[Dict]:
         """
@@ -46,153 +58,17 @@ class SlideGenerator:
             List of dictionaries containing slide information
         """
         print(f"🤖 Generating {style} presentation based on your prompt...")
-        
-        # Style descriptions
-        style_guidance = {
-            "professional": "Use formal language, focus on business value and ROI, include data and metrics",
-            "educational": "Use clear explanations, include learning objectives, break down complex concepts",
-            "technical": "Use technical terminology, include detailed examples, focus on implementation",
-            "creative": "Use engaging language, include storytelling elements, focus on inspiration",
-            "minimalist": "Use concise points, minimal text per slide, focus on key takeaways",
-            "playful": "Use casual language, include fun analogies, make it engaging and light"
-        }
-        
-        style_instruction = style_guidance.get(style, style_guidance["professional"])
-        audience_instruction = f"\nTarget audience: {audience}. Tailor content complexity and language accordingly." if audience else ""
-        
-        # Build the prompt with proper JSON structure
-        json_example = '''  {
-    "slide_number": 1,
-    "title": "Slide Title",
-    "bullets": ["Point 1", "Point 2", "Point 3"],
-    "notes": "Speaker notes with additional context"
-  }'''
-        
-        extra_instructions = []
-        if include_images:
-            extra_instructions.append("- Include 'image_prompt' field with a description for relevant images (not for every slide, only where images add value)")
-            json_example = '''  {
-    "slide_number": 1,
-    "title": "Slide Title",
-    "bullets": ["Point 1", "Point 2", "Point 3"],
-    "notes": "Speaker notes with additional context",
-    "image_prompt": "Description of image (optional)"
-  }'''
-        
-        if include_code:
-            extra_instructions.append("- Include 'code' field with code examples when relevant to the topic (use proper syntax)")
-            if include_images:
-                json_example = '''  {
-    "slide_number": 1,
-    "title": "Slide Title",
-    "bullets": ["Point 1", "Point 2", "Point 3"],
-    "notes": "Speaker notes with additional context",
-    "image_prompt": "Description of image (optional)",
-    "code": "Code example (optional)"
-  }'''
-            else:
-                json_example = '''  {
-    "slide_number": 1,
-    "title": "Slide Title",
-    "bullets": ["Point 1", "Point 2", "Point 3"],
-    "notes": "Speaker notes with additional context",
-    "code": "Code example (optional)"
-  }'''
-        
-        # Build the prompt with proper JSON structure
-        extra_instructions = []
-        if include_images:
-            extra_instructions.append("- Include 'image_prompt' field with a description for relevant images (not for every slide, only where images add value)")
-            json_example = '''  {
-    "slide_number": 1,
-    "title": "Slide Title",
-    "bullets": ["Point 1", "Point 2", "Point 3"],
-    "notes": "Speaker notes with additional context",
-    "image_prompt": "Description of image (optional)"
-  }'''
-        
-        if include_code:
-            extra_instructions.append("- Include 'code' field with code examples when relevant to the topic (use proper syntax)")
-            if include_images:
-                json_example = '''  {
-    "slide_number": 1,
-    "title": "Slide Title",
-    "bullets": ["Point 1", "Point 2", "Point 3"],
-    "notes": "Speaker notes with additional context",
-    "image_prompt": "Description of image (optional)",
-    "code": "Code example (optional)"
-  }'''
-            else:
-                json_example = '''  {
-    "slide_number": 1,
-    "title": "Slide Title",
-    "bullets": ["Point 1", "Point 2", "Point 3"],
-    "notes": "Speaker notes with additional context",
-    "code": "Code example (optional)"
-  }'''
-        
-        prompt = f"""Create a {style} presentation with {num_slides} slides based on this user request:{audience_instruction}
-
-USER REQUEST:
-"{topic}"
-
-STYLE GUIDANCE: {style_instruction}
-
-For each slide, provide:
-1. A clear, concise title (max 10 words)
-2. 3-5 bullet points with key information (each bullet should be 1-2 sentences)
-3. Speaker notes with additional context (2-3 sentences)
-{chr(10).join(extra_instructions) if extra_instructions else ''}
-
-Format your response as a JSON array with this structure:
-[
-{json_example}
-]
-
-Make sure:
-- Slide 1 is a title slide with the presentation title and subtitle
-- Content is informative, engaging, and well-structured
-- Bullet points are concise but meaningful
-- The presentation has a logical flow from introduction to conclusion
-- The last slide is a conclusion or summary
-{"- Include relevant code examples for technical concepts (use proper syntax, keep examples concise)" if include_code else ""}
-{"- Suggest images that would help visualize key concepts" if include_images else ""}
-
-Return ONLY the JSON array, no additional text."""
+        prompt, generation_config = self._content_request(topic, num_slides, include_images, include_code, style, audience)
 
         try:
-            # Prepare the request payload
-            payload = {
-                "contents": [{
-                    "parts": [{
-                        "text": prompt
-                    }]
-                }]
-            }
-            
-            # Make the API request
-            response = requests.post(self.api_url, json=payload)
-            response.raise_for_status()
-            
-            # Parse the response
-            result = response.json()
-            content = result['candidates'][0]['content']['parts'][0]['text'].strip()
-            
-            # Extract JSON from response (in case there's extra text)
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0].strip()
+            content = self._call_gemini(prompt, generation_config)
             
             # Debug: Print the content to see what we're trying to parse
             print(f"📝 Debug - Raw JSON content (first 500 chars):\n{content[:500]}")
             
-            try:
-                slides_data = json.loads(content)
-            except json.JSONDecodeError as je:
-                print(f"❌ JSON Parse Error at line {je.lineno}, column {je.colno}")
-                print(f"📝 Full content that failed to parse:\n{content}")
-                raise
+            slides_data = self._slides_from_content(
+                prompt, content, num_slides, lambda repair_prompt: self._call_gemini(repair_prompt, generation_config)
+            )
             
             print(f"✅ Generated {len(slides_data)} slides")
             return slides_data
@@ -201,6 +77,84 @@ Return ONLY the JSON array, no additional text."""
             print(f"❌ Error generating content: {e}")
             raise
     
+    def _content_request(self, topic: str, num_slides: int, include_images: bool, include_code: bool, style: str, audience: str) -> tuple:
+        """Prompt and REST generationConfig for a slide-content request"""
+        image_field = 'image_prompt' if include_images else None
+        prompt = build_slide_prompt(
+            topic, num_slides, style, audience,
+            include_code=include_code,
+            image_field=image_field,
+            include_diagrams=False,
+            numbered=True,
+            structured=self.structured_output
+        )
+        generation_config = None
+        if self.structured_output:
+            generation_config = {
+                "responseMimeType": "application/json",
+                "responseSchema": build_slide_schema(
+                    include_code=include_code,
+                    image_field=image_field,
+                    include_diagrams=False,
+                    numbered=True
+                )
+            }
+        return prompt, generation_config
+    
+    def _call_gemini(self, prompt: str, generation_config: Dict = None) -> str:
+        """Send a prompt to the Gemini REST API and return the response text"""
+        import requests
+        
+        response = requests.post(self.api_url, json=self._gemini_payload(prompt, generation_config))
+        response.raise_for_status()
+        return self._response_text(response.json())
+    
+    @staticmethod
+    def _gemini_payload(prompt: str, generation_config: Dict = None) -> Dict:
+        payload = {
+            "contents": [{
+                "parts": [{
+                    "text": prompt
+                }]
+            }]
+        }
+        if generation_config:
+            payload["generationConfig"] = generation_config
+        return payload
+    
+    @staticmethod
+    def _response_text(result: Dict) -> str:
+        return result['candidates'][0]['content']['parts'][0]['text'].strip()
+    
+    def _slides_from_content(self, prompt: str, content: str, num_slides: int, call) -> List[Dict]:
+        """
+        Parse a slide-content response, salvaging a malformed one.
+        
+        Every well-formed slide is kept and only the broken or missing ones are
+        requested again through call(repair_prompt), which returns the response
+        text (shared by the sync and async paths, which pass their transport).
+        """
+        try:
+            return parse_slides(content)
+        except (json.JSONDecodeError, ValueError) as je:
+            print(f"❌ JSON Parse Error: {je}")
+        
+        slides = salvage_slides(content, expected=num_slides)
+        salvaged = sum(1 for slide in slides if slide is not None)
+        print(f"🩹 Salvaged {salvaged}/{num_slides} slides from malformed response")
+        
+        if salvaged < num_slides:
+            try:
+                repaired = salvage_slides(call(build_repair_prompt(prompt, slides)), expected=num_slides - salvaged)
+                print(f"✅ Repaired {merge_repaired(slides, repaired)}/{num_slides - salvaged} slides")
+            except Exception as e:
+                print(f"⚠️  Repair request failed: {e}")
+        
+        slides = [slide for slide in slides if slide is not None]
+        if not slides:
+            raise ValueError("Could not recover any slides from the response")
+        return slides
+    
     def create_presentation(self, slides_data: List[Dict], output_file: str = "presentation.pptx"):
         """
         Create a PowerPoint presentation from slide data
@@ -209,6 +163,9 @@ Return ONLY the JSON array, no additional text."""
             slides_data: List of dictionaries containing slide information
             output_file: Output filename for the presentation
         """
+        from pptx import Presentation
+        from pptx.util import Inches
+        
         print(f"📊 Creating PowerPoint presentation...")
         
         # Create presentation object
@@ -216,34 +173,44 @@ Return ONLY the JSON array, no additional text."""
         prs.slide_width = Inches(10)
         prs.slide_height = Inches(7.5)
         
-        for slide_data in slides_data:
-            slide_num = slide_data.get('slide_number', 0)
-            title = slide_data.get('title', 'Untitled Slide')
-            bullets = slide_data.get('bullets', [])
-            notes = slide_data.get('notes', '')
-            code = slide_data.get('code', None)
-            image_prompt = slide_data.get('image_prompt', None)
-            
-            if slide_num == 1:
-                # Title slide
-                slide = prs.slides.add_slide(prs.slide_layouts[6])  # Blank layout
-                self._create_title_slide(slide, title, bullets)
-            else:
-                # Content slide
-                slide = prs.slides.add_slide(prs.slide_layouts[6])  # Blank layout
-                self._create_content_slide(slide, title, bullets, code, image_prompt)
-            
-            # Add speaker notes
-            if notes:
-                notes_slide = slide.notes_slide
-                notes_slide.notes_text_frame.text = notes
+        for idx, slide_data in enumerate(slides_data):
+            with profile_stage(f"slide {idx + 1} layout"):
+                self._add_slide(prs, slide_data)
         
         # Save presentation
-        prs.save(output_file)
+        with profile_stage("prs.save"):
+            prs.save(output_file)
         print(f"✅ Presentation saved as '{output_file}'")
     
+    def _add_slide(self, prs, slide_data: Dict):
+        """Add one title or content slide, with speaker notes"""
+        slide_num = slide_data.get('slide_number', 0)
+        title = slide_data.get('title', 'Untitled Slide')
+        bullets = slide_data.get('bullets', [])
+        notes = slide_data.get('notes', '')
+        code = slide_data.get('code', None)
+        image_prompt = slide_data.get('image_prompt', None)
+        
+        if slide_num == 1:
+            # Title slide
+            slide = prs.slides.add_slide(prs.slide_layouts[6])  # Blank layout
+            self._create_title_slide(slide, title, bullets)
+        else:
+            # Content slide
+            slide = prs.slides.add_slide(prs.slide_layouts[6])  # Blank layout
+            self._create_content_slide(slide, title, bullets, code, image_prompt)
+        
+        # Add speaker notes
+        if notes:
+            notes_slide = slide.notes_slide
+            notes_slide.notes_text_frame.text = notes
+    
     def _create_title_slide(self, slide, title: str, bullets: List[str]):
         """Create a title slide with custom styling"""
+        from pptx.util import Inches, Pt
+        from pptx.enum.text import PP_ALIGN
+        from pptx.dml.color import RGBColor
+        
         # Add background
         background = slide.background
         fill = background.fill
@@ -275,6 +242,10 @@ Return ONLY the JSON array, no additional text."""
     
     def _create_content_slide(self, slide, title: str, bullets: List[str], code: str = None, image_prompt: str = None):
         """Create a content slide with title, bullet points, and optional code/images"""
+        from pptx.util import Inches, Pt
+        from pptx.enum.text import PP_ALIGN
+        from pptx.dml.color import RGBColor
+        
         # Add background
         background = slide.background
         fill = background.fill
@@ -405,8 +376,79 @@ Return ONLY the JSON array, no additional text."""
         Returns:
             Tuple of (path to generated presentation, slides data)
         """
-        slides_data = self.generate_slide_content(topic, num_slides, include_images, include_code, style, audience)
-        self.create_presentation(slides_data, output_file)
+        with profile_stage("content generation"):
+            slides_data = self.generate_slide_content(topic, num_slides, include_images, include_code, style, audience)
+        with profile_stage("render"):
+            self.create_presentation(slides_data, output_file)
+        return output_file, slides_data
+
+    def _async_client(self):
+        """httpx.AsyncClient for the running loop, or None when httpx is not installed"""
+        import asyncio
+        try:
+            import httpx
+        except ImportError:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._ahttp is None or self._ahttp_loop is not loop or self._ahttp.is_closed:
+            self._ahttp = httpx.AsyncClient(timeout=120)
+            self._ahttp_loop = loop
+        return self._ahttp
+    
+    async def aclose(self):
+        """Close the async HTTP client"""
+        if self._ahttp is not None:
+            await self._ahttp.aclose()
+            self._ahttp = None
+    
+    async def _acall_gemini(self, prompt: str, generation_config: Dict = None) -> str:
+        """Async _call_gemini (httpx when installed, otherwise requests on a worker thread)"""
+        import asyncio
+        client = self._async_client()
+        if client is None:
+            return await asyncio.to_thread(self._call_gemini, prompt, generation_config)
+        
+        response = await client.post(self.api_url, json=self._gemini_payload(prompt, generation_config))
+        response.raise_for_status()
+        return self._response_text(response.json())
+    
+    async def agenerate_slide_content(self, topic: str, num_slides: int = 8, include_images: bool = False, include_code: bool = False, style: str = "professional", audience: str = "") -> List[Dict]:
+        """Async generate_slide_content: awaits Gemini on the running event loop"""
+        import asyncio
+        
+        print(f"🤖 Generating {style} presentation based on your prompt...")
+        prompt, generation_config = self._content_request(topic, num_slides, include_images, include_code, style, audience)
+        
+        try:
+            content = await self._acall_gemini(prompt, generation_config)
+            
+            # Parsing and salvage run on a worker thread; a repair request is
+            # still sent from this loop with its shared client
+            loop = asyncio.get_running_loop()
+            
+            def repair(repair_prompt):
+                return asyncio.run_coroutine_threadsafe(self._acall_gemini(repair_prompt, generation_config), loop).result()
+            
+            slides_data = await asyncio.to_thread(self._slides_from_content, prompt, content, num_slides, repair)
+            
+            print(f"✅ Generated {len(slides_data)} slides")
+            return slides_data
+            
+        except Exception as e:
+            print(f"❌ Error generating content: {e}")
+            raise
+    
+    async def agenerate_presentation(self, topic: str, num_slides: int = 8, output_file: str = "presentation.pptx", include_images: bool = False, include_code: bool = False, style: str = "professional", audience: str = "") -> tuple:
+        """
+        Async generate_presentation; the deck is built on a worker thread
+        
+        Returns:
+            Tuple of (path to generated presentation, slides data)
+        """
+        import asyncio
+        
+        slides_data = await self.agenerate_slide_content(topic, num_slides, include_images, include_code, style, audience)
+        await asyncio.to_thread(self.create_presentation, slides_data, output_file)
         return output_file, slides_data
 
 
@@ -435,9 +477,21 @@ Examples:
         default='presentation.pptx',
         help='Output filename (default: presentation.pptx)'
     )
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='profile',
+        metavar='DIR',
+        help='Write per-stage timings, memory peaks and sampled stacks to DIR (default: profile/)'
+    )
     
     args = parser.parse_args()
     
+    profiler = None
+    if args.profile:
+        from profiling import Profiler
+        profiler = Profiler(args.profile).start()
+    
     try:
         print("=" * 60)
         print("🚀 AI Slide Generator")
@@ -458,6 +512,12 @@ Examples:
         print(f"\n❌ Error: {e}")
         return 1
     
+    finally:
+        if profiler:
+            profiler.stop()
+            print(f"\n📈 Profile ({args.profile}/stages.json, {args.profile}/stacks.folded):")
+            print(profiler.summary())
+    
     return 0
 
 
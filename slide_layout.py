@@ -0,0 +1,139 @@
+"""
+Slide geometry
+Where every element of a slide goes, in inches, and the font sizes its text is
+fitted to. FreeSlideGenerator.add_slide, the thumbnail renderer and the HTML
+export all lay slides out from plan_slide() and label_box(), so the previews
+cannot drift from the PPTX.
+"""
+
+from collections import namedtuple
+
+from text_fit import fit_font_size, fit_paragraphs, split_paragraphs, FRAME_INSET
+
+SLIDE_WIDTH = 10
+SLIDE_HEIGHT = 7.5
+
+TITLE_BOX = (0.5, 0.3, 9, 1)
+# Titles may run slightly past the bottom of their box before shrinking
+TITLE_FIT_HEIGHT = 1.1
+TITLE_PT = (44, 28)
+
+# Decorative line under the title: (left, top, width) and thickness
+RULE = (0.5, 1.4, 9)
+RULE_PT = 3
+
+CONTENT_LEFT = 0.5
+CONTENT_TOP = 1.7
+CONTENT_WIDTH = 9
+CONTENT_HEIGHT = 4.5
+
+# Two-column layout: text on the left, picture on the right
+IMAGE_BOX = (5.5, CONTENT_TOP, 4, 4.5)
+IMAGE_CONTENT_WIDTH = 5.2
+
+# A few bullets fit under a diagram
+DIAGRAM_BULLETS_BOX = (0.5, 6.2, 9, 1)
+DIAGRAM_MAX_BULLETS = 3
+
+# Code block under the bullets (lower when a picture narrows the text column)
+CODE_TOP = 5.5
+IMAGE_CODE_TOP = 5.8
+CODE_HEIGHT = 1.5
+
+# (max, min) bullet point sizes
+BULLET_PT = (22, 14)
+IMAGE_BULLET_PT = (18, 12)
+DIAGRAM_BULLET_PT = (14, 10)
+CODE_PT = (12, 8)
+
+# Usable text area of an ellipse is roughly its inscribed rectangle
+OVAL_TEXT_AREA = 0.71
+
+# One rendered slide. Boxes are (left, top, width, height); bullet_box, code_box
+# and image_box are None when the page has no bullets, code or picture.
+Page = namedtuple('Page', [
+    'title', 'title_pt', 'bullets', 'bullet_box', 'bullet_pt', 'spaced',
+    'code', 'code_box', 'code_pt', 'image_box', 'diagram'
+])
+
+
+def title_size(title):
+    """Point size a slide title is fitted to"""
+    return fit_font_size(title, TITLE_BOX[2] - 2 * FRAME_INSET[0], TITLE_FIT_HEIGHT, *TITLE_PT, bold=True)
+
+
+def inner_box(box):
+    """Text area of a text box, inside the default frame insets"""
+    left, top, width, height = box
+    margin_x, margin_y = FRAME_INSET
+    return left + margin_x, top + margin_y, width - 2 * margin_x, height - 2 * margin_y
+
+
+def plan_slide(slide_data, has_image=False):
+    """
+    Pages for one slide: the slide itself, then continuation slides for
+    bullets that do not fit even at the minimum size.
+
+    has_image: the slide's picture was placed (ignored for diagram slides).
+    """
+    title = slide_data.get('title', 'Untitled')
+    bullets = slide_data.get('bullets') or []
+    diagram = slide_data.get('diagram')
+
+    if diagram:
+        bullet_box = bullet_pt = None
+        if bullets and len(bullets) <= DIAGRAM_MAX_BULLETS:
+            bullet_box = DIAGRAM_BULLETS_BOX
+            bullet_pt = fit_paragraphs(bullets, *bullet_box[2:], *DIAGRAM_BULLET_PT) or DIAGRAM_BULLET_PT[1]
+        page = Page(title, title_size(title), bullets if bullet_box else [], bullet_box, bullet_pt, False,
+                    None, None, None, None, diagram)
+        return [page]
+
+    content_width = IMAGE_CONTENT_WIDTH if has_image else CONTENT_WIDTH
+    code = slide_data.get('code')
+    code_top = IMAGE_CODE_TOP if has_image else CODE_TOP
+    bullets_height = code_top - CONTENT_TOP if code else CONTENT_HEIGHT
+    max_pt, min_pt = IMAGE_BULLET_PT if has_image else BULLET_PT
+
+    bullet_box = bullet_pt = None
+    overflow = []
+    if bullets:
+        bullet_box = (CONTENT_LEFT, CONTENT_TOP, content_width, bullets_height)
+        bullet_pt = fit_paragraphs(bullets, content_width, bullets_height, max_pt, min_pt)
+        if bullet_pt is None:
+            bullet_pt = min_pt
+            chunks = split_paragraphs(bullets, content_width, bullets_height, bullet_pt)
+            bullets, overflow = chunks[0], chunks[1:]
+
+    code_box = code_pt = None
+    if code:
+        code_box = (CONTENT_LEFT, code_top, content_width, CODE_HEIGHT)
+        _, _, code_width, code_height = inner_box(code_box)
+        code_pt = fit_font_size(code, code_width, code_height, *CODE_PT, mono=True)
+
+    pages = [Page(title, title_size(title), bullets, bullet_box, bullet_pt, True,
+                  code, code_box, code_pt, IMAGE_BOX if has_image else None, None)]
+    box = (CONTENT_LEFT, CONTENT_TOP, CONTENT_WIDTH, CONTENT_HEIGHT)
+    for chunk in overflow:
+        continued = f"{title} (cont.)"
+        size = fit_paragraphs(chunk, CONTENT_WIDTH, CONTENT_HEIGHT, *BULLET_PT) or BULLET_PT[1]
+        pages.append(Page(continued, title_size(continued), chunk, box, size, True,
+                          None, None, None, None, None))
+    return pages
+
+
+def label_box(element):
+    """Text area (left, top, width, height) of a labelled diagram element"""
+    left, top, width, height = element.box
+    margin_x, margin_y = element.margin or FRAME_INSET
+    if element.shape == 'OVAL':
+        inset_x = width * (1 - OVAL_TEXT_AREA) / 2
+        inset_y = height * (1 - OVAL_TEXT_AREA) / 2
+        left, top, width, height = left + inset_x, top + inset_y, width - 2 * inset_x, height - 2 * inset_y
+    return left + margin_x, top + margin_y, width - 2 * margin_x, height - 2 * margin_y
+
+
+def label_size(element, text):
+    """Point size a diagram element's label is fitted to"""
+    _, _, width, height = label_box(element)
+    return fit_font_size(text, width, height, element.font_pt, min_pt=min(9, element.font_pt), bold=element.bold)
@@ -0,0 +1,196 @@
+"""
+Text measurement and fitting
+Per-font advance-width tables are built once with PIL and cached, so wrapped
+line counts for bullets, code blocks and diagram labels cost microseconds.
+"""
+
+import math
+from functools import lru_cache
+
+# Fonts tried in order; PowerPoint renders with Calibri / Courier New, these are
+# close enough (and slightly wider, so measurements err on the safe side)
+FONT_CANDIDATES = {
+    'regular': ["arial.ttf", "Arial.ttf", "DejaVuSans.ttf", "LiberationSans-Regular.ttf"],
+    'bold': ["arialbd.ttf", "Arial Bold.ttf", "DejaVuSans-Bold.ttf", "LiberationSans-Bold.ttf"],
+    'mono': ["cour.ttf", "Courier New.ttf", "DejaVuSansMono.ttf", "LiberationMono-Regular.ttf"],
+}
+
+# Glyphs are measured once at this pixel size; widths scale linearly with font size
+REFERENCE_SIZE = 100
+
+# Code points covered by the precomputed tables (Basic Latin through Latin Extended-B)
+TABLE_SIZE = 0x250
+
+# Courier-style fonts advance exactly 0.6em per glyph
+MONO_ADVANCE = 0.6
+
+LINE_SPACING = 1.2
+
+# Default python-pptx text frame insets in inches (left/right, top/bottom)
+FRAME_INSET = (0.1, 0.05)
+
+
+def _face(bold, mono):
+    return 'mono' if mono else 'bold' if bold else 'regular'
+
+
+@lru_cache(maxsize=None)
+def _load_font(face):
+    from PIL import ImageFont
+
+    for name in FONT_CANDIDATES[face]:
+        try:
+            return ImageFont.truetype(name, REFERENCE_SIZE)
+        except OSError:
+            continue
+    if face == 'mono':
+        return None
+    return ImageFont.load_default(REFERENCE_SIZE)
+
+
+@lru_cache(maxsize=8192)
+def _glyph_width(ch, face):
+    """Advance width of one glyph as a fraction of the font size"""
+    font = _load_font(face)
+    if font is None:
+        return MONO_ADVANCE
+    return font.getlength(ch) / REFERENCE_SIZE
+
+
+@lru_cache(maxsize=None)
+def advance_table(face):
+    """Precomputed advance widths (em fractions) for the first TABLE_SIZE code points"""
+    return tuple(_glyph_width(chr(code), face) for code in range(TABLE_SIZE))
+
+
+def warm_up():
+    """Build every advance table up front (e.g. before forking workers)"""
+    for face in FONT_CANDIDATES:
+        advance_table(face)
+
+
+@lru_cache(maxsize=65536)
+def _em_width(text, face):
+    """Width of a run of text in em units, memoized per word"""
+    table = advance_table(face)
+    em = 0.0
+    for ch in text:
+        code = ord(ch)
+        em += table[code] if code < TABLE_SIZE else _glyph_width(ch, face)
+    return em
+
+
+def text_width(text, size_pt, bold=False, mono=False):
+    """Width of a single line of text in inches"""
+    return _em_width(text, _face(bold, mono)) * size_pt / 72
+
+
+def count_lines(text, width_in, size_pt, bold=False, mono=False):
+    """Number of lines `text` wraps to inside a box `width_in` inches wide"""
+    face = _face(bold, mono)
+    # Work in em units so per-word widths are shared across font sizes
+    width = width_in * 72 / size_pt
+    if width <= 0:
+        # Nothing fits a box with no usable width
+        return math.inf
+    space = _em_width(' ', face)
+    lines = 0
+    for paragraph in str(text).split('\n'):
+        lines += 1
+        used = 0
+        for word in paragraph.split():
+            word_width = _em_width(word, face)
+            if used and used + space + word_width > width:
+                lines += 1
+                used = 0
+            elif used:
+                used += space
+            # Words wider than the box are broken across lines
+            while word_width > width:
+                lines += 1
+                word_width -= width
+            used += word_width
+    return lines
+
+
+def text_height(text, width_in, size_pt, bold=False, mono=False):
+    """Height in inches of `text` wrapped inside a box `width_in` inches wide"""
+    return count_lines(text, width_in, size_pt, bold, mono) * size_pt * LINE_SPACING / 72
+
+
+def fit_font_size(text, width_in, height_in, max_pt, min_pt=9, bold=False, mono=False):
+    """Largest whole point size between min_pt and max_pt at which `text` fits the box"""
+    for size in range(int(max_pt), int(min_pt), -1):
+        if text_height(text, width_in, size, bold, mono) <= height_in:
+            return size
+    return min_pt
+
+
+def space_before(size_pt):
+    """Paragraph spacing used for bullet lists at a given font size"""
+    return round(size_pt * 2 / 3)
+
+
+def paragraphs_height(paragraphs, width_in, size_pt, bold=False):
+    """Height of a bullet list where every paragraph after the first gets space_before"""
+    height = sum(text_height(p, width_in, size_pt, bold) for p in paragraphs)
+    return height + space_before(size_pt) * max(len(paragraphs) - 1, 0) / 72
+
+
+def fit_paragraphs(paragraphs, box_width, box_height, max_pt, min_pt, bold=False):
+    """
+    Largest point size at which the bullet list fits a text box of the given size.
+
+    Returns None when it does not fit even at min_pt; see split_paragraphs().
+    """
+    width = box_width - 2 * FRAME_INSET[0]
+    height = box_height - 2 * FRAME_INSET[1]
+    for size in range(int(max_pt), int(min_pt) - 1, -1):
+        if paragraphs_height(paragraphs, width, size, bold) <= height:
+            return size
+    return None
+
+
+def split_paragraphs(paragraphs, box_width, box_height, size_pt, bold=False):
+    """Greedily group paragraphs into chunks that each fit the text box at size_pt"""
+    width = box_width - 2 * FRAME_INSET[0]
+    height = box_height - 2 * FRAME_INSET[1]
+    gap = space_before(size_pt) / 72
+
+    chunks = [[]]
+    used = 0
+    for paragraph in paragraphs:
+        needed = text_height(paragraph, width, size_pt, bold)
+        if chunks[-1] and used + gap + needed > height:
+            chunks.append([])
+            used = 0
+        used += needed + (gap if chunks[-1] else 0)
+        chunks[-1].append(paragraph)
+    return chunks
+
+
+def wrap_text(text, width_in, size_pt, bold=False, mono=False):
+    """Greedy word wrap matching count_lines(); returns the list of lines"""
+    face = _face(bold, mono)
+    width = width_in * 72 / size_pt
+    space = _em_width(' ', face)
+    lines = []
+    for paragraph in str(text).split('\n'):
+        current = []
+        used = 0
+        for word in paragraph.split():
+            word_width = _em_width(word, face)
+            if current and used + space + word_width > width:
+                lines.append(' '.join(current))
+                current, used = [], 0
+            used += word_width + (space if current else 0)
+            current.append(word)
+        lines.append(' '.join(current))
+    return lines
+
+
+@lru_cache(maxsize=256)
+def pil_font(px, bold=False, mono=False):
+    """PIL font of the measured face at a pixel size, for rasterizing text"""
+    font = _load_font(_face(bold, mono)) or _load_font('regular')
+    return font.font_variant(size=max(int(px), 1))
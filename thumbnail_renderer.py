@@ -0,0 +1,280 @@
+"""
+Pure-Python slide thumbnail renderer
+Rasterizes an approximate preview of a slide straight from its slide data and
+theme with PIL (no PowerPoint or LibreOffice), from the same slide_layout
+geometry as FreeSlideGenerator.add_slide. Thumbnails are cached by content
+hash; least recently used ones are evicted once the cache exceeds its budget.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+from diagram_engine import LAYOUTS, get_layout, item_text
+from image_cache import atomic_write
+from slide_layout import (
+    plan_slide, title_size, inner_box, label_box, label_size,
+    SLIDE_WIDTH, SLIDE_HEIGHT, TITLE_BOX, RULE, RULE_PT, IMAGE_BOX
+)
+from text_fit import wrap_text, pil_font, space_before, LINE_SPACING
+
+# Bump when the drawing code changes so stale thumbnails are not served
+RENDERER_VERSION = 2
+
+FORMATS = {
+    'png': ('PNG', 'image/png'),
+    'webp': ('WEBP', 'image/webp'),
+}
+
+WHITE = (255, 255, 255)
+CODE_BACKGROUND = (40, 42, 54)
+CODE_TEXT = (248, 248, 242)
+
+
+class _Canvas:
+    """ImageDraw wrapper working in slide inches"""
+
+    def __init__(self, width_px, background):
+        self.scale = width_px / SLIDE_WIDTH
+        self.image = Image.new('RGB', (width_px, round(SLIDE_HEIGHT * self.scale)), tuple(background))
+        self.draw = ImageDraw.Draw(self.image)
+
+    def px(self, inches):
+        return round(inches * self.scale)
+
+    def rect(self, box):
+        left, top, width, height = box
+        return [self.px(left), self.px(top), self.px(left + width), self.px(top + height)]
+
+    def text_block(self, lines, left, top, width, size_pt, color, bold=False, mono=False,
+                   centered=False, gap_pt=0):
+        """Draw pre-wrapped lines starting at (left, top); returns the bottom in inches"""
+        font = pil_font(size_pt / 72 * self.scale, bold, mono)
+        line_height = size_pt * LINE_SPACING / 72
+        y = top + gap_pt / 72
+        for line in lines:
+            x = left
+            if centered:
+                x = left + (width - font.getlength(line) / self.scale) / 2
+            self.draw.text((self.px(x), self.px(y)), line, fill=tuple(color), font=font)
+            y += line_height
+        return y
+
+
+def _color(theme_config, key):
+    return WHITE if key == 'white' else tuple(theme_config[key])
+
+
+def _draw_label(canvas, element, text, theme_config):
+    left, top, width, height = label_box(element)
+    size = label_size(element, text)
+    lines = wrap_text(text, width, size, element.bold)
+    block_height = len(lines) * size * LINE_SPACING / 72
+    # Shapes anchor text in the middle, text boxes at the top
+    y = top if element.kind == 'textbox' else top + (height - block_height) / 2
+    canvas.text_block(lines, left, y, width, size,
+                      _color(theme_config, element.color), element.bold, centered=element.centered)
+
+
+def _draw_diagram(canvas, diagram, theme_config):
+    diagram_type = diagram.get('type', 'flowchart')
+    items = diagram.get('data', [])
+    layout = LAYOUTS.get(diagram_type)
+    if layout is None or len(items) < layout.min_items:
+        return
+
+    texts = [item_text(item) for item in items]
+    for element in get_layout(diagram_type, len(items), layout.box):
+        line_px = max(1, canvas.px(element.line_width / 72)) if element.line_width else 0
+        if element.kind == 'connector':
+            x1, y1, x2, y2 = element.box
+            points = [(canvas.px(x1), canvas.px(y1)), (canvas.px(x2), canvas.px(y2))]
+            if element.shape == 2:
+                # Elbow connector: horizontal, vertical, horizontal
+                mid = canvas.px((x1 + x2) / 2)
+                points = [points[0], (mid, points[0][1]), (mid, points[1][1]), points[1]]
+            canvas.draw.line(points, fill=_color(theme_config, element.line), width=line_px)
+            continue
+
+        if element.kind == 'shape':
+            box = canvas.rect(element.box)
+            fill = _color(theme_config, element.fill)
+            outline = _color(theme_config, element.line) if element.line and line_px else None
+            if element.shape == 'OVAL':
+                canvas.draw.ellipse(box, fill=fill, outline=outline, width=line_px)
+            elif element.shape == 'ROUNDED_RECTANGLE':
+                radius = min(box[2] - box[0], box[3] - box[1]) // 6
+                canvas.draw.rounded_rectangle(box, radius=radius, fill=fill, outline=outline, width=line_px)
+            else:
+                canvas.draw.rectangle(box, fill=fill, outline=outline, width=line_px)
+
+        if element.label is not None:
+            text = element.label
+            if element.slot is not None:
+                text = element.label.format(n=element.slot + 1, text=texts[element.slot])
+            _draw_label(canvas, element, text, theme_config)
+
+
+def _draw_bullets(canvas, bullets, box, size, color, spaced=True):
+    left, y, width, _ = inner_box(box)
+    for i, bullet in enumerate(bullets):
+        gap = space_before(size) if spaced and i > 0 else 0
+        y = canvas.text_block(wrap_text(bullet, width, size), left, y, width, size, color, gap_pt=gap)
+
+
+def _draw_image(canvas, image_path, box):
+    try:
+        with Image.open(image_path) as img:
+            picture = img.convert('RGB').resize((canvas.px(box[2]), canvas.px(box[3])))
+        canvas.image.paste(picture, (canvas.px(box[0]), canvas.px(box[1])))
+        return True
+    except Exception as e:
+        print(f"⚠️  Thumbnail image error: {e}")
+        return False
+
+
+def render_thumbnail(slide_data, theme_config, image_path=None, width=480, fmt='png'):
+    """Rasterize one slide and return the encoded image bytes"""
+    canvas = _Canvas(width, theme_config['background'])
+    text_color = tuple(theme_config['text'])
+
+    # Title and decorative line
+    title = slide_data.get('title', 'Untitled')
+    title_pt = title_size(title)
+    left, top, title_width, _ = inner_box(TITLE_BOX)
+    canvas.text_block(wrap_text(title, title_width, title_pt, bold=True), left, top, title_width, title_pt,
+                      theme_config['primary'], bold=True)
+    left, top, rule_width = RULE
+    canvas.draw.line([(canvas.px(left), canvas.px(top)), (canvas.px(left + rule_width), canvas.px(top))],
+                     fill=tuple(theme_config['accent']), width=max(1, canvas.px(RULE_PT / 72)))
+
+    has_image = False
+    if slide_data.get('diagram'):
+        _draw_diagram(canvas, slide_data['diagram'], theme_config)
+    elif image_path and os.path.exists(image_path):
+        has_image = _draw_image(canvas, image_path, IMAGE_BOX)
+    # Continuation slides for overflowing bullets are not previewed
+    page = plan_slide(slide_data, has_image)[0]
+
+    if page.bullets:
+        _draw_bullets(canvas, page.bullets, page.bullet_box, page.bullet_pt, text_color, page.spaced)
+    if page.code:
+        canvas.draw.rectangle(canvas.rect(page.code_box), fill=CODE_BACKGROUND)
+        left, top, code_width, code_height = inner_box(page.code_box)
+        lines = wrap_text(page.code, code_width, page.code_pt, mono=True)
+        max_lines = int(code_height / (page.code_pt * LINE_SPACING / 72))
+        canvas.text_block(lines[:max_lines], left, top, code_width, page.code_pt, CODE_TEXT, mono=True)
+
+    buffer = BytesIO()
+    pil_format = FORMATS[fmt][0]
+    canvas.image.save(buffer, pil_format, **({'quality': 80} if pil_format == 'WEBP' else {'optimize': True}))
+    return buffer.getvalue()
+
+
+def thumbnail_key(slide_data, theme, image_path=None, width=480, fmt='png'):
+    """Content hash identifying a rendered thumbnail"""
+    image_id = None
+    if image_path and os.path.exists(image_path):
+        stat = os.stat(image_path)
+        image_id = [os.path.basename(image_path), stat.st_size, int(stat.st_mtime)]
+    payload = json.dumps(
+        [RENDERER_VERSION, slide_data, theme, image_id, width, fmt],
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ThumbnailCache:
+    """
+    Rendered thumbnails on disk, evicted least-recently-used within a byte budget.
+
+    cache_dir: where thumbnails are stored (default cache/thumbnails)
+    max_bytes: disk budget (THUMBNAIL_CACHE_MAX_MB, default 100; 0 = unbounded)
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or os.path.join('cache', 'thumbnails')
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv('THUMBNAIL_CACHE_MAX_MB', 100)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, slide_data, theme, theme_config, image_path=None, width=480, fmt='png'):
+        """Path of a cached thumbnail, rendering it on a cache miss"""
+        key = thumbnail_key(slide_data, theme, image_path, width, fmt)
+        path = os.path.join(self.cache_dir, f"{key}.{fmt}")
+        try:
+            # The mtime doubles as the last-use time for eviction
+            os.utime(path)
+            self._count('hits')
+            return path
+        except FileNotFoundError:
+            self._count('misses')
+
+        atomic_write(path, render_thumbnail(slide_data, theme_config, image_path, width, fmt))
+        self.evict(keep=path)
+        return path
+
+    def open(self, *args, **kwargs):
+        """
+        Open file of a thumbnail (same arguments as get), re-rendering it if
+        eviction removed it first. An open file survives a concurrent evict().
+        """
+        for _ in range(3):
+            try:
+                return open(self.get(*args, **kwargs), 'rb')
+            except FileNotFoundError:
+                continue
+        raise FileNotFoundError("Thumbnail was evicted while being served")
+
+    def evict(self, keep=None):
+        """Delete least recently used thumbnails until the directory fits its budget"""
+        if self.max_bytes <= 0:
+            return
+        with self._evict_lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if not entry.name.endswith(tuple(f".{fmt}" for fmt in FORMATS)):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                # The thumbnail just rendered is about to be served
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self._count('evictions')
+
+    def usage(self):
+        """Cache counters and current size on disk"""
+        size = count = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(tuple(f".{fmt}" for fmt in FORMATS)):
+                size += entry.stat().st_size
+                count += 1
+        with self._lock:
+            stats = dict(self.stats)
+        return dict(stats, thumbnails=count, bytes=size, max_bytes=self.max_bytes)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1